@@ -1,2 +1,7 @@
 # AFK Coding Monitor Backend API
-__version__ = "1.0.0" 
\ No newline at end of file
+import time
+
+__version__ = "1.0.0"
+
+# When the first app module was imported; startup timing counts imports from here.
+IMPORT_STARTED = time.perf_counter()
@@ -12,11 +12,29 @@ class Settings(BaseSettings):
     
     # Database Configuration
     database_url: str = "sqlite+aiosqlite:///./afk_monitor.db"
-    
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout: float = 30  # seconds to wait for a connection before erroring
+    db_pool_recycle: int = 1800  # seconds; -1 keeps connections forever
+    db_pool_pre_ping: bool = True
+    # SQLite: WAL lets reads run alongside the single writer; busy_timeout is how
+    # long a writer waits for the lock (e.g. held by another worker) before failing.
+    sqlite_wal: bool = True
+    sqlite_busy_timeout: float = 5  # seconds
+    # Sharding: with more than one shard, each user's sessions live in one of
+    # N databases named by the template. Run rebalance_shards.py after changing.
+    db_shard_count: int = 1
+    db_shard_url_template: str = "sqlite+aiosqlite:///./afk_monitor.shard{shard}.db"
+
     # JWT Configuration
     secret_key: str = "your-secret-key-here-change-in-production"
     algorithm: str = "HS256"
     access_token_expire_hours: int = 24 * 7  # 1 week
+    token_cache_size: int = 10000  # verified tokens kept in memory; 0 disables
+    pull_token_expire_seconds: int = 300  # scoped tokens sent to extensions by background sync
+    user_cache_size: int = 10000  # users kept in memory; 0 disables
+    user_cache_ttl: float = 60  # seconds
+    user_cache_negative_ttl: float = 10  # seconds an unknown user id is remembered
     
     # CORS Configuration
     cors_origins: list[str] = [
@@ -31,11 +49,95 @@ class Settings(BaseSettings):
     # GitHub OAuth Configuration
     github_client_id: str = ""
     github_client_secret: str = ""
+    # Overridable to point logins at GitHub Enterprise or a local fake.
+    github_oauth_url: str = "https://github.com"
+    github_api_url: str = "https://api.github.com"
+
+    # Shared outbound HTTP client (GitHub)
+    http_client_timeout: float = 15  # seconds
+    http_client_max_connections: int = 100
+    http_client_max_keepalive: int = 20
+    
+    # Session Coalescing
+    session_coalesce_gap_seconds: int = 30  # 0 disables merging of adjacent sessions
+    session_coalesce_max_users: int = 10000  # per-user tails buffered in memory
     
     # Extension Communication Configuration
     extension_timeout: int = 30  # seconds
     extension_retry_attempts: int = 3
+    extension_breaker_failure_threshold: int = 3  # consecutive failures that open the breaker
+    extension_breaker_reset_timeout: float = 30  # seconds open before a trial call
     extension_discovery_enabled: bool = True
+    extension_discovery_hosts: list[str] = ["localhost", "127.0.0.1"]
+    extension_discovery_ports: list[int] = [8001, 8002, 8003, 8004, 8005]
+    extension_probe_timeout: float = 1.0  # seconds per discovery probe
+    extension_negative_cache_ttl: int = 60  # seconds before rescanning for a missing extension
+    extension_sync_page_size: int = 100  # sessions requested per export page
+    extension_sync_max_pages: int = 1000  # safety stop for a single sync
+    extension_sync_batch_size: int = 500  # sessions decoded and stored per batch
+    extension_connection_limit: int = 100  # pooled connections across all extensions
+    extension_connection_limit_per_host: int = 10
+    extension_keepalive_timeout: float = 30  # seconds an idle connection is kept
+    extension_dns_cache_ttl: int = 300  # seconds
+
+    # Background sync scheduler
+    sync_scheduler_enabled: bool = False
+    sync_max_concurrency: int = 4  # users synced at once
+    sync_interval_active: float = 60  # seconds, after a sync that found new sessions
+    sync_interval_idle: float = 900  # seconds, ceiling the interval backs off to
+    sync_jitter: float = 0.1  # +/- fraction applied to every interval
+
+    # Multi-worker coordination: lock files for startup DDL and scheduler leadership
+    worker_lock_dir: str = "."
+
+    # Per-user rate limiting (token bucket + concurrent request cap per route class)
+    rate_limit_enabled: bool = True
+    rate_limit_backend: str = "memory"  # "memory", or "redis" to share limits across workers
+    rate_limit_redis_url: str = "redis://localhost:6379/0"
+    rate_limit_ingest_per_second: float = 50
+    rate_limit_ingest_burst: int = 2000  # a backlog flush posts sessions back to back
+    rate_limit_ingest_in_flight: int = 8
+    rate_limit_read_per_second: float = 50
+    rate_limit_read_burst: int = 200
+    rate_limit_read_in_flight: int = 16
+
+    # Load shedding: concurrent slots per request class, and seconds a request
+    # may queue for one before it is answered 503
+    load_shedding_enabled: bool = True
+    shed_ingest_concurrency: int = 8
+    shed_ingest_queue_deadline: float = 1.0
+    shed_interactive_concurrency: int = 16
+    shed_interactive_queue_deadline: float = 2.0
+    shed_report_concurrency: int = 4
+    shed_report_queue_deadline: float = 5.0
+
+    # Query profiler (opt-in): Server-Timing header, slow-request log, N+1 warnings
+    query_profiler_enabled: bool = False
+    profiler_slow_request_ms: float = 500
+    profiler_max_statements: int = 20  # more statements than this in one request is logged
+    profiler_repeat_threshold: int = 5  # same statement this often in one request is flagged
+
+    # Serialise session/stats payloads once (orjson if installed) instead of
+    # re-validating them against the Union response model
+    fast_json_responses: bool = True
+
+    # Logging: formatted and written on a background thread; "json" (one object
+    # per line) or "text". Each message template may log log_sample_burst times
+    # a second, then one in log_sample_every (0 burst disables sampling)
+    log_level: str = "INFO"
+    log_format: str = "json"
+    log_queue_size: int = 10000  # records buffered before new ones are dropped
+    log_sample_burst: int = 20
+    log_sample_every: int = 100
+
+    # Response compression negotiated from Accept-Encoding: gzip, plus zstd and
+    # brotli when installed. Bodies under compression_minimum_size bytes are sent
+    # as is; higher levels trade CPU for bytes
+    compression_enabled: bool = True
+    compression_minimum_size: int = 1024
+    compression_gzip_level: int = 6  # 1-9
+    compression_brotli_quality: int = 4  # 0-11
+    compression_zstd_level: int = 3  # 1-22
     
     class Config:
         env_file = ".env"
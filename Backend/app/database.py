@@ -1,16 +1,240 @@
+import logging
+import time
+
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
 from sqlalchemy.orm import DeclarativeBase
-from sqlalchemy import MetaData
+from sqlalchemy import MetaData, event, exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from sqlalchemy.util import queue as sqla_queue
 from app.config import settings
+from app import metrics
 
 
-# Database Engine
-engine = create_async_engine(
-    settings.database_url,
-    echo=settings.debug,
-    future=True
+POOL_CHECKOUT_SECONDS = metrics.histogram(
+    "afk_db_pool_checkout_wait_seconds",
+    "Time spent waiting for a pooled connection",
+    ["pool"],
+)
+POOL_TIMEOUTS = metrics.counter(
+    "afk_db_pool_timeouts_total",
+    "Checkouts that gave up after db_pool_timeout",
+    ["pool"],
+)
+POOL_CONNECTIONS_OPENED = metrics.counter(
+    "afk_db_pool_connections_opened_total",
+    "New DBAPI connections opened by the pool",
+    ["pool"],
+)
+POOL_CONNECTIONS_CLOSED = metrics.counter(
+    "afk_db_pool_connections_closed_total",
+    "DBAPI connections closed by the pool (recycle, overflow, dispose)",
+    ["pool"],
+)
+STATEMENT_SECONDS = metrics.histogram(
+    "afk_db_statement_duration_seconds",
+    "Time the database took to execute a statement, by kind",
+    ["pool", "statement"],
+)
+STATEMENT_ERRORS = metrics.counter(
+    "afk_db_statement_errors_total",
+    "Statements that raised",
+    ["pool"],
+)
+POOL_CONNECTIONS_INVALIDATED = metrics.counter(
+    "afk_db_pool_connections_invalidated_total",
+    "Connections discarded as broken, including failed pre-pings",
+    ["pool"],
 )
 
+
+class _TimedQueue(sqla_queue.AsyncAdaptedQueue):
+    """The pool's queue of idle connections, timing each `get`."""
+
+    pool_name = "default"
+
+    def get(self, block=True, timeout=None):
+        started = time.perf_counter()
+        try:
+            return super().get(block, timeout)
+        finally:
+            POOL_CHECKOUT_SECONDS.observe(time.perf_counter() - started, pool=self.pool_name)
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """
+    Queue pool that times how long each checkout waits.
+
+    Pool events fire only once a connection has been handed out, so the wait
+    itself — the number that climbs first when the pool saturates — is
+    measured on the pool's queue. Only the wait for an idle connection is
+    timed: opening a new one (overflow, or after a recycle) and pre-pings are
+    not.
+    """
+
+    _queue_class = _TimedQueue
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._pool.pool_name = self.logging_name or "default"
+
+    def connect(self):
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            POOL_TIMEOUTS.inc(pool=self.logging_name or "default")
+            raise
+
+
+# SQLAlchemy names pool loggers after the pool class's module, so this one falls
+# outside the "sqlalchemy" logger it quiets to WARNING by default. Match it.
+logging.getLogger(f"{__name__}.{InstrumentedQueuePool.__name__}").setLevel(logging.WARNING)
+
+
+# Engines keyed by pool name, so their live state can be reported.
+_engines = {}
+
+
+def _pool_options() -> dict:
+    """
+    Pool configuration from settings.
+
+    aiosqlite defaults to NullPool, which opens a connection (and a thread) per
+    checkout. In-memory databases are the exception: each connection would see
+    its own empty database, so they keep SQLAlchemy's default.
+    """
+    if make_url(settings.database_url).database in (None, "", ":memory:"):
+        return {}
+    return {
+        "poolclass": InstrumentedQueuePool,
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout,
+        "pool_recycle": settings.db_pool_recycle,
+        "pool_pre_ping": settings.db_pool_pre_ping,
+    }
+
+
+def _instrument_pool(engine, name: str) -> None:
+    target = engine.sync_engine
+
+    @event.listens_for(target, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        POOL_CONNECTIONS_OPENED.inc(pool=name)
+
+    @event.listens_for(target, "close")
+    def _on_close(dbapi_connection, connection_record):
+        POOL_CONNECTIONS_CLOSED.inc(pool=name)
+
+    @event.listens_for(target, "invalidate")
+    def _on_invalidate(dbapi_connection, connection_record, exception):
+        POOL_CONNECTIONS_INVALIDATED.inc(pool=name)
+
+    _engines[name] = engine
+
+
+_STATEMENT_KINDS = {"SELECT", "INSERT", "UPDATE", "DELETE", "WITH", "PRAGMA", "CREATE", "ALTER", "DROP"}
+
+
+def _instrument_statements(engine, name: str) -> None:
+    """Time every statement with cursor events; labelled by its leading keyword."""
+    target = engine.sync_engine
+
+    @event.listens_for(target, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("afk_statement_started", []).append(time.perf_counter())
+
+    @event.listens_for(target, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["afk_statement_started"].pop()
+        words = statement[:16].split(None, 1)
+        kind = words[0].upper() if words else ""
+        STATEMENT_SECONDS.observe(
+            time.perf_counter() - started, pool=name, statement=kind if kind in _STATEMENT_KINDS else "OTHER"
+        )
+
+    @event.listens_for(target, "handle_error")
+    def _error(context):
+        STATEMENT_ERRORS.inc(pool=name)
+        stack = context.connection.info.get("afk_statement_started") if context.connection is not None else None
+        if stack:
+            stack.pop()
+
+
+def _configure_sqlite(engine) -> None:
+    """
+    Make a file-backed SQLite database safe to share between worker processes.
+
+    WAL lets readers proceed while one connection writes, and busy_timeout makes
+    a writer that finds the database locked wait its turn instead of failing
+    straight away with "database is locked".
+    """
+    url = engine.url
+    if url.get_backend_name() != "sqlite" or url.database in (None, "", ":memory:"):
+        return
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f"PRAGMA busy_timeout = {int(settings.sqlite_busy_timeout * 1000)}")
+        if settings.sqlite_wal:
+            cursor.execute("PRAGMA journal_mode = WAL")
+            cursor.execute("PRAGMA synchronous = NORMAL")
+        cursor.close()
+
+
+def create_engine(database_url: str, name: str):
+    """Create an async engine with the configured, instrumented pool."""
+    new_engine = create_async_engine(
+        database_url,
+        echo=settings.debug,
+        future=True,
+        pool_logging_name=name,
+        **_pool_options()
+    )
+    _instrument_pool(new_engine, name)
+    _instrument_statements(new_engine, name)
+    _configure_sqlite(new_engine)
+    return new_engine
+
+
+def pool_status() -> dict:
+    """Live occupancy of every engine's pool."""
+    status = {}
+    for name, pool_engine in _engines.items():
+        pool = pool_engine.sync_engine.pool
+        if isinstance(pool, AsyncAdaptedQueuePool):
+            status[name] = {
+                "size": pool.size(),
+                "inUse": pool.checkedout(),
+                "idle": pool.checkedin(),
+                "overflow": max(pool.overflow(), 0),
+                "maxOverflow": settings.db_max_overflow,
+            }
+        else:
+            status[name] = {"pool": type(pool).__name__}
+    return status
+
+
+def _pool_gauge_samples(field: str):
+    def collect():
+        for name, values in pool_status().items():
+            if field in values:
+                yield (name,), values[field]
+    return collect
+
+
+metrics.gauge(
+    "afk_db_pool_connections_in_use", "Connections currently checked out", ["pool"]
+).set_function(_pool_gauge_samples("inUse"))
+metrics.gauge(
+    "afk_db_pool_connections_idle", "Connections idle in the pool", ["pool"]
+).set_function(_pool_gauge_samples("idle"))
+
+
+# Database Engine
+engine = create_engine(settings.database_url, "primary")
+
 # Session Factory
 async_session_maker = async_sessionmaker(
     engine,
@@ -42,12 +266,15 @@ async def get_db() -> AsyncSession:
             await session.close()
 
 
-# Initialize database
-async def create_tables():
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+# Mapped for backward compatibility but no longer read or written, so never created.
+LEGACY_TABLES = {"coding_sessions"}
+
+
+def primary_tables() -> list:
+    """Tables the primary database holds."""
+    return [table for table in Base.metadata.sorted_tables if table.name not in LEGACY_TABLES]
 
 
 # Close database
 async def close_db():
-    await engine.dispose() 
\ No newline at end of file
+    await engine.dispose()
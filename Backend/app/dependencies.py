@@ -1,13 +1,12 @@
 from fastapi import HTTPException, status, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.future import select
-from sqlalchemy.orm import selectinload
-import jwt
 from app.models import User
 from app.database import get_db
-from app.config import settings
-from datetime import datetime, timezone
+from app.routers.auth import LOCAL_USER_ID, current_user_id, decode_token
+from app.services.rate_limiter import RateLimited, rate_limiter, retry_after_header
+from app.services.user_cache import user_cache
+from app.sharding import shard_router
 from typing import Annotated
 
 
@@ -20,39 +19,22 @@ async def get_current_user(
 ) -> User:
     """
     Dependency to get current authenticated user from JWT token.
+    
+    The returned user may come from the user cache, detached from `db`:
+    merge it into the session before modifying it.
     """
-    try:
-        # Decode JWT token
-        payload = jwt.decode(
-            credentials.credentials,
-            settings.jwt_secret,
-            algorithms=[settings.jwt_algorithm]
-        )
-    except jwt.ExpiredSignatureError:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail={"success": False, "error": "Token has expired"}
-        )
-    except jwt.InvalidTokenError:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail={"success": False, "error": "Invalid token"}
-        )
-
-    # Extract user ID from token
-    user_id = payload.get("sub")
+    # Decode JWT token (verified tokens are cached until they expire)
+    user_id = decode_token(credentials.credentials)
     if not user_id:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
-            detail={"success": False, "error": "Invalid token payload"}
+            detail={"success": False, "error": "Invalid or expired token"}
         )
 
-    # Get user from database
-    query = select(User).where(User.id == user_id, User.is_active == True)
-    result = await db.execute(query)
-    user = result.scalar_one_or_none()
+    # Get user, from the cache when possible
+    user = await user_cache.get(db, user_id)
 
-    if not user:
+    if not user or not user.is_active:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail={"success": False, "error": "User not found or inactive"}
@@ -61,6 +43,15 @@ async def get_current_user(
     return user
 
 
+async def get_user_db(user_id: str = Depends(current_user_id)) -> AsyncSession:
+    """A session on the signed-in user's shard."""
+    async with shard_router.session_maker_for(user_id)() as session:
+        try:
+            yield session
+        finally:
+            await session.close()
+
+
 # Simplified optional authentication (used for sessions that can work without auth)
 async def get_optional_user(
     db: AsyncSession = Depends(get_db),
@@ -78,6 +69,35 @@ async def get_optional_user(
         return None
 
 
+def rate_limited(route_class: str):
+    """
+    Dependency admitting the caller to a rate-limited route class.
+
+    Over-limit requests get 429 with `Retry-After`; admitted ones hold an
+    in-flight slot until the response is done. The local user (GitHub not
+    configured, so every extension and browser shares that one id) is not
+    limited: there is nobody to protect the server from but the developer.
+    """
+    async def admit(user_id: str = Depends(current_user_id)):
+        if user_id == LOCAL_USER_ID:
+            yield
+            return
+        try:
+            key = await rate_limiter.acquire(route_class, user_id)
+        except RateLimited as exc:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail=str(exc),
+                headers={"Retry-After": retry_after_header(exc.retry_after)},
+            )
+        try:
+            yield
+        finally:
+            await rate_limiter.release(key)
+
+    return admit
+
+
 # Type aliases for dependency injection
 CurrentUserDep = Annotated[User, Depends(get_current_user)]
 OptionalUserDep = Annotated[User | None, Depends(get_optional_user)]
\ No newline at end of file
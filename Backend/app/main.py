@@ -3,18 +3,54 @@ from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 
 from app.config import settings
-from app.database import create_tables, close_db
-from app.routers import auth, health, sessions
+from app.database import close_db, engine, primary_tables
+from app.middleware import (
+    CompressionMiddleware, LoadSheddingMiddleware, MetricsMiddleware, QueryProfilerMiddleware, RequestIdMiddleware,
+)
+from app.middleware.load_shedding import ClassBudget
+from app.migrations import prepare_database
+from app.routers import auth, health, metrics, sessions
+from app.services.extension_client import extension_client
+from app.services.http_client import close_http_client
+from app.services.rate_limiter import rate_limiter
+from app.services.sync_scheduler import sync_scheduler
+from app.sharding import SHARDED_TABLES, shard_router
+from app.utils.process_lock import ProcessLock
+from app.utils.startup import startup_timer
+from app.utils.structured_logging import configure_logging, stop_logging
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan manager."""
-    # Startup
-    await create_tables()
+    # Startup. With several workers, one at a time creates and migrates tables,
+    # and only the worker that wins the scheduler lock runs background sync.
+    configure_logging()
+    startup_timer.imports_done()
+    with startup_timer.phase("schema"):
+        async with ProcessLock("startup"):
+            ran_ddl = await prepare_database(engine, primary_tables())
+            if shard_router.enabled:
+                for shard_engine in shard_router.engines():
+                    ran_ddl = await prepare_database(shard_engine, SHARDED_TABLES) or ran_ddl
+    startup_timer.notes["schema"] = "created/migrated" if ran_ddl else "up to date, DDL skipped"
+    with startup_timer.phase("extension registry"):
+        await extension_client.start()
+    scheduler_lock = ProcessLock("scheduler")
+    if settings.sync_scheduler_enabled and scheduler_lock.try_acquire():
+        with startup_timer.phase("sync scheduler"):
+            await sync_scheduler.start()
+    startup_timer.report()
     yield
     # Shutdown
+    await sync_scheduler.stop()
+    scheduler_lock.release()
+    await extension_client.close()
+    await close_http_client()
+    await rate_limiter.close()
+    await shard_router.close()
     await close_db()
+    stop_logging()
 
 
 # Create FastAPI application
@@ -25,6 +61,28 @@ app = FastAPI(
     lifespan=lifespan
 )
 
+# Per-request statement counts and timings, when enabled. Innermost, so queue
+# time spent in load shedding doesn't count as a slow request.
+if settings.query_profiler_enabled:
+    app.add_middleware(
+        QueryProfilerMiddleware,
+        slow_request_ms=settings.profiler_slow_request_ms,
+        max_statements=settings.profiler_max_statements,
+        repeat_threshold=settings.profiler_repeat_threshold,
+    )
+
+# Shed requests that queue too long, per request class. Added before CORS so
+# 503s still carry CORS headers.
+app.add_middleware(
+    LoadSheddingMiddleware,
+    enabled=settings.load_shedding_enabled,
+    budgets={
+        "ingest": ClassBudget(settings.shed_ingest_concurrency, settings.shed_ingest_queue_deadline),
+        "interactive": ClassBudget(settings.shed_interactive_concurrency, settings.shed_interactive_queue_deadline),
+        "report": ClassBudget(settings.shed_report_concurrency, settings.shed_report_queue_deadline),
+    },
+)
+
 # Add CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -34,10 +92,28 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress large responses for clients that accept it. Inside the metrics
+# middleware, so request durations include compression time.
+if settings.compression_enabled:
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=settings.compression_minimum_size,
+        gzip_level=settings.compression_gzip_level,
+        brotli_quality=settings.compression_brotli_quality,
+        zstd_level=settings.compression_zstd_level,
+    )
+
+# Outside shedding and CORS, so request metrics include shed and rejected requests.
+app.add_middleware(MetricsMiddleware)
+
+# Outermost, so everything logged while handling a request carries its id.
+app.add_middleware(RequestIdMiddleware)
+
 # Include routers
 app.include_router(auth.router)
 app.include_router(sessions.router)
 app.include_router(health.router)
+app.include_router(metrics.router)
 
 
 # Root endpoint
@@ -0,0 +1,236 @@
+"""
+In-process metrics.
+
+A deliberately small set of primitives — counters, gauges and histograms kept in
+a process-wide registry. Recording is a dict lookup and an addition under a
+lock, which is cheap enough to leave on for every request and every pool
+checkout. Values are per process; nothing here is shared between workers.
+
+`render` writes the registry in the Prometheus text exposition format, served
+at `/metrics`.
+"""
+
+import bisect
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+LabelValues = Tuple[str, ...]
+
+# Latency buckets in seconds, from sub-millisecond pool checkouts up to the
+# multi-second waits that mean something is badly saturated.
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+
+class Counter(_Metric):
+    """A value that only goes up."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self) -> List[Tuple[LabelValues, float]]:
+        with self._lock:
+            return list(self._values.items())
+
+
+class Gauge(_Metric):
+    """A value that can go up and down, or be read from a callback at collection time."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+        self._callback: Optional[Callable[[], Iterable[Tuple[LabelValues, float]]]] = None
+
+    def set(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    def set_function(self, callback: Callable[[], Iterable[Tuple[LabelValues, float]]]) -> None:
+        """Compute samples lazily; `callback` yields (label values, value) pairs."""
+        self._callback = callback
+
+    def samples(self) -> List[Tuple[LabelValues, float]]:
+        if self._callback is not None:
+            return list(self._callback())
+        with self._lock:
+            return list(self._values.items())
+
+
+class Histogram(_Metric):
+    """Cumulative-bucket histogram, as Prometheus expects it."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [per-bucket counts (+Inf last), sum, count]
+        self._values: Dict[LabelValues, list] = {}
+        self._callback: Optional[Callable[[], Iterable[Tuple[LabelValues, float]]]] = None
+
+    def set_function(self, callback: Callable[[], Iterable[Tuple[LabelValues, float]]]) -> None:
+        """
+        Build the histogram at collection time from the values `callback`
+        yields as (label values, value) pairs, for distributions of current
+        state (one value per item) rather than of events.
+        """
+        self._callback = callback
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def samples(self) -> List[Tuple[LabelValues, Dict[str, object]]]:
+        """Per label set: cumulative bucket counts, sum and count."""
+        if self._callback is not None:
+            values: Dict[LabelValues, list] = {}
+            for key, value in self._callback():
+                state = values.get(key)
+                if state is None:
+                    state = values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+                state[0][bisect.bisect_left(self.buckets, value)] += 1
+                state[1] += value
+                state[2] += 1
+            items = [(key, tuple(state)) for key, state in values.items()]
+        else:
+            with self._lock:
+                items = [(key, (list(state[0]), state[1], state[2])) for key, state in self._values.items()]
+
+        result = []
+        for key, (counts, total, count) in items:
+            cumulative, running = [], 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                running += bucket_count
+                cumulative.append((bound, running))
+            result.append((key, {"buckets": cumulative, "sum": total, "count": count}))
+        return result
+
+
+class Registry:
+    """Holds every metric so they can be collected in one pass."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def metrics(self) -> List[_Metric]:
+        with self._lock:
+            return list(self._metrics.values())
+
+
+registry = Registry()
+
+
+def counter(name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+    return registry.register(Counter(name, documentation, labelnames))
+
+
+def gauge(name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+    return registry.register(Gauge(name, documentation, labelnames))
+
+
+def histogram(
+    name: str,
+    documentation: str,
+    labelnames: Sequence[str] = (),
+    buckets: Sequence[float] = DEFAULT_BUCKETS,
+) -> Histogram:
+    return registry.register(Histogram(name, documentation, labelnames, buckets))
+
+
+# Prometheus text exposition format, version 0.0.4.
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if value == float("-inf"):
+        return "-Inf"
+    if isinstance(value, int) or (isinstance(value, float) and value.is_integer()):
+        return str(int(value))
+    return repr(float(value))
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def render(target: Optional[Registry] = None) -> str:
+    """Every metric in the registry, in the Prometheus text format."""
+    lines: List[str] = []
+    for metric in (target or registry).metrics():
+        lines.append(f"# HELP {metric.name} {_escape(metric.documentation)}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        if isinstance(metric, Histogram):
+            for values, state in metric.samples():
+                for bound, count in state["buckets"]:
+                    le = f'le="{_format_value(bound)}"'
+                    lines.append(f"{metric.name}_bucket{_labels(metric.labelnames, values, le)} {count}")
+                labels = _labels(metric.labelnames, values)
+                lines.append(f"{metric.name}_sum{labels} {_format_value(state['sum'])}")
+                lines.append(f"{metric.name}_count{labels} {state['count']}")
+        else:
+            for values, value in metric.samples():
+                lines.append(f"{metric.name}{_labels(metric.labelnames, values)} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
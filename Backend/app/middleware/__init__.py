@@ -0,0 +1,14 @@
+# ASGI middleware for AFK Coding Monitor Backend
+from .compression import CompressionMiddleware
+from .load_shedding import LoadSheddingMiddleware
+from .metrics import MetricsMiddleware
+from .profiler import QueryProfilerMiddleware
+from .request_id import RequestIdMiddleware
+
+__all__ = [
+    "CompressionMiddleware",
+    "LoadSheddingMiddleware",
+    "MetricsMiddleware",
+    "QueryProfilerMiddleware",
+    "RequestIdMiddleware",
+]
@@ -0,0 +1,249 @@
+"""
+Response compression negotiated from `Accept-Encoding`.
+
+gzip is always available; zstd (`pip install zstandard`) and brotli
+(`pip install brotli`) are offered when installed. Among the encodings the
+client accepts, the highest `q` wins, ties going to zstd, then br, then gzip.
+`*` weights every encoding not listed by name, and the body goes out
+uncompressed when the client weights `identity` above all of them (RFC 9110
+§12.5.3).
+
+- Bodies sent in one piece are compressed only from `minimum_size` bytes: the
+  stats payloads are a few hundred bytes, where the encoding header and CPU
+  cost more than they save.
+- Streamed bodies (`more_body`) are compressed chunk by chunk and flushed
+  after each, so the client receives data as it is produced rather than when
+  the stream ends.
+- Responses that already carry a `Content-Encoding`, or whose content type is
+  already compressed (images, archives), are passed through.
+- Bodies or chunks from `THREAD_OFFLOAD_SIZE` bytes are compressed in a worker
+  thread (all three libraries release the GIL), so a full-history response
+  doesn't hold the event loop for tens of milliseconds.
+
+Levels are per encoding; `python -m benchmarks.bench_compression` shows the
+bytes saved against CPU time for each on a session page and a full history.
+"""
+
+import asyncio
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+from app import metrics
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # optional dependency
+    zstandard = None
+
+RESPONSE_BYTES = metrics.counter(
+    "afk_compressed_response_bytes_total",
+    "Bytes of compressed responses before and after compression, by encoding",
+    ["encoding", "stage"],
+)
+
+# Server preference when the client weights several encodings equally.
+PREFERENCE = ("zstd", "br", "gzip")
+
+THREAD_OFFLOAD_SIZE = 256 * 1024
+
+_COMPRESSIBLE_TYPES = (b"text/", b"application/json", b"application/javascript", b"application/xml", b"image/svg+xml")
+
+
+class _Gzip:
+    def __init__(self, level: int):
+        self._stream = zlib.compressobj(level, zlib.DEFLATED, 31)  # 31: gzip container
+
+    def compress(self, data: bytes) -> bytes:
+        return self._stream.compress(data) + self._stream.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self, data: bytes = b"") -> bytes:
+        return self._stream.compress(data) + self._stream.flush()
+
+
+class _Brotli:
+    def __init__(self, quality: int):
+        self._stream = brotli.Compressor(quality=quality)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._stream.process(data) + self._stream.flush()
+
+    def finish(self, data: bytes = b"") -> bytes:
+        return self._stream.process(data) + self._stream.finish()
+
+
+class _Zstd:
+    def __init__(self, level: int):
+        self._stream = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._stream.compress(data) + self._stream.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self, data: bytes = b"") -> bytes:
+        return self._stream.compress(data) + self._stream.flush()
+
+
+def available_encodings() -> List[str]:
+    return [
+        encoding for encoding in PREFERENCE
+        if encoding == "gzip" or (encoding == "br" and brotli) or (encoding == "zstd" and zstandard)
+    ]
+
+
+def _weight(params: List[str]) -> float:
+    """The `q` among a coding's parameters; 1 without one, 0 if it isn't a valid qvalue."""
+    for param in params:
+        key, _, value = param.partition("=")
+        if key.strip().lower() == "q":
+            try:
+                q = float(value.strip())
+            except ValueError:
+                return 0.0
+            return q if 0.0 <= q <= 1.0 else 0.0
+    return 1.0
+
+
+def negotiate(accept_encoding: str, offered: List[str]) -> Optional[str]:
+    """
+    The offered encoding the client weights highest, or None for identity.
+
+    Encodings not named are weighted by `*`, or unacceptable without it.
+    Identity is weighted by `identity`, else by `*`; named by neither, it is
+    acceptable but loses to any encoding with a q above 0. When nothing is
+    acceptable — `identity;q=0` with no usable encoding — the body is still
+    sent uncompressed, as RFC 9110 recommends over an error.
+    """
+    weights: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        name, *params = part.split(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        weights["gzip" if name == "x-gzip" else name] = _weight(params)
+
+    best, best_q = None, 0.0
+    for encoding in offered:
+        q = weights.get(encoding, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    identity_q = weights.get("identity", weights.get("*"))
+    if identity_q is not None and identity_q > best_q:
+        return None
+    return best
+
+
+class CompressionMiddleware:
+    def __init__(self, app, minimum_size: int, gzip_level: int, brotli_quality: int, zstd_level: int):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.offered = available_encodings()
+        self._factories = {
+            "gzip": lambda: _Gzip(gzip_level),
+            "br": lambda: _Brotli(brotli_quality),
+            "zstd": lambda: _Zstd(zstd_level),
+        }
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        accept = next((value for name, value in scope["headers"] if name == b"accept-encoding"), None)
+        encoding = negotiate(accept.decode("latin-1"), self.offered) if accept else None
+        if encoding is None or scope["method"] == "HEAD":
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        compressor = None
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start_message, compressor, passthrough
+            if passthrough:
+                await send(message)
+                return
+            if message["type"] == "http.response.start":
+                if _should_skip(message):
+                    passthrough = True
+                    await send(message)
+                else:
+                    start_message = message  # sent once the first body chunk shows how big the body is
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if compressor is None:
+                if not more_body and len(body) < self.minimum_size:
+                    passthrough = True
+                    await send(start_message)
+                    await send(message)
+                    return
+                compressor = self._factories[encoding]()
+                headers = _encoded_headers(start_message["headers"], encoding)
+                if not more_body:
+                    compressed = await _run(compressor.finish, body)
+                    headers.append((b"content-length", str(len(compressed)).encode()))
+                    _count(encoding, len(body), len(compressed))
+                    await send({**start_message, "headers": headers})
+                    await send({"type": "http.response.body", "body": compressed})
+                    return
+                await send({**start_message, "headers": headers})
+
+            chunk = await _run(compressor.compress if more_body else compressor.finish, body)
+            _count(encoding, len(body), len(chunk))
+            await send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+
+        await self.app(scope, receive, send_compressed)
+
+
+async def _run(compress, data: bytes) -> bytes:
+    if len(data) >= THREAD_OFFLOAD_SIZE:
+        return await asyncio.to_thread(compress, data)
+    return compress(data)
+
+
+def _should_skip(start_message) -> bool:
+    if start_message["status"] < 200 or start_message["status"] in (204, 304):
+        return True
+    content_type = b""
+    for name, value in start_message.get("headers", []):
+        name = name.lower()
+        if name == b"content-encoding":
+            return True
+        if name == b"content-type":
+            content_type = value.lower()
+    return not content_type.startswith(_COMPRESSIBLE_TYPES)
+
+
+def _encoded_headers(headers, encoding: str) -> List[Tuple[bytes, bytes]]:
+    """Response headers without the now-wrong length, plus the encoding and Vary."""
+    result = []
+    vary = None
+    for name, value in headers:
+        lowered = name.lower()
+        if lowered == b"content-length":
+            continue
+        if lowered == b"vary":
+            vary = value
+            continue
+        result.append((name, value))
+    if vary is None:
+        vary = b"Accept-Encoding"
+    elif b"accept-encoding" not in vary.lower():
+        vary += b", Accept-Encoding"
+    result.append((b"vary", vary))
+    result.append((b"content-encoding", encoding.encode()))
+    return result
+
+
+def _count(encoding: str, original: int, compressed: int) -> None:
+    RESPONSE_BYTES.inc(original, encoding=encoding, stage="original")
+    RESPONSE_BYTES.inc(compressed, encoding=encoding, stage="compressed")
@@ -0,0 +1,170 @@
+"""
+Priority-aware admission: per-class concurrency budgets with queue deadlines.
+
+Requests are sorted into three classes:
+
+- ``ingest``: session writes from the extension (``POST /api/sessions``)
+- ``interactive``: what the dashboard needs to render (session lists,
+  project/language pickers, ``/api/auth/me``)
+- ``report``: the aggregate ``/api/sessions/stats*`` queries
+
+Each class runs at most `concurrency` requests at once and queues the rest in
+arrival order. A queued request that hasn't started within the class's
+`queue_deadline` is answered with 503 and `Retry-After` straight away, rather
+than waiting for a slot only to time out further down. Because the budgets are
+separate, an ingest storm fills the ingest queue and sheds there, while
+dashboard requests keep their own slots and a bounded wait.
+
+Anything unclassified (health, docs, the root) passes through untouched.
+"""
+
+import asyncio
+import json
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Deque, Dict, Optional
+
+from app import metrics
+
+SHED_REQUESTS = metrics.counter(
+    "afk_shed_requests_total",
+    "Requests answered 503 because they waited past their class deadline",
+    ["request_class"],
+)
+ADMISSION_WAIT_SECONDS = metrics.histogram(
+    "afk_admission_wait_seconds",
+    "Time admitted requests spent queued for a slot",
+    ["request_class"],
+)
+
+
+@dataclass(frozen=True)
+class ClassBudget:
+    concurrency: int
+    queue_deadline: float  # seconds a request may wait before it is shed
+
+
+def classify(method: str, path: str) -> Optional[str]:
+    """The request class for a route, or None to leave it unmanaged."""
+    if path == "/api/sessions" or path == "/api/sessions/":
+        return "ingest" if method == "POST" else "interactive"
+    if path.startswith("/api/sessions/stats"):
+        return "report"
+    if path.startswith("/api/sessions/") or path == "/api/auth/me":
+        return "interactive"
+    return None
+
+
+class _Lane:
+    """FIFO admission for one class. Slots are handed straight to the next waiter."""
+
+    def __init__(self, budget: ClassBudget):
+        self.budget = budget
+        self.active = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self) -> bool:
+        """Take a slot; False if the deadline passed first."""
+        if self.active < self.budget.concurrency and not self._waiters:
+            self.active += 1
+            return True
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.budget.queue_deadline)
+            return True
+        except asyncio.TimeoutError:
+            if waiter.done() and not waiter.cancelled():
+                return True  # handed a slot at the last moment
+            waiter.cancel()
+            return False
+        except asyncio.CancelledError:
+            # Client went away while queued: give back a slot if we'd been handed one.
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            else:
+                waiter.cancel()
+            raise
+        finally:
+            try:
+                self._waiters.remove(waiter)
+            except ValueError:
+                pass
+
+    def release(self) -> None:
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)  # the slot passes over; `active` is unchanged
+                return
+        self.active -= 1
+
+
+# Lanes of the running middleware, read by the gauges below.
+_lanes: Dict[str, _Lane] = {}
+
+
+class LoadSheddingMiddleware:
+    def __init__(self, app, budgets: Dict[str, ClassBudget], enabled: bool = True):
+        self.app = app
+        self.enabled = enabled
+        self.lanes = {name: _Lane(budget) for name, budget in budgets.items()}
+        _lanes.clear()
+        _lanes.update(self.lanes)
+
+    async def __call__(self, scope, receive, send):
+        if not self.enabled or scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_class = classify(scope["method"], scope["path"])
+        lane = self.lanes.get(request_class) if request_class else None
+        if lane is None:
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        if not await lane.acquire():
+            SHED_REQUESTS.inc(request_class=request_class)
+            await self._shed(send, lane)
+            return
+        ADMISSION_WAIT_SECONDS.observe(time.perf_counter() - started, request_class=request_class)
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            lane.release()
+
+    @staticmethod
+    async def _shed(send, lane: _Lane) -> None:
+        body = json.dumps({"success": False, "error": "Server busy, please retry shortly"}).encode()
+        retry_after = max(1, round(lane.budget.queue_deadline))
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(retry_after).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+
+def _lane_samples(attribute: str):
+    for name, lane in _lanes.items():
+        yield (name,), getattr(lane, attribute)
+
+
+metrics.gauge(
+    "afk_admission_active", "Requests holding a slot, by class", ["request_class"]
+).set_function(lambda: _lane_samples("active"))
+metrics.gauge(
+    "afk_admission_queued", "Requests waiting for a slot, by class", ["request_class"]
+).set_function(lambda: _lane_samples("queued"))
@@ -0,0 +1,69 @@
+"""
+Per-route request metrics: latency, status counts and requests in flight.
+
+Requests are labelled by route template (`/api/sessions/stats/daily`), not the
+raw path, so label cardinality stays fixed; anything no route matched is
+`unmatched`. Recording costs two clock reads and three metric updates per
+request.
+"""
+
+import time
+from typing import Dict
+
+from app import metrics
+
+REQUEST_SECONDS = metrics.histogram(
+    "afk_http_request_duration_seconds",
+    "Time from receiving a request to finishing its response",
+    ["method", "route"],
+)
+REQUESTS = metrics.counter(
+    "afk_http_requests_total",
+    "Requests by route and response status",
+    ["method", "route", "status"],
+)
+IN_FLIGHT = metrics.gauge(
+    "afk_http_requests_in_flight",
+    "Requests currently being handled",
+)
+
+
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+        # Routed endpoint -> path template, filled from the app's routes on first miss.
+        self._templates: Dict[object, str] = {}
+
+    def _route(self, scope) -> str:
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return "unmatched"
+        template = self._templates.get(endpoint)
+        if template is None:
+            for route in scope["app"].routes:
+                self._templates.setdefault(getattr(route, "endpoint", None), getattr(route, "path", "unmatched"))
+            template = self._templates.get(endpoint, "unmatched")
+        return template
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500  # if the app raises before responding
+        started = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            IN_FLIGHT.dec()
+            route = self._route(scope)
+            REQUEST_SECONDS.observe(time.perf_counter() - started, method=scope["method"], route=route)
+            REQUESTS.inc(method=scope["method"], route=route, status=str(status))
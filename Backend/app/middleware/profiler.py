@@ -0,0 +1,129 @@
+"""
+Opt-in per-request query profiler.
+
+With `query_profiler_enabled`, every SQL statement a request runs is recorded
+against that request (via a context variable the engine events read), and:
+
+- the response carries a `Server-Timing` header with the statement count and
+  database time beside the total, visible in the browser's network panel;
+- a request over `profiler_slow_request_ms` or `profiler_max_statements` is
+  logged with each statement, its parameters and timing;
+- a statement executed `profiler_repeat_threshold` times or more in one
+  request is flagged as a likely N+1 pattern, whatever the totals.
+
+Off by default: it keeps every statement and its parameters until the request
+ends. Statements outside a request (startup, background sync) aren't recorded.
+"""
+
+import contextvars
+import logging
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+MAX_LOGGED_PARAMETERS = 200  # characters of each statement's parameters in the slow log
+
+
+@dataclass
+class RequestProfile:
+    statements: List[Tuple[str, object, float]] = field(default_factory=list)
+
+    @property
+    def db_seconds(self) -> float:
+        return sum(seconds for _, _, seconds in self.statements)
+
+    def repeated(self, threshold: int) -> List[Tuple[str, int]]:
+        counts = Counter(statement for statement, _, _ in self.statements)
+        return [(statement, count) for statement, count in counts.most_common() if count >= threshold]
+
+
+_current_profile: contextvars.ContextVar[Optional[RequestProfile]] = contextvars.ContextVar(
+    "afk_request_profile", default=None
+)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current_profile.get() is not None:
+        conn.info.setdefault("afk_profile_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = _current_profile.get()
+    if profile is None:
+        return
+    stack = conn.info.get("afk_profile_started")
+    if stack:
+        profile.statements.append((statement, parameters, time.perf_counter() - stack.pop()))
+
+
+def _handle_error(context):
+    stack = context.connection.info.get("afk_profile_started") if context.connection is not None else None
+    if stack:
+        stack.pop()
+
+
+def _install_listeners() -> None:
+    # Registered on the Engine class, so shard engines created later are covered too.
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(Engine, "handle_error", _handle_error)
+
+
+class QueryProfilerMiddleware:
+    def __init__(self, app, slow_request_ms: float, max_statements: int, repeat_threshold: int):
+        self.app = app
+        self.slow_request_ms = slow_request_ms
+        self.max_statements = max_statements
+        self.repeat_threshold = repeat_threshold
+        _install_listeners()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile()
+        token = _current_profile.set(profile)
+        started = time.perf_counter()
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                total_ms = (time.perf_counter() - started) * 1000
+                timing = (
+                    f'db;dur={profile.db_seconds * 1000:.1f};desc="{len(profile.statements)} statements", '
+                    f"total;dur={total_ms:.1f}"
+                )
+                message = {**message, "headers": [*message.get("headers", []), (b"server-timing", timing.encode())]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current_profile.reset(token)
+            self._report(scope, profile, (time.perf_counter() - started) * 1000)
+
+    def _report(self, scope, profile: RequestProfile, total_ms: float) -> None:
+        request = f"{scope['method']} {scope['path']}"
+        repeated = profile.repeated(self.repeat_threshold)
+        for statement, count in repeated:
+            logger.warning(
+                "Possible N+1 in %s: statement ran %d times: %s", request, count, " ".join(statement.split())
+            )
+
+        if total_ms < self.slow_request_ms and len(profile.statements) <= self.max_statements:
+            return
+        lines = [
+            f"  {seconds * 1000:7.1f} ms  {' '.join(statement.split())}  {str(parameters)[:MAX_LOGGED_PARAMETERS]}"
+            for statement, parameters, seconds in profile.statements
+        ]
+        logger.warning(
+            "Slow request %s: %.1f ms total, %d statements, %.1f ms in the database\n%s",
+            request, total_ms, len(profile.statements), profile.db_seconds * 1000, "\n".join(lines),
+        )
@@ -0,0 +1,42 @@
+"""
+Request ids for log correlation.
+
+Each HTTP request gets an id, taken from an incoming `X-Request-ID` header
+when the client or a proxy sent a sensible one and generated otherwise. It is
+set in `request_id_var` for the duration of the request, so every record
+logged while handling it carries the id, and returned as `X-Request-ID`.
+"""
+
+import re
+import uuid
+
+from app.utils.structured_logging import request_id_var
+
+_VALID_ID = re.compile(rb"[A-Za-z0-9._:-]{1,64}")
+
+
+class RequestIdMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        incoming = next((value for name, value in scope["headers"] if name == b"x-request-id"), None)
+        if incoming is not None and _VALID_ID.fullmatch(incoming):
+            request_id = incoming.decode()
+        else:
+            request_id = uuid.uuid4().hex
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                message = {**message, "headers": [*message.get("headers", []), (b"x-request-id", request_id.encode())]}
+            await send(message)
+
+        token = request_id_var.set(request_id)
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            request_id_var.reset(token)
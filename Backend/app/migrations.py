@@ -0,0 +1,136 @@
+"""
+Schema migrations.
+
+`create_all` creates missing tables but never alters an existing one. Changes to
+existing tables are listed here in order. Each database records the last
+migration applied in a one-row `schema_version` table, so a migration runs once
+per database — the primary and every shard alike.
+
+Migrations receive a synchronous connection inside the startup transaction and
+must tolerate a freshly created schema, where `create_all` has already added
+whatever they would.
+
+Alongside the version, each database records a fingerprint of the tables it
+was created with. At startup `prepare_database` reads that one row, and when
+both match it skips `create_all` and its per-table introspection entirely.
+"""
+
+import hashlib
+import logging
+from typing import Callable, List, Sequence, Tuple
+
+from sqlalchemy import Column, Integer, MetaData, String, Table, inspect, select, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.database import Base
+from app.models import FileSession
+
+logger = logging.getLogger(__name__)
+
+# Kept out of Base.metadata: shards only create the tables they hold, but every
+# database tracks its own version.
+schema_version = Table(
+    "schema_version",
+    MetaData(),
+    Column("version", Integer, nullable=False),
+    Column("fingerprint", String, nullable=True),
+)
+
+
+def _add_session_time_columns(conn: Connection) -> None:
+    inspector = inspect(conn)
+    if FileSession.__tablename__ not in inspector.get_table_names():
+        return
+
+    existing = {column["name"] for column in inspector.get_columns(FileSession.__tablename__)}
+    for name in ("start_epoch", "end_epoch", "start_day", "start_hour"):
+        if name not in existing:
+            conn.execute(text(f"ALTER TABLE file_sessions ADD COLUMN {name} INTEGER"))
+    for index in FileSession.__table__.indexes:
+        index.create(conn, checkfirst=True)
+
+    # Timestamps are stored as naive UTC text, which strftime('%s') reads directly.
+    result = conn.execute(text(
+        "UPDATE file_sessions SET "
+        "start_epoch = CAST(strftime('%s', session_start_time) AS INTEGER), "
+        "end_epoch = CAST(strftime('%s', session_end_time) AS INTEGER) "
+        "WHERE start_epoch IS NULL"
+    ))
+    conn.execute(text(
+        "UPDATE file_sessions SET "
+        "start_day = start_epoch / 86400, "
+        "start_hour = (start_epoch % 86400) / 3600 "
+        "WHERE start_day IS NULL AND start_epoch IS NOT NULL"
+    ))
+    logger.info("Backfilled epoch/day/hour columns for %d sessions", result.rowcount)
+
+
+def _add_schema_fingerprint(conn: Connection) -> None:
+    existing = {column["name"] for column in inspect(conn).get_columns(schema_version.name)}
+    if "fingerprint" not in existing:
+        conn.execute(text("ALTER TABLE schema_version ADD COLUMN fingerprint VARCHAR"))
+
+
+MIGRATIONS: List[Tuple[int, str, Callable[[Connection], None]]] = [
+    (1, "epoch, day and hour columns on file_sessions", _add_session_time_columns),
+    (2, "schema fingerprint on schema_version", _add_schema_fingerprint),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def _current_version(conn: Connection) -> int:
+    schema_version.create(conn, checkfirst=True)
+    return conn.execute(select(schema_version.c.version)).scalar() or 0
+
+
+def _migrate(conn: Connection, fingerprint: str) -> None:
+    version = _current_version(conn)
+    for target, description, migration in MIGRATIONS:
+        if target <= version:
+            continue
+        logger.info("Applying migration %d: %s", target, description)
+        migration(conn)
+        version = target
+
+    conn.execute(schema_version.delete())
+    conn.execute(schema_version.insert().values(version=version, fingerprint=fingerprint))
+
+
+def schema_fingerprint(tables: Sequence[Table]) -> str:
+    """Digest of the tables' columns and indexes, and the latest migration."""
+    parts = [f"migrations:{LATEST_VERSION}"]
+    for table in sorted(tables, key=lambda t: t.name):
+        parts.append(f"table:{table.name}")
+        for column in table.columns:
+            parts.append(f"column:{column.name}:{column.type}:{column.nullable}:{column.primary_key}")
+        for index in sorted(table.indexes, key=lambda i: i.name or ""):
+            parts.append(f"index:{index.name}:{','.join(c.name for c in index.columns)}:{index.unique}")
+    return hashlib.sha256("\n".join(parts).encode()).hexdigest()
+
+
+async def prepare_database(engine: AsyncEngine, tables: Sequence[Table]) -> bool:
+    """
+    Create and migrate one database, unless it already records this schema.
+
+    Returns True if DDL ran, False if the recorded version and fingerprint
+    matched and startup skipped straight past it.
+    """
+    fingerprint = schema_fingerprint(tables)
+    try:
+        async with engine.connect() as conn:
+            row = (await conn.execute(select(schema_version.c.version, schema_version.c.fingerprint))).first()
+    except DBAPIError:
+        row = None  # new database, or one from before fingerprints
+    if row is not None and row.version == LATEST_VERSION and row.fingerprint == fingerprint:
+        return False
+
+    def create_and_migrate(conn: Connection) -> None:
+        Base.metadata.create_all(conn, tables=tables)
+        _migrate(conn, fingerprint)
+
+    async with engine.begin() as conn:
+        await conn.run_sync(create_and_migrate)
+    return True
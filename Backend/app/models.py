@@ -1,8 +1,12 @@
 from sqlalchemy import Column, String, Integer, DateTime, Boolean, Text, Float, ForeignKey, Index
 from sqlalchemy.orm import relationship
-from datetime import datetime, timezone
+from datetime import date, datetime, timedelta, timezone
+from typing import Optional
 from app.database import Base
 
+SECONDS_PER_DAY = 86400
+EPOCH_DATE = date(1970, 1, 1)
+
 
 class FileSession(Base):
     __tablename__ = "file_sessions"
@@ -25,6 +29,15 @@ class FileSession(Base):
     session_end_time = Column(DateTime, nullable=True)
     total_duration = Column(Integer, default=0)  # seconds
     
+    # Denormalised time columns, all UTC: start/end as epoch seconds, plus the
+    # day (days since 1970-01-01) and hour of day the session started in, so
+    # range filters and daily/hourly grouping are integer work in the database.
+    # Populate them with `session_time_columns` wherever the times are written.
+    start_epoch = Column(Integer, nullable=True)
+    end_epoch = Column(Integer, nullable=True)
+    start_day = Column(Integer, nullable=True)
+    start_hour = Column(Integer, nullable=True)
+    
     # Edit Statistics
     lines_added = Column(Integer, default=0)
     lines_deleted = Column(Integer, default=0)
@@ -51,9 +64,71 @@ class FileSession(Base):
         Index('idx_session_project', 'project_name'),
         Index('idx_session_language', 'language'),
         Index('idx_session_start_time', 'session_start_time'),
+        Index('idx_session_user_start_epoch', 'user_id', 'start_epoch'),
+        Index('idx_session_user_start_day', 'user_id', 'start_day'),
+        Index('idx_session_user_start_hour', 'user_id', 'start_hour'),
     )
 
 
+def to_epoch(value: Optional[datetime]) -> Optional[int]:
+    """Epoch seconds for a datetime; naive values are taken to be UTC, as stored."""
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return int(value.timestamp())
+
+
+def epoch_day_to_date(day: int) -> date:
+    return EPOCH_DATE + timedelta(days=day)
+
+
+def session_time_columns(start: datetime, end: Optional[datetime]) -> dict:
+    """Values for the denormalised time columns of a session."""
+    start_epoch = to_epoch(start)
+    return {
+        "start_epoch": start_epoch,
+        "end_epoch": to_epoch(end),
+        "start_day": start_epoch // SECONDS_PER_DAY,
+        "start_hour": (start_epoch % SECONDS_PER_DAY) // 3600,
+    }
+
+
+class SessionAlias(Base):
+    """
+    A session id that was folded into another row by coalescing, so a resend
+    of that id is recognised as already counted instead of stored again.
+    """
+    __tablename__ = "session_aliases"
+    
+    user_id = Column(String, primary_key=True)
+    session_id = Column(String, primary_key=True)
+    row_id = Column(String, nullable=False)  # the file_sessions row it was merged into
+    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+
+
+class ExtensionEndpoint(Base):
+    """Where each user's extension was last found, so discovery survives restarts."""
+    __tablename__ = "extension_endpoints"
+    
+    user_id = Column(String, primary_key=True)
+    github_id = Column(String, nullable=True)
+    host = Column(String, nullable=False)
+    port = Column(Integer, nullable=False)
+    endpoint = Column(String, nullable=False)
+    last_seen = Column(DateTime, nullable=False)
+    is_active = Column(Boolean, default=True)
+
+
+class SyncCursor(Base):
+    """Per-user pull-sync watermark: the extension's `lastSyncTime` from the last stored page."""
+    __tablename__ = "sync_cursors"
+    
+    user_id = Column(String, primary_key=True)
+    last_sync_time = Column(DateTime, nullable=False)
+    updated_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+
+
 # Legacy models for backward compatibility (can be removed later)
 class User(Base):
     __tablename__ = "users"
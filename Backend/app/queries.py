@@ -0,0 +1,248 @@
+"""
+Cached statements for the hot query shapes.
+
+Every request used to build a fresh `select(FileSession).where(...)` tree, and
+SQLAlchemy then walked that tree to compute its cache key before it could reuse
+the compiled SQL. Lambda statements are keyed on the lambdas' code locations
+instead: the tree is built and compiled once per distinct combination of
+filters, and afterwards each call only extracts the closure values as bound
+parameters.
+
+Only plain values may be closed over here (ids, names, datetimes, ints) — they
+become parameters. Anything that changes the *shape* of the SQL must be decided
+outside a lambda, by choosing whether to append it.
+"""
+
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import and_, desc, distinct, func, lambda_stmt, literal, select
+from sqlalchemy.sql.lambdas import StatementLambdaElement
+
+from app.models import FileSession, SessionAlias, User, to_epoch
+
+
+def session_with_alias(session_id: str, user_id: str) -> StatementLambdaElement:
+    """
+    One row: the user's session with this id (or None), and the row the id
+    was merged into (or None), so ingest learns both in one round trip.
+    """
+    return lambda_stmt(
+        lambda: select(
+            FileSession,
+            select(SessionAlias.row_id)
+            .where(SessionAlias.user_id == user_id, SessionAlias.session_id == session_id)
+            .scalar_subquery(),
+        )
+        .select_from(select(literal(1)).subquery())
+        .outerjoin(FileSession, and_(FileSession.id == session_id, FileSession.user_id == user_id))
+    )
+
+
+def session_alias_target(session_id: str, user_id: str) -> StatementLambdaElement:
+    """Id of the row one of the user's session ids was merged into, if it was."""
+    return lambda_stmt(
+        lambda: select(SessionAlias.row_id).where(SessionAlias.user_id == user_id, SessionAlias.session_id == session_id)
+    )
+
+
+def user_latest_session(user_id: str) -> StatementLambdaElement:
+    """What coalescing needs of the user's most recently started session."""
+    return lambda_stmt(
+        lambda: select(
+            FileSession.id,
+            FileSession.file_path,
+            FileSession.editor,
+            FileSession.session_end_time,
+            FileSession.start_epoch,
+        )
+        .where(FileSession.user_id == user_id)
+        .order_by(desc(FileSession.start_epoch))
+        .limit(1)
+    )
+
+
+def _filter_sessions(
+    stmt: StatementLambdaElement,
+    project_name: Optional[str],
+    language: Optional[str],
+    start: Optional[datetime],
+    end: Optional[datetime],
+) -> StatementLambdaElement:
+    if project_name:
+        stmt += lambda s: s.where(FileSession.project_name == project_name)
+    if language:
+        stmt += lambda s: s.where(FileSession.language == language)
+    # Range filters compare the integer start_epoch column, not the datetime.
+    if start:
+        start_epoch = to_epoch(start)
+        stmt += lambda s: s.where(FileSession.start_epoch >= start_epoch)
+    if end:
+        end_epoch = to_epoch(end)
+        stmt += lambda s: s.where(FileSession.start_epoch <= end_epoch)
+    return stmt
+
+
+def user_sessions(
+    user_id: str,
+    project_name: Optional[str] = None,
+    language: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+) -> StatementLambdaElement:
+    """The user's sessions, optionally filtered by project, language and start time."""
+    stmt = lambda_stmt(lambda: select(FileSession).where(FileSession.user_id == user_id))
+    return _filter_sessions(stmt, project_name, language, start, end)
+
+
+def user_sessions_page(
+    user_id: str,
+    offset: int,
+    limit: int,
+    project_name: Optional[str] = None,
+    language: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+) -> StatementLambdaElement:
+    """A page of `user_sessions`, newest first."""
+    stmt = user_sessions(user_id, project_name, language, start, end)
+    stmt += lambda s: s.order_by(desc(FileSession.start_epoch)).offset(offset).limit(limit)
+    return stmt
+
+
+def user_session_count(
+    user_id: str,
+    project_name: Optional[str] = None,
+    language: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+) -> StatementLambdaElement:
+    """Number of rows `user_sessions` would return."""
+    stmt = lambda_stmt(
+        lambda: select(func.count()).select_from(FileSession).where(FileSession.user_id == user_id)
+    )
+    return _filter_sessions(stmt, project_name, language, start, end)
+
+
+def user_totals(
+    user_id: str,
+    project_name: Optional[str] = None,
+    language: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+) -> StatementLambdaElement:
+    """(session count, duration, lines added, deleted, modified, edits) over `user_sessions`."""
+    stmt = lambda_stmt(
+        lambda: select(
+            func.count(),
+            func.sum(FileSession.total_duration),
+            func.sum(FileSession.lines_added),
+            func.sum(FileSession.lines_deleted),
+            func.sum(FileSession.lines_modified),
+            func.sum(FileSession.total_edits),
+        )
+        .where(FileSession.user_id == user_id)
+    )
+    return _filter_sessions(stmt, project_name, language, start, end)
+
+
+def user_language_totals(
+    user_id: str,
+    project_name: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+) -> StatementLambdaElement:
+    """(language, total duration, session count) per language, longest first; no language is "Unknown"."""
+    stmt = lambda_stmt(
+        lambda: select(
+            func.coalesce(FileSession.language, "Unknown"),
+            func.coalesce(func.sum(FileSession.total_duration), 0),
+            func.count(),
+        )
+        .where(FileSession.user_id == user_id)
+    )
+    stmt = _filter_sessions(stmt, project_name, None, start, end)
+    stmt += lambda s: s.group_by(func.coalesce(FileSession.language, "Unknown")).order_by(
+        desc(func.coalesce(func.sum(FileSession.total_duration), 0))
+    )
+    return stmt
+
+
+def user_project_totals(
+    user_id: str,
+    language: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+) -> StatementLambdaElement:
+    """(project, total duration, session count) per project, longest first; no project is "Unknown"."""
+    stmt = lambda_stmt(
+        lambda: select(
+            func.coalesce(FileSession.project_name, "Unknown"),
+            func.coalesce(func.sum(FileSession.total_duration), 0),
+            func.count(),
+        )
+        .where(FileSession.user_id == user_id)
+    )
+    stmt = _filter_sessions(stmt, None, language, start, end)
+    stmt += lambda s: s.group_by(func.coalesce(FileSession.project_name, "Unknown")).order_by(
+        desc(func.coalesce(func.sum(FileSession.total_duration), 0))
+    )
+    return stmt
+
+
+def user_daily_totals(
+    user_id: str,
+    project_name: Optional[str] = None,
+    language: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+) -> StatementLambdaElement:
+    """(start_day, total duration, session count) per UTC day, oldest first."""
+    stmt = lambda_stmt(
+        lambda: select(FileSession.start_day, func.sum(FileSession.total_duration), func.count())
+        .where(FileSession.user_id == user_id)
+    )
+    stmt = _filter_sessions(stmt, project_name, language, start, end)
+    stmt += lambda s: s.group_by(FileSession.start_day).order_by(FileSession.start_day)
+    return stmt
+
+
+def user_hourly_totals(
+    user_id: str,
+    project_name: Optional[str] = None,
+    language: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+) -> StatementLambdaElement:
+    """(start_hour, total duration) per UTC hour of day."""
+    stmt = lambda_stmt(
+        lambda: select(FileSession.start_hour, func.sum(FileSession.total_duration))
+        .where(FileSession.user_id == user_id)
+    )
+    stmt = _filter_sessions(stmt, project_name, language, start, end)
+    stmt += lambda s: s.group_by(FileSession.start_hour)
+    return stmt
+
+
+def user_projects(user_id: str) -> StatementLambdaElement:
+    return lambda_stmt(
+        lambda: select(distinct(FileSession.project_name)).where(
+            FileSession.user_id == user_id, FileSession.project_name.isnot(None)
+        )
+    )
+
+
+def user_languages(user_id: str) -> StatementLambdaElement:
+    return lambda_stmt(
+        lambda: select(distinct(FileSession.language)).where(
+            FileSession.user_id == user_id, FileSession.language.isnot(None)
+        )
+    )
+
+
+def user_by_id(user_id: int) -> StatementLambdaElement:
+    return lambda_stmt(lambda: select(User).where(User.id == user_id))
+
+
+def active_user_by_id(user_id: int) -> StatementLambdaElement:
+    return lambda_stmt(lambda: select(User).where(User.id == user_id, User.is_active == True))
@@ -0,0 +1,66 @@
+"""
+Fast JSON responses for the session and stats routes.
+
+Routes declare `response_model=Union[SuccessResponse, ErrorResponse]`, and
+returning a `SuccessResponse` makes FastAPI validate the payload against that
+union, re-encode it with `jsonable_encoder` and then `json.dumps` the result,
+walking every session dict three times. `success_response` returns the
+envelope as a ready-made response instead, which FastAPI passes through as
+is, so the payload is serialised once. The route's `response_model` still
+documents it in the OpenAPI schema.
+
+Serialisation uses orjson when it is installed (`pip install orjson`) and the
+standard library otherwise. Both render datetimes the way pydantic does: ISO
+8601, `Z` for UTC.
+"""
+
+import json
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from enum import Enum
+from typing import Any
+
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+from app.config import settings
+from app.schemas import SuccessResponse
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+
+def _default(value: Any) -> Any:
+    """Types neither encoder handles natively."""
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (set, frozenset, tuple)):
+        return list(value)
+    if orjson is None:
+        if isinstance(value, datetime):
+            if value.utcoffset() == timedelta(0):
+                return value.replace(tzinfo=None).isoformat() + "Z"
+            return value.isoformat()
+        if isinstance(value, (date, time)):
+            return value.isoformat()
+        if isinstance(value, Enum):
+            return value.value
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        if orjson is not None:
+            return orjson.dumps(content, default=_default, option=orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS)
+        return json.dumps(content, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def success_response(data: Any = None):
+    """The `{"success": true, "data": ...}` envelope, serialised once."""
+    if not settings.fast_json_responses:
+        return SuccessResponse(data=data)
+    return FastJSONResponse({"success": True, "data": data})
@@ -11,10 +11,13 @@ up credentials. That fallback is refused once GitHub is configured, and refused
 outright outside debug mode, so it cannot become a production backdoor.
 """
 
+import asyncio
+import hashlib
+import hmac
+import time
 from datetime import datetime, timedelta, timezone
-from typing import Optional, Union
+from typing import Optional, Tuple, Union
 
-import httpx
 from fastapi import APIRouter, Depends, Header, HTTPException, status
 from jose import JWTError, jwt
 from pydantic import BaseModel
@@ -25,12 +28,15 @@ from app.config import settings
 from app.database import get_db
 from app.models import User
 from app.schemas import ErrorResponse, SuccessResponse
+from app.services.http_client import get_http_client
+from app.services.user_cache import user_cache
+from app.utils.cache import TTLCache
 
 router = APIRouter(prefix="/api/auth", tags=["authentication"])
 
-GITHUB_TOKEN_URL = "https://github.com/login/oauth/access_token"
-GITHUB_USER_URL = "https://api.github.com/user"
-GITHUB_EMAILS_URL = "https://api.github.com/user/emails"
+GITHUB_TOKEN_URL = f"{settings.github_oauth_url}/login/oauth/access_token"
+GITHUB_USER_URL = f"{settings.github_api_url}/user"
+GITHUB_EMAILS_URL = f"{settings.github_api_url}/user/emails"
 
 LOCAL_USER_ID = "dev-user"
 
@@ -49,12 +55,46 @@ def create_access_token(subject: str) -> str:
     return jwt.encode(payload, settings.secret_key, algorithm=settings.algorithm)
 
 
+# Verified tokens: HMAC-SHA256 digest of the token under the signing key ->
+# (subject, exp). Keying the digest with the secret means raw tokens are never
+# held, and entries verified under a previous key can't match after rotation.
+_verified_tokens: TTLCache[bytes, Tuple[str, float]] = TTLCache(
+    "verified_tokens", settings.token_cache_size, clock=time.time
+)
+
+
+def _token_digest(token: str) -> bytes:
+    message = f"{settings.algorithm}:{token}".encode()
+    return hmac.new(settings.secret_key.encode(), message, hashlib.sha256).digest()
+
+
 def decode_token(token: str) -> Optional[str]:
+    """
+    The token's subject, or None if it is invalid, expired or scoped.
+
+    Tokens arrive in bursts (extension flushes, dashboard loads), so a verified
+    token is cached until its own `exp`; only tokens carrying one are cached.
+    Scoped tokens, such as the pull tokens background sync hands to
+    extensions, never authenticate API requests.
+    """
+    digest = _token_digest(token)
+    cached = _verified_tokens.get(digest)
+    if cached is not None:
+        subject, expires_at = cached
+        if time.time() < expires_at:
+            return subject
+
     try:
         payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
-        return payload.get("sub")
     except JWTError:
         return None
+    if payload.get("scope") is not None:
+        return None
+    subject = payload.get("sub")
+    expires_at = payload.get("exp")
+    if subject and isinstance(expires_at, (int, float)):
+        _verified_tokens.set(digest, (subject, expires_at), ttl=expires_at - time.time())
+    return subject
 
 
 async def current_user_id(authorization: Optional[str] = Header(default=None)) -> str:
@@ -100,50 +140,55 @@ async def github_callback(payload: GitHubCallbackRequest, db: AsyncSession = Dep
             detail="GitHub OAuth is not configured on this server",
         )
 
-    async with httpx.AsyncClient(timeout=15) as client:
-        token_res = await client.post(
-            GITHUB_TOKEN_URL,
-            headers={"Accept": "application/json"},
-            data={
-                "client_id": settings.github_client_id,
-                "client_secret": settings.github_client_secret,
-                "code": payload.code,
-            },
+    client = get_http_client()
+    token_res = await client.post(
+        GITHUB_TOKEN_URL,
+        headers={"Accept": "application/json"},
+        data={
+            "client_id": settings.github_client_id,
+            "client_secret": settings.github_client_secret,
+            "code": payload.code,
+        },
+    )
+    token_json = token_res.json()
+
+    # GitHub returns 200 with an `error` field rather than an error status.
+    if "error" in token_json:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=token_json.get("error_description", token_json["error"]),
         )
-        token_json = token_res.json()
-
-        # GitHub returns 200 with an `error` field rather than an error status.
-        if "error" in token_json:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=token_json.get("error_description", token_json["error"]),
-            )
-
-        access_token = token_json.get("access_token")
-        if not access_token:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="GitHub did not return an access token",
-            )
-
-        gh_headers = {
-            "Authorization": f"Bearer {access_token}",
-            "Accept": "application/vnd.github+json",
-        }
-        user_res = await client.get(GITHUB_USER_URL, headers=gh_headers)
-        user_res.raise_for_status()
-        gh_user = user_res.json()
-
-        email = gh_user.get("email")
-        if not email:
-            # The primary address is private unless requested separately.
-            emails_res = await client.get(GITHUB_EMAILS_URL, headers=gh_headers)
-            if emails_res.status_code == 200:
-                primary = next(
-                    (e for e in emails_res.json() if e.get("primary") and e.get("verified")),
-                    None,
-                )
-                email = primary.get("email") if primary else None
+
+    access_token = token_json.get("access_token")
+    if not access_token:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="GitHub did not return an access token",
+        )
+
+    gh_headers = {
+        "Authorization": f"Bearer {access_token}",
+        "Accept": "application/vnd.github+json",
+    }
+    # The primary address is private unless requested separately. Asking for it
+    # alongside the profile costs one round trip instead of two.
+    user_res, emails_res = await asyncio.gather(
+        client.get(GITHUB_USER_URL, headers=gh_headers),
+        client.get(GITHUB_EMAILS_URL, headers=gh_headers),
+        return_exceptions=True,
+    )
+    if isinstance(user_res, BaseException):
+        raise user_res
+    user_res.raise_for_status()
+    gh_user = user_res.json()
+
+    email = gh_user.get("email")
+    if not email and not isinstance(emails_res, BaseException) and emails_res.status_code == 200:
+        primary = next(
+            (e for e in emails_res.json() if e.get("primary") and e.get("verified")),
+            None,
+        )
+        email = primary.get("email") if primary else None
 
     github_id = str(gh_user["id"])
     existing = await db.execute(select(User).where(User.github_id == github_id))
@@ -167,6 +212,8 @@ async def github_callback(payload: GitHubCallbackRequest, db: AsyncSession = Dep
 
     await db.commit()
     await db.refresh(user)
+    # The flush already evicted it; this also covers a user whose id was cached as missing.
+    user_cache.invalidate(user.id)
 
     return SuccessResponse(
         data={
@@ -233,8 +280,7 @@ async def get_current_user_info(
             }
         )
 
-    result = await db.execute(select(User).where(User.id == int(user_id)))
-    user = result.scalar_one_or_none()
+    user = await user_cache.get(db, user_id)
     if user is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
 
@@ -4,6 +4,8 @@ from typing import Union
 
 from app.schemas import HealthResponseData, SuccessResponse, ErrorResponse
 from app.config import settings
+from app.database import pool_status
+from app.services.sync_scheduler import sync_scheduler
 
 router = APIRouter(prefix="/api/health", tags=["health"])
 
@@ -17,4 +19,17 @@ async def health_check():
         "version": settings.app_version
     }
     
-    return SuccessResponse(data=health_data) 
\ No newline at end of file
+    return SuccessResponse(data=health_data)
+
+
+@router.get("/pool", response_model=Union[SuccessResponse, ErrorResponse])
+async def pool_health():
+    """Connection pool occupancy: connections in use, idle and in overflow."""
+    return SuccessResponse(data=pool_status())
+
+
+
+@router.get("/sync", response_model=Union[SuccessResponse, ErrorResponse])
+async def sync_health():
+    """Background sync scheduler state and per-user sync lag."""
+    return SuccessResponse(data=sync_scheduler.status())
\ No newline at end of file
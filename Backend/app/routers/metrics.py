@@ -0,0 +1,13 @@
+from fastapi import APIRouter
+from fastapi.responses import Response
+
+from app import metrics
+
+router = APIRouter(tags=["metrics"])
+
+
+@router.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    """Every registered metric in the Prometheus text format, for this worker."""
+    # Set as a header: media_type would get a second charset appended.
+    return Response(metrics.render(), headers={"Content-Type": metrics.CONTENT_TYPE})
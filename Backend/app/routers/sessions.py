@@ -1,67 +1,31 @@
 from fastapi import APIRouter, HTTPException, status, Query, Depends
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_, func, desc, distinct
 from datetime import datetime, timezone, timedelta
 from typing import Union, Optional, List
 from enum import Enum
 import logging
 
-from app.database import get_db
+from app import metrics, queries
+from app.dependencies import get_user_db, rate_limited
 from app.routers.auth import current_user_id
-from app.models import FileSession
+from app.models import FileSession, epoch_day_to_date, session_time_columns
+from app.responses import success_response
+from app.services.session_coalescer import session_coalescer
+from app.utils.languages import normalize_language
 from app.schemas import (
     SessionRequest, SuccessResponse, ErrorResponse
 )
 
 router = APIRouter(prefix="/api/sessions", tags=["sessions"])
 
-# VS Code reports `languageId` in lowercase ("python", "typescriptreact"), while
-# the display names used for colours and grouping are capitalised. Without
-# normalising on ingest, every session the extension records forks into a second,
-# grey-coloured entry alongside the canonical one.
-LANGUAGE_DISPLAY_NAMES = {
-    "typescript": "TypeScript",
-    "typescriptreact": "TypeScript",
-    "javascript": "JavaScript",
-    "javascriptreact": "JavaScript",
-    "python": "Python",
-    "rust": "Rust",
-    "go": "Go",
-    "java": "Java",
-    "cpp": "C++",
-    "c": "C",
-    "csharp": "C#",
-    "html": "HTML",
-    "css": "CSS",
-    "scss": "CSS",
-    "vue": "Vue",
-    "json": "JSON",
-    "jsonc": "JSON",
-    "yaml": "YAML",
-    "toml": "TOML",
-    "markdown": "Markdown",
-    "shellscript": "Shell",
-    "bash": "Shell",
-    "powershell": "PowerShell",
-    "sql": "SQL",
-    "dockerfile": "Dockerfile",
-    "plaintext": "Plain Text",
-}
-
-
-def normalize_language(raw: Optional[str]) -> str:
-    """Map a client-supplied language to its canonical display name."""
-    if not raw:
-        return "Unknown"
-    key = raw.strip().lower()
-    if key in LANGUAGE_DISPLAY_NAMES:
-        return LANGUAGE_DISPLAY_NAMES[key]
-    # Already-capitalised names (and anything unmapped) pass through unchanged.
-    return raw.strip()
-
-
 logger = logging.getLogger(__name__)
 
+SESSIONS_INGESTED = metrics.counter(
+    "afk_sessions_ingested_total",
+    "Sessions posted by extensions, by what happened to them",
+    ["outcome"],
+)
+
 
 
 class TimeFilter(str, Enum):
@@ -121,10 +85,10 @@ def get_time_range(time_filter: TimeFilter, start_date: Optional[datetime] = Non
         return None, None
 
 
-@router.post("", response_model=Union[SuccessResponse, ErrorResponse])
+@router.post("", response_model=Union[SuccessResponse, ErrorResponse], dependencies=[Depends(rate_limited("ingest"))])
 async def create_session(
     session_request: SessionRequest,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_user_db),
     user_id: str = Depends(current_user_id)
 ):
     """
@@ -134,15 +98,17 @@ async def create_session(
         session_data = session_request.session
         system_info = session_request.systemInfo
         
-        # Check if session already exists (update vs create)
-        existing_session_query = select(FileSession).where(
-            and_(
-                FileSession.id == session_data.get("id"),
-                FileSession.user_id == user_id
-            )
-        )
-        existing_session_result = await db.execute(existing_session_query)
-        existing_session = existing_session_result.scalar_one_or_none()
+        # Check if session already exists (update vs create), or was merged
+        # into another row earlier
+        existing_session, merged_into = (await db.execute(
+            queries.session_with_alias(session_data.get("id"), user_id)
+        )).one()
+        
+        session_start_time = datetime.fromisoformat(session_data.get("sessionStartTime").replace('Z', '+00:00'))
+        session_end_time = datetime.fromisoformat(session_data.get("sessionEndTime").replace('Z', '+00:00')) if session_data.get("sessionEndTime") else None
+        time_columns = session_time_columns(session_start_time, session_end_time)
+        new_session = None
+        outcome = "created"
         
         if existing_session:
             # Update existing session
@@ -152,8 +118,10 @@ async def create_session(
             existing_session.language = normalize_language(session_data.get("language"))
             existing_session.project_name = session_data.get("projectName")
             existing_session.project_path = session_data.get("projectPath")
-            existing_session.session_start_time = datetime.fromisoformat(session_data.get("sessionStartTime").replace('Z', '+00:00'))
-            existing_session.session_end_time = datetime.fromisoformat(session_data.get("sessionEndTime").replace('Z', '+00:00')) if session_data.get("sessionEndTime") else None
+            existing_session.session_start_time = session_start_time
+            existing_session.session_end_time = session_end_time
+            for name, value in time_columns.items():
+                setattr(existing_session, name, value)
             existing_session.total_duration = session_data.get("totalDuration")
             existing_session.lines_added = session_data.get("linesAdded")
             existing_session.lines_deleted = session_data.get("linesDeleted")
@@ -166,55 +134,99 @@ async def create_session(
             existing_session.platform = system_info.get("platform")
             existing_session.is_active = session_data.get("isActive")
             existing_session.updated_at = datetime.now(timezone.utc)
+            outcome = "updated"
+        elif merged_into:
+            # A resend of a session already folded into an earlier row; adding
+            # its counters again would double-count it.
+            outcome = "duplicate"
         else:
-            # Create new session
-            new_session = FileSession(
-                id=session_data.get("id"),
-                user_id=user_id,
-                file_path=session_data.get("filePath"),
-                file_name=session_data.get("fileName"),
-                file_extension=session_data.get("fileExtension"),
-                language=normalize_language(session_data.get("language")),
-                project_name=session_data.get("projectName"),
-                project_path=session_data.get("projectPath"),
-                session_start_time=datetime.fromisoformat(session_data.get("sessionStartTime").replace('Z', '+00:00')),
-                session_end_time=datetime.fromisoformat(session_data.get("sessionEndTime").replace('Z', '+00:00')) if session_data.get("sessionEndTime") else None,
-                total_duration=session_data.get("totalDuration"),
-                lines_added=session_data.get("linesAdded"),
-                lines_deleted=session_data.get("linesDeleted"),
-                lines_modified=session_data.get("linesModified"),
-                characters_added=session_data.get("charactersAdded"),
-                characters_deleted=session_data.get("charactersDeleted"),
-                characters_modified=session_data.get("charactersModified"),
-                total_edits=session_data.get("totalEdits"),
-                editor=system_info.get("editor"),
-                platform=system_info.get("platform"),
-                is_active=session_data.get("isActive")
+            # Merge into the user's previous row when this continues it on the
+            # same file, otherwise store it as a new session.
+            merged_into, merge_outcome = await session_coalescer.merge_into_tail(
+                db,
+                user_id,
+                session_data.get("id"),
+                session_data.get("filePath"),
+                system_info.get("editor"),
+                session_start_time,
+                session_end_time,
+                session_data.get("isActive"),
+                {
+                    "total_duration": session_data.get("totalDuration"),
+                    "lines_added": session_data.get("linesAdded"),
+                    "lines_deleted": session_data.get("linesDeleted"),
+                    "lines_modified": session_data.get("linesModified"),
+                    "characters_added": session_data.get("charactersAdded"),
+                    "characters_deleted": session_data.get("charactersDeleted"),
+                    "characters_modified": session_data.get("charactersModified"),
+                    "total_edits": session_data.get("totalEdits"),
+                },
             )
-            db.add(new_session)
+            if merged_into:
+                outcome = merge_outcome
+            else:
+                # Create new session
+                new_session = FileSession(
+                    id=session_data.get("id"),
+                    user_id=user_id,
+                    file_path=session_data.get("filePath"),
+                    file_name=session_data.get("fileName"),
+                    file_extension=session_data.get("fileExtension"),
+                    language=normalize_language(session_data.get("language")),
+                    project_name=session_data.get("projectName"),
+                    project_path=session_data.get("projectPath"),
+                    session_start_time=session_start_time,
+                    session_end_time=session_end_time,
+                    **time_columns,
+                    total_duration=session_data.get("totalDuration"),
+                    lines_added=session_data.get("linesAdded"),
+                    lines_deleted=session_data.get("linesDeleted"),
+                    lines_modified=session_data.get("linesModified"),
+                    characters_added=session_data.get("charactersAdded"),
+                    characters_deleted=session_data.get("charactersDeleted"),
+                    characters_modified=session_data.get("charactersModified"),
+                    total_edits=session_data.get("totalEdits"),
+                    editor=system_info.get("editor"),
+                    platform=system_info.get("platform"),
+                    is_active=session_data.get("isActive")
+                )
+                db.add(new_session)
         
         await db.commit()
+        SESSIONS_INGESTED.inc(outcome=outcome)
+        
+        if outcome == "merged":
+            session_coalescer.remember(
+                user_id, merged_into, session_data.get("filePath"), system_info.get("editor"), session_end_time
+            )
+        elif new_session is not None:
+            session_coalescer.remember(
+                user_id, new_session.id, new_session.file_path, new_session.editor,
+                session_end_time, time_columns["start_epoch"]
+            )
         
         response_data = {
             "sessionId": session_data.get("id"),
             "processed": True,
             "timestamp": datetime.now(timezone.utc)
         }
+        if merged_into:
+            response_data["mergedInto"] = merged_into
         
-        return SuccessResponse(data=response_data)
+        return success_response(response_data)
         
     except Exception as e:
         await db.rollback()
-        logger.error(f"Failed to process session data: {e}")
+        logger.error("Failed to process session data: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=ErrorResponse(error="Failed to process session data").dict()
         )
 
 
-@router.get("", response_model=Union[SuccessResponse, ErrorResponse])
+@router.get("", response_model=Union[SuccessResponse, ErrorResponse], dependencies=[Depends(rate_limited("read"))])
 async def get_sessions(
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_user_db),
     user_id: str = Depends(current_user_id),
     limit: int = Query(50, ge=1, le=100),
     offset: int = Query(0, ge=0),
@@ -234,35 +246,20 @@ async def get_sessions(
     the UI. Explicit `from`/`to` still win when both are supplied.
     """
     try:
-        # Build query for user's sessions
-        query = select(FileSession).where(FileSession.user_id == user_id)
-        
-        # Apply filters
-        if projectName:
-            query = query.where(FileSession.project_name == projectName)
-        if language:
-            query = query.where(FileSession.language == language)
-
+        # Resolve the time range
+        range_start, range_end = from_date, to_date
         if time_filter and not (from_date or to_date):
             range_start, range_end = get_time_range(time_filter, start_date, end_date)
-            if range_start:
-                query = query.where(FileSession.session_start_time >= range_start)
-            if range_end:
-                query = query.where(FileSession.session_start_time <= range_end)
-
-        if from_date:
-            query = query.where(FileSession.session_start_time >= from_date)
-        if to_date:
-            query = query.where(FileSession.session_start_time <= to_date)
+        filters = dict(project_name=projectName, language=language, start=range_start, end=range_end)
         
         # Get total count for pagination
-        count_query = select(func.count()).select_from(query.subquery())
-        count_result = await db.execute(count_query)
+        count_result = await db.execute(queries.user_session_count(user_id, **filters))
         total_count = count_result.scalar()
         
         # Get sessions with pagination
-        sessions_query = query.order_by(desc(FileSession.session_start_time)).offset(offset).limit(limit)
-        sessions_result = await db.execute(sessions_query)
+        sessions_result = await db.execute(
+            queries.user_sessions_page(user_id, offset, limit, **filters)
+        )
         sessions = sessions_result.scalars().all()
         
         # Convert to response format
@@ -299,75 +296,69 @@ async def get_sessions(
             "limit": limit
         }
         
-        return SuccessResponse(data=response_data)
+        return success_response(response_data)
         
     except Exception as e:
-        logger.error(f"Failed to get sessions: {e}")
+        logger.error("Failed to get sessions: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=ErrorResponse(error="Failed to retrieve sessions").dict()
         )
 
 
-@router.get("/projects", response_model=Union[SuccessResponse, ErrorResponse])
-async def get_unique_projects(db: AsyncSession = Depends(get_db),
+@router.get("/projects", response_model=Union[SuccessResponse, ErrorResponse], dependencies=[Depends(rate_limited("read"))])
+async def get_unique_projects(db: AsyncSession = Depends(get_user_db),
     user_id: str = Depends(current_user_id)):
     """
     Get the signed-in user's distinct project names.
     """
     try:
-        query = select(distinct(FileSession.project_name)).where(
-            and_(FileSession.user_id == user_id, FileSession.project_name.isnot(None))
-        )
-        result = await db.execute(query)
+        result = await db.execute(queries.user_projects(user_id))
         projects = result.scalars().all()
         
-        logger.info(f"Found {len(projects)} projects: {projects}")
+        logger.debug("Found %d projects", len(projects))
         
         # Return simple array of project names
         project_list = [project for project in projects if project]
         
-        return SuccessResponse(data=project_list)
+        return success_response(project_list)
         
     except Exception as e:
-        logger.error(f"Failed to get projects: {e}", exc_info=True)
+        logger.error("Failed to get projects: %s", e, exc_info=True)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=ErrorResponse(error=f"Failed to retrieve projects: {str(e)}").dict()
         )
 
 
-@router.get("/languages", response_model=Union[SuccessResponse, ErrorResponse])
-async def get_unique_languages(db: AsyncSession = Depends(get_db),
+@router.get("/languages", response_model=Union[SuccessResponse, ErrorResponse], dependencies=[Depends(rate_limited("read"))])
+async def get_unique_languages(db: AsyncSession = Depends(get_user_db),
     user_id: str = Depends(current_user_id)):
     """
     Get the signed-in user's distinct programming languages.
     """
     try:
-        query = select(distinct(FileSession.language)).where(
-            and_(FileSession.user_id == user_id, FileSession.language.isnot(None))
-        )
-        result = await db.execute(query)
+        result = await db.execute(queries.user_languages(user_id))
         languages = result.scalars().all()
         
-        logger.info(f"Found {len(languages)} languages: {languages}")
+        logger.debug("Found %d languages", len(languages))
         
         # Return simple array of language names
         language_list = [language for language in languages if language]
         
-        return SuccessResponse(data=language_list)
+        return success_response(language_list)
         
     except Exception as e:
-        logger.error(f"Failed to get languages: {e}", exc_info=True)
+        logger.error("Failed to get languages: %s", e, exc_info=True)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=ErrorResponse(error=f"Failed to retrieve languages: {str(e)}").dict()
         )
 
 
-@router.get("/stats", response_model=Union[SuccessResponse, ErrorResponse])
+@router.get("/stats", response_model=Union[SuccessResponse, ErrorResponse], dependencies=[Depends(rate_limited("read"))])
 async def get_session_statistics(
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_user_db),
     user_id: str = Depends(current_user_id),
     time_filter: Optional[TimeFilter] = Query(None),
     start_date: Optional[datetime] = Query(None),
@@ -380,37 +371,19 @@ async def get_session_statistics(
     No authentication required.
     """
     try:
-        # Build base query
-        query = select(FileSession).where(FileSession.user_id == user_id)
-        
-        # Apply time filtering
-        if time_filter:
-            filter_start, filter_end = get_time_range(time_filter, start_date, end_date)
-            if filter_start and filter_end:
-                query = query.where(
-                    and_(
-                        FileSession.session_start_time >= filter_start,
-                        FileSession.session_start_time <= filter_end
-                    )
-                )
-        
-        # Apply other filters
-        if project_name:
-            query = query.where(FileSession.project_name == project_name)
-        if language:
-            query = query.where(FileSession.language == language)
-        
-        # Execute query
-        result = await db.execute(query)
-        sessions = result.scalars().all()
-        
-        # Calculate statistics
-        total_sessions = len(sessions)
-        total_duration = sum(s.total_duration for s in sessions)
-        total_lines_added = sum(s.lines_added for s in sessions)
-        total_lines_deleted = sum(s.lines_deleted for s in sessions)
-        total_lines_modified = sum(s.lines_modified for s in sessions)
-        total_edits = sum(s.total_edits for s in sessions)
+        # Resolve the time range; it applies only when both ends are known
+        filter_start, filter_end = get_time_range(time_filter, start_date, end_date) if time_filter else (None, None)
+        if not (filter_start and filter_end):
+            filter_start = filter_end = None
+        
+        # Count and sum in the database
+        result = await db.execute(queries.user_totals(
+            user_id, project_name=project_name, language=language, start=filter_start, end=filter_end
+        ))
+        total_sessions, *sums = result.one()
+        total_duration, total_lines_added, total_lines_deleted, total_lines_modified, total_edits = (
+            value or 0 for value in sums
+        )
         
         response_data = {
             "totalSessions": total_sessions,
@@ -422,19 +395,19 @@ async def get_session_statistics(
             "averageSessionDuration": total_duration / total_sessions if total_sessions > 0 else 0
         }
         
-        return SuccessResponse(data=response_data)
+        return success_response(response_data)
         
     except Exception as e:
-        logger.error(f"Failed to get statistics: {e}")
+        logger.error("Failed to get statistics: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=ErrorResponse(error="Failed to retrieve statistics").dict()
         )
 
 
-@router.get("/stats/daily", response_model=Union[SuccessResponse, ErrorResponse])
+@router.get("/stats/daily", response_model=Union[SuccessResponse, ErrorResponse], dependencies=[Depends(rate_limited("read"))])
 async def get_daily_statistics(
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_user_db),
     user_id: str = Depends(current_user_id),
     time_filter: Optional[TimeFilter] = Query(TimeFilter.LAST_7_DAYS),
     start_date: Optional[datetime] = Query(None),
@@ -447,59 +420,38 @@ async def get_daily_statistics(
     No authentication required.
     """
     try:
-        # Build base query
-        query = select(FileSession).where(FileSession.user_id == user_id)
-        
-        # Apply time filtering
-        if time_filter:
-            filter_start, filter_end = get_time_range(time_filter, start_date, end_date)
-            if filter_start and filter_end:
-                query = query.where(
-                    and_(
-                        FileSession.session_start_time >= filter_start,
-                        FileSession.session_start_time <= filter_end
-                    )
-                )
-        
-        # Apply other filters
-        if project_name:
-            query = query.where(FileSession.project_name == project_name)
-        if language:
-            query = query.where(FileSession.language == language)
-        
-        # Execute query
-        result = await db.execute(query)
-        sessions = result.scalars().all()
-        
-        # Group by date
-        daily_stats = {}
-        for session in sessions:
-            date_key = session.session_start_time.date().isoformat()
-            if date_key not in daily_stats:
-                daily_stats[date_key] = {
-                    "date": date_key,
-                    "duration": 0,
-                    "sessions": 0
-                }
-            daily_stats[date_key]["duration"] += session.total_duration
-            daily_stats[date_key]["sessions"] += 1
-        
-        # Convert to list and sort by date
-        daily_data = sorted(daily_stats.values(), key=lambda x: x["date"])
+        # Resolve the time range; it applies only when both ends are known
+        filter_start, filter_end = get_time_range(time_filter, start_date, end_date) if time_filter else (None, None)
+        if not (filter_start and filter_end):
+            filter_start = filter_end = None
+        
+        # Group by UTC day in the database, oldest first
+        result = await db.execute(queries.user_daily_totals(
+            user_id, project_name=project_name, language=language, start=filter_start, end=filter_end
+        ))
+        daily_data = [
+            {
+                "date": epoch_day_to_date(day).isoformat(),
+                "duration": duration or 0,
+                "sessions": count
+            }
+            for day, duration, count in result.all()
+            if day is not None
+        ]
         
-        return SuccessResponse(data=daily_data)
+        return success_response(daily_data)
         
     except Exception as e:
-        logger.error(f"Failed to get daily statistics: {e}")
+        logger.error("Failed to get daily statistics: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=ErrorResponse(error="Failed to retrieve daily statistics").dict()
         )
 
 
-@router.get("/stats/languages", response_model=Union[SuccessResponse, ErrorResponse])
+@router.get("/stats/languages", response_model=Union[SuccessResponse, ErrorResponse], dependencies=[Depends(rate_limited("read"))])
 async def get_language_statistics(
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_user_db),
     user_id: str = Depends(current_user_id),
     time_filter: Optional[TimeFilter] = Query(None),
     start_date: Optional[datetime] = Query(None),
@@ -511,44 +463,25 @@ async def get_language_statistics(
     No authentication required.
     """
     try:
-        # Build base query
-        query = select(FileSession).where(FileSession.user_id == user_id)
-        
-        # Apply time filtering
-        if time_filter:
-            filter_start, filter_end = get_time_range(time_filter, start_date, end_date)
-            if filter_start and filter_end:
-                query = query.where(
-                    and_(
-                        FileSession.session_start_time >= filter_start,
-                        FileSession.session_start_time <= filter_end
-                    )
-                )
-        
-        # Apply project filter
-        if project_name:
-            query = query.where(FileSession.project_name == project_name)
-        
-        # Execute query
-        result = await db.execute(query)
-        sessions = result.scalars().all()
-        
-        # Group by language
-        language_stats = {}
-        total_duration = 0
-        
-        for session in sessions:
-            language = session.language or "Unknown"
-            if language not in language_stats:
-                language_stats[language] = {
-                    "name": language,
-                    "duration": 0,
-                    "sessions": 0,
-                    "value": 0  # percentage, calculated later
-                }
-            language_stats[language]["duration"] += session.total_duration
-            language_stats[language]["sessions"] += 1
-            total_duration += session.total_duration
+        # Resolve the time range; it applies only when both ends are known
+        filter_start, filter_end = get_time_range(time_filter, start_date, end_date) if time_filter else (None, None)
+        if not (filter_start and filter_end):
+            filter_start = filter_end = None
+        
+        # Group by language in the database, longest first
+        result = await db.execute(queries.user_language_totals(
+            user_id, project_name=project_name, start=filter_start, end=filter_end
+        ))
+        language_stats = [
+            {
+                "name": language,
+                "duration": duration,
+                "sessions": count,
+                "value": 0  # percentage, calculated later
+            }
+            for language, duration, count in result.all()
+        ]
+        total_duration = sum(stats["duration"] for stats in language_stats)
         
         # Calculate percentages and add colors
         language_colors = {
@@ -566,29 +499,24 @@ async def get_language_statistics(
             "React": "#61dafb"
         }
         
-        language_data = []
-        for language, stats in language_stats.items():
+        for stats in language_stats:
             if total_duration > 0:
                 stats["value"] = round((stats["duration"] / total_duration) * 100, 1)
-            stats["color"] = language_colors.get(language, "#6b7280")  # default gray color
-            language_data.append(stats)
-        
-        # Sort by duration descending
-        language_data.sort(key=lambda x: x["duration"], reverse=True)
+            stats["color"] = language_colors.get(stats["name"], "#6b7280")  # default gray color
         
-        return SuccessResponse(data=language_data)
+        return success_response(language_stats)
         
     except Exception as e:
-        logger.error(f"Failed to get language statistics: {e}")
+        logger.error("Failed to get language statistics: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=ErrorResponse(error="Failed to retrieve language statistics").dict()
         )
 
 
-@router.get("/stats/projects", response_model=Union[SuccessResponse, ErrorResponse])
+@router.get("/stats/projects", response_model=Union[SuccessResponse, ErrorResponse], dependencies=[Depends(rate_limited("read"))])
 async def get_project_statistics(
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_user_db),
     user_id: str = Depends(current_user_id),
     time_filter: Optional[TimeFilter] = Query(None),
     start_date: Optional[datetime] = Query(None),
@@ -600,57 +528,37 @@ async def get_project_statistics(
     No authentication required.
     """
     try:
-        # Build base query
-        query = select(FileSession).where(FileSession.user_id == user_id)
-        
-        # Apply time filtering
-        if time_filter:
-            filter_start, filter_end = get_time_range(time_filter, start_date, end_date)
-            if filter_start and filter_end:
-                query = query.where(
-                    and_(
-                        FileSession.session_start_time >= filter_start,
-                        FileSession.session_start_time <= filter_end
-                    )
-                )
-        
-        # Apply language filter
-        if language:
-            query = query.where(FileSession.language == language)
-        
-        # Execute query
-        result = await db.execute(query)
-        sessions = result.scalars().all()
-        
-        # Group by project
-        project_stats = {}
-        for session in sessions:
-            project = session.project_name or "Unknown"
-            if project not in project_stats:
-                project_stats[project] = {
-                    "name": project,
-                    "duration": 0,
-                    "sessions": 0
-                }
-            project_stats[project]["duration"] += session.total_duration
-            project_stats[project]["sessions"] += 1
-        
-        # Convert to list and sort by duration descending
-        project_data = sorted(project_stats.values(), key=lambda x: x["duration"], reverse=True)
+        # Resolve the time range; it applies only when both ends are known
+        filter_start, filter_end = get_time_range(time_filter, start_date, end_date) if time_filter else (None, None)
+        if not (filter_start and filter_end):
+            filter_start = filter_end = None
+        
+        # Group by project in the database, longest first
+        result = await db.execute(queries.user_project_totals(
+            user_id, language=language, start=filter_start, end=filter_end
+        ))
+        project_data = [
+            {
+                "name": project,
+                "duration": duration,
+                "sessions": count
+            }
+            for project, duration, count in result.all()
+        ]
         
-        return SuccessResponse(data=project_data)
+        return success_response(project_data)
         
     except Exception as e:
-        logger.error(f"Failed to get project statistics: {e}")
+        logger.error("Failed to get project statistics: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=ErrorResponse(error="Failed to retrieve project statistics").dict()
         )
 
 
-@router.get("/stats/hourly", response_model=Union[SuccessResponse, ErrorResponse])
+@router.get("/stats/hourly", response_model=Union[SuccessResponse, ErrorResponse], dependencies=[Depends(rate_limited("read"))])
 async def get_hourly_statistics(
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_user_db),
     user_id: str = Depends(current_user_id),
     time_filter: Optional[TimeFilter] = Query(TimeFilter.LAST_7_DAYS),
     start_date: Optional[datetime] = Query(None),
@@ -663,31 +571,15 @@ async def get_hourly_statistics(
     No authentication required.
     """
     try:
-        # Build base query
-        query = select(FileSession).where(FileSession.user_id == user_id)
-        
-        # Apply time filtering
-        if time_filter:
-            filter_start, filter_end = get_time_range(time_filter, start_date, end_date)
-            if filter_start and filter_end:
-                query = query.where(
-                    and_(
-                        FileSession.session_start_time >= filter_start,
-                        FileSession.session_start_time <= filter_end
-                    )
-                )
-        
-        # Apply other filters
-        if project_name:
-            query = query.where(FileSession.project_name == project_name)
-        if language:
-            query = query.where(FileSession.language == language)
-        
-        # Execute query
-        result = await db.execute(query)
-        sessions = result.scalars().all()
-        
-        # Group by hour (0-23)
+        # Resolve the time range; it applies only when both ends are known
+        filter_start, filter_end = get_time_range(time_filter, start_date, end_date) if time_filter else (None, None)
+        if not (filter_start and filter_end):
+            filter_start = filter_end = None
+        
+        # Group by UTC hour (0-23) in the database
+        result = await db.execute(queries.user_hourly_totals(
+            user_id, project_name=project_name, language=language, start=filter_start, end=filter_end
+        ))
         hourly_stats = {}
         for hour in range(24):
             hourly_stats[f"{hour:02d}"] = {
@@ -695,17 +587,17 @@ async def get_hourly_statistics(
                 "duration": 0
             }
         
-        for session in sessions:
-            hour_key = f"{session.session_start_time.hour:02d}"
-            hourly_stats[hour_key]["duration"] += session.total_duration
+        for hour, duration in result.all():
+            if hour is not None:
+                hourly_stats[f"{hour:02d}"]["duration"] = duration or 0
         
         # Convert to list
         hourly_data = [hourly_stats[f"{hour:02d}"] for hour in range(24)]
         
-        return SuccessResponse(data=hourly_data)
+        return success_response(hourly_data)
         
     except Exception as e:
-        logger.error(f"Failed to get hourly statistics: {e}")
+        logger.error("Failed to get hourly statistics: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=ErrorResponse(error="Failed to retrieve hourly statistics").dict()
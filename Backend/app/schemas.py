@@ -38,6 +38,7 @@ class ExtensionSessionsResponse(BaseModel):
     sessions: List['FileSession'] = Field(..., description="List of file sessions")
     hasMore: bool = Field(False, description="Whether more sessions are available")
     lastSyncTime: datetime = Field(..., description="Last synchronization timestamp")
+    systemInfo: Optional[dict] = Field(None, description="Editor and platform the page's sessions were recorded on")
 
 
 # Device Authentication Schemas
@@ -115,6 +116,8 @@ class FileSession(BaseModel):
     charactersModified: int = Field(..., ge=0, description="Number of characters modified")
     totalEdits: int = Field(..., ge=0, description="Total number of edit operations")
     isActive: bool = Field(..., description="Whether session is currently active")
+    editor: Optional[str] = Field(None, description="Editor type, when the export reports it per session")
+    platform: Optional[str] = Field(None, description="OS platform, when the export reports it per session")
 
 
 class SystemInfo(BaseModel):
@@ -1,4 +1,12 @@
 # Services module for AFK Coding Monitor
-from .extension_client import ExtensionClient
+# ExtensionClient is resolved on first access: importing it pulls in aiohttp,
+# which any other `app.services` import shouldn't have to pay for.
 
-__all__ = ["ExtensionClient"] 
\ No newline at end of file
+__all__ = ["ExtensionClient"]
+
+
+def __getattr__(name):
+    if name == "ExtensionClient":
+        from .extension_client import ExtensionClient
+        return ExtensionClient
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,105 @@
+"""
+Circuit breakers for extension endpoints.
+
+A breaker starts closed and lets every call through. After
+`failure_threshold` consecutive failures it opens: calls are refused at once,
+without touching the network, for `reset_timeout` seconds. Then it turns
+half-open and admits exactly one trial call; the trial's success closes the
+breaker again, its failure reopens it for another `reset_timeout`.
+"""
+
+import time
+from enum import Enum
+from typing import Any, Callable, Dict, Optional
+
+from app import metrics
+
+BREAKER_TRANSITIONS = metrics.counter(
+    "afk_extension_breaker_transitions_total",
+    "Extension circuit breaker state changes, by the state entered",
+    ["state"],
+)
+
+
+class BreakerState(str, Enum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(ConnectionError):
+    """Raised instead of calling an endpoint whose breaker is open."""
+
+
+class CircuitBreaker:
+    """Closed / open / half-open breaker for one endpoint. Not thread-safe; use from the event loop."""
+
+    def __init__(
+        self,
+        failure_threshold: int,
+        reset_timeout: float,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._state = BreakerState.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> BreakerState:
+        if self._state is BreakerState.OPEN and self._clock() - self._opened_at >= self.reset_timeout:
+            self._transition(BreakerState.HALF_OPEN)
+        return self._state
+
+    def _transition(self, state: BreakerState):
+        if state is not self._state:
+            self._state = state
+            BREAKER_TRANSITIONS.inc(state=state.value)
+
+    def allow(self) -> bool:
+        """
+        Whether a call may go ahead now.
+
+        In the half-open state the first caller gets the trial and everyone
+        else is refused until it reports back with `record_success`,
+        `record_failure` or `release`.
+        """
+        state = self.state
+        if state is BreakerState.CLOSED:
+            return True
+        if state is BreakerState.HALF_OPEN and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return True
+        return False
+
+    def record_success(self):
+        self._failures = 0
+        self._trial_in_flight = False
+        self._transition(BreakerState.CLOSED)
+
+    def record_failure(self):
+        self._failures += 1
+        self._trial_in_flight = False
+        if self._state is BreakerState.HALF_OPEN or self._failures >= self.failure_threshold:
+            self._opened_at = self._clock()
+            self._transition(BreakerState.OPEN)
+
+    def release(self):
+        """Give back a half-open trial that ended without a verdict (e.g. cancelled)."""
+        self._trial_in_flight = False
+
+    def retry_in(self) -> Optional[float]:
+        """Seconds until an open breaker lets a trial through; None unless open."""
+        if self.state is not BreakerState.OPEN:
+            return None
+        return max(0.0, self.reset_timeout - (self._clock() - self._opened_at))
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "state": self.state.value,
+            "consecutive_failures": self._failures,
+            "retry_in": self.retry_in(),
+        }
@@ -0,0 +1,205 @@
+"""
+Incremental decoding of `/api/sessions/export` responses.
+
+A backlogged extension can return tens of thousands of sessions in one page.
+Rather than reading the whole body and validating it into one
+`ExtensionSessionsResponse`, the body is parsed as it arrives and sessions are
+handed out in fixed-size batches, so memory stays proportional to the batch
+size instead of the page size.
+
+Two encodings are understood:
+
+- NDJSON (`application/x-ndjson`): one session object per line; lines without
+  an `id` carry page fields (`lastSyncTime`, `hasMore`, `systemInfo`) instead.
+- The regular JSON document, `{"sessions": [...], "hasMore": ..., "lastSyncTime": ...}`,
+  in any key order. Elements of `sessions` are decoded one at a time with
+  `json.JSONDecoder.raw_decode`; other keys are kept as page fields.
+
+A page-level `systemInfo` supplies `editor`/`platform` to the sessions that
+follow it and don't carry their own, so it should come first.
+"""
+
+import codecs
+import json
+import re
+from typing import Any, AsyncIterator, Dict, List
+
+from app.schemas import ExtensionSessionsResponse, FileSession as FileSessionSchema
+
+NDJSON_CONTENT_TYPES = {"application/x-ndjson", "application/jsonl", "application/x-jsonlines"}
+ACCEPT_HEADER = "application/x-ndjson, application/json;q=0.9"
+
+# Give up on a response whose next value is still incomplete after this many characters.
+MAX_PENDING_CHARS = 8 * 1024 * 1024
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+
+
+class _NdjsonParser:
+    def __init__(self):
+        self._pending = ""
+        self.fields: Dict[str, Any] = {}
+
+    def feed(self, text: str, final: bool = False) -> List[Dict[str, Any]]:
+        lines = (self._pending + text).split("\n")
+        self._pending = "" if final else lines.pop()
+        if len(self._pending) > MAX_PENDING_CHARS:
+            raise ValueError("Export line exceeds the maximum size")
+
+        sessions = []
+        for line in lines:
+            if not line.strip():
+                continue
+            value = json.loads(line)
+            if "id" not in value:
+                self.fields.update(value)
+            else:
+                sessions.append(value)
+        return sessions
+
+
+class _JsonDocumentParser:
+    """Pull parser for the export object that yields `sessions` elements one by one."""
+
+    def __init__(self):
+        self._decoder = json.JSONDecoder()
+        self._buffer = ""
+        self._pos = 0
+        self._state = "start"
+        self._key = None
+        self.fields: Dict[str, Any] = {}
+
+    def feed(self, text: str, final: bool = False) -> List[Dict[str, Any]]:
+        self._buffer = self._buffer[self._pos:] + text
+        self._pos = 0
+        sessions: List[Dict[str, Any]] = []
+        while self._step(sessions, final):
+            pass
+
+        if final and self._state != "done":
+            raise ValueError("Export response ended before the JSON document was complete")
+        if len(self._buffer) - self._pos > MAX_PENDING_CHARS:
+            raise ValueError("Export value exceeds the maximum size")
+        return sessions
+
+    def _next_char(self) -> str:
+        self._pos = _WHITESPACE.match(self._buffer, self._pos).end()
+        return self._buffer[self._pos:self._pos + 1]
+
+    def _decode(self, final: bool):
+        """(ok, value): decode the value at the cursor, or report that more input is needed."""
+        try:
+            value, end = self._decoder.raw_decode(self._buffer, self._pos)
+        except json.JSONDecodeError:
+            if final:
+                raise
+            return False, None
+        # A bare number at the end of the buffer may continue in the next chunk.
+        if end == len(self._buffer) and not final and not isinstance(value, (dict, list, str)):
+            return False, None
+        self._pos = end
+        return True, value
+
+    def _step(self, sessions: List[Dict[str, Any]], final: bool) -> bool:
+        char = self._next_char()
+        if not char:
+            return False
+        state = self._state
+
+        if state == "start":
+            if char != "{":
+                raise ValueError("Export response is not a JSON object")
+            self._pos += 1
+            self._state = "key_or_end"
+        elif state in ("key_or_end", "key"):
+            if char == "}" and state == "key_or_end":
+                self._pos += 1
+                self._state = "done"
+                return True
+            ok, key = self._decode(final)
+            if not ok:
+                return False
+            self._key = key
+            self._state = "colon"
+        elif state == "colon":
+            if char != ":":
+                raise ValueError("Malformed export response: expected ':'")
+            self._pos += 1
+            self._state = "value"
+        elif state == "value":
+            if self._key == "sessions" and char == "[":
+                self._pos += 1
+                self._state = "element_or_end"
+                return True
+            ok, value = self._decode(final)
+            if not ok:
+                return False
+            self.fields[self._key] = value
+            self._state = "after_value"
+        elif state == "after_value":
+            if char not in ",}":
+                raise ValueError("Malformed export response: expected ',' or '}'")
+            self._pos += 1
+            self._state = "key" if char == "," else "done"
+        elif state in ("element_or_end", "element"):
+            if char == "]" and state == "element_or_end":
+                self._pos += 1
+                self._state = "after_value"
+                return True
+            ok, value = self._decode(final)
+            if not ok:
+                return False
+            sessions.append(value)
+            self._state = "after_element"
+        elif state == "after_element":
+            if char not in ",]":
+                raise ValueError("Malformed export response: expected ',' or ']'")
+            self._pos += 1
+            self._state = "element" if char == "," else "after_value"
+        else:  # done
+            raise ValueError("Unexpected data after the export response")
+        return True
+
+
+class ExportStream:
+    """
+    Decodes one export response body into batches of validated sessions.
+
+    Iterate `batches()` to completion, then read `page()` for the page's
+    `hasMore` / `lastSyncTime` (with an empty `sessions` list) and `count` for
+    the number of sessions seen.
+    """
+
+    def __init__(self, content_type: str, batch_size: int):
+        self.batch_size = max(1, batch_size)
+        self._parser = _NdjsonParser() if content_type in NDJSON_CONTENT_TYPES else _JsonDocumentParser()
+        self._text = codecs.getincrementaldecoder("utf-8")()
+        self.count = 0
+
+    async def batches(self, chunks: AsyncIterator[bytes]) -> AsyncIterator[List[FileSessionSchema]]:
+        pending: List[FileSessionSchema] = []
+        async for chunk in chunks:
+            pending.extend(self._validate(raw) for raw in self._parser.feed(self._text.decode(chunk)))
+            while len(pending) >= self.batch_size:
+                batch, pending = pending[:self.batch_size], pending[self.batch_size:]
+                self.count += len(batch)
+                yield batch
+
+        tail = self._parser.feed(self._text.decode(b"", final=True), final=True)
+        pending.extend(self._validate(raw) for raw in tail)
+        for start in range(0, len(pending), self.batch_size):
+            batch = pending[start:start + self.batch_size]
+            self.count += len(batch)
+            yield batch
+
+    def _validate(self, raw: Dict[str, Any]) -> FileSessionSchema:
+        system_info = self._parser.fields.get("systemInfo")
+        if isinstance(system_info, dict):
+            for key in ("editor", "platform"):
+                if raw.get(key) is None and system_info.get(key):
+                    raw[key] = system_info[key]
+        return FileSessionSchema.model_validate(raw)
+
+    def page(self) -> ExtensionSessionsResponse:
+        fields = {key: value for key, value in self._parser.fields.items() if key != "sessions"}
+        return ExtensionSessionsResponse.model_validate({**fields, "sessions": []})
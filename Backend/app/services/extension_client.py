@@ -1,68 +1,309 @@
 import asyncio
-import aiohttp
+import functools
 import logging
+import sqlite3
+import time
 from datetime import datetime, timezone, timedelta
-from typing import List, Dict, Optional, Any
+from typing import TYPE_CHECKING, Awaitable, Callable, List, Dict, Optional, Any, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, update
+from sqlalchemy import case, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 
+from app import metrics
 from app.config import settings
-from app.models import User, FileSession
+from app.database import async_session_maker
+from app.models import User, FileSession, ExtensionEndpoint, SyncCursor, session_time_columns
 from app.schemas import (
     ExtensionSessionsRequest, 
     ExtensionSessionsResponse, 
     FileSession as FileSessionSchema,
     SystemInfo
 )
+from app.services.circuit_breaker import CircuitBreaker, CircuitOpenError
+from app.services.export_stream import ACCEPT_HEADER, ExportStream
+from app.utils.languages import normalize_language
+
+if TYPE_CHECKING:
+    import aiohttp
 
 logger = logging.getLogger(__name__)
 
+SessionBatchHandler = Callable[[List[FileSessionSchema]], Awaitable[None]]
+
+EXPORT_CHUNK_BYTES = 64 * 1024
+
+SESSIONS_SYNCED = metrics.counter(
+    "afk_sessions_synced_total",
+    "Sessions pulled from extensions and upserted",
+)
+
+UNKNOWN = "unknown"
+
+
+# Bound parameters SQLite accepts in one statement (SQLITE_MAX_VARIABLE_NUMBER):
+# 999 before 3.32, 32766 since. One multi-row upsert binds every column of
+# every row, so this caps the rows per statement.
+SQLITE_MAX_VARIABLES = 32766 if sqlite3.sqlite_version_info >= (3, 32, 0) else 999
+UPSERT_ROWS_PER_STATEMENT = SQLITE_MAX_VARIABLES // len(FileSession.__table__.columns)
+
+
+def _upsert_sessions_statement(rows: List[Dict[str, Any]]):
+    """One INSERT ... VALUES (...), (...) ... ON CONFLICT DO UPDATE for all `rows`."""
+    table = FileSession.__table__
+    stmt = sqlite_insert(table).values(rows)
+    excluded = stmt.excluded
+    updates = {
+        column.name: excluded[column.name]
+        for column in table.columns
+        if column.name not in ("id", "user_id", "created_at", "editor", "platform")
+    }
+    for name in ("editor", "platform"):
+        updates[name] = case((excluded[name] == UNKNOWN, table.c[name]), else_=excluded[name])
+    return stmt.on_conflict_do_update(
+        index_elements=[table.c.id],
+        set_=updates,
+        where=table.c.user_id == excluded.user_id,
+    )
+
+
+
+@functools.lru_cache(maxsize=32)
+def _compiled_upsert(dialect, row_count: int) -> Tuple[str, List[Tuple[Optional[int], Any]]]:
+    """
+    SQL of the upsert for `row_count` rows, and what goes in each positional
+    parameter: (row index, column name), or (None, constant) for the
+    constants of the ON CONFLICT clause.
+
+    Building and compiling a statement with thousands of parameters costs far
+    more than running it, so each row count is compiled once and the rows are
+    bound straight to the driver.
+    """
+    columns = [column.name for column in FileSession.__table__.columns]
+    compiled = _upsert_sessions_statement([dict.fromkeys(columns)] * row_count).compile(dialect=dialect)
+    slots = []
+    for name in compiled.positiontup:
+        column, _, row = name.rpartition("_m")
+        if row.isdigit() and column in columns:
+            slots.append((int(row), column))
+        else:
+            slots.append((None, compiled.params[name]))
+    return compiled.string, slots
+
+
+@functools.lru_cache(maxsize=4)
+def _bind_processors(dialect) -> Dict[str, Callable[[Any], Any]]:
+    """Per column, what SQLAlchemy would do to a value before the driver sees it."""
+    processors = {}
+    for column in FileSession.__table__.columns:
+        processor = column.type.bind_processor(dialect)
+        if processor is not None:
+            processors[column.name] = processor
+    return processors
+
+
+def _as_utc(value: Optional[datetime]) -> Optional[datetime]:
+    # Stored datetimes come back naive (UTC); the extension's are aware.
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
 
 class ExtensionClient:
     """Client for communicating with AFK extensions."""
     
     def __init__(self):
-        self.session_timeout = aiohttp.ClientTimeout(total=settings.extension_timeout)
         self.retry_attempts = settings.extension_retry_attempts
         self._extension_registry: Dict[str, Dict[str, Any]] = {}
+        # Timeouts and the session are built on first use (see `_get_session`),
+        # so booting the app doesn't import aiohttp.
+        self.session_timeout: Optional["aiohttp.ClientTimeout"] = None
+        self.probe_timeout: Optional["aiohttp.ClientTimeout"] = None
+        self.export_timeout: Optional["aiohttp.ClientTimeout"] = None
+        self._session: Optional["aiohttp.ClientSession"] = None
+        # user id -> monotonic time after which a failed discovery may be retried
+        self._negative_cache: Dict[str, float] = {}
+        self._discovery_scans: Dict[str, asyncio.Future] = {}
+        # endpoint URL -> breaker, shared by every user reaching that endpoint
+        self._breakers: Dict[str, CircuitBreaker] = {}
+    
+    async def start(self):
+        """Restore the registry. Called from the app lifespan; the HTTP session opens on first use."""
+        await self.load_registry()
+    
+    async def close(self):
+        """Close the shared HTTP session and its pooled connections."""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+    
+    def _get_session(self) -> "aiohttp.ClientSession":
+        """
+        The long-lived session every extension call goes through.
+        
+        Reusing one connector keeps connections to each extension alive between
+        probes and syncs, and caches DNS lookups, instead of paying for a new
+        connector, resolution and TCP handshake on every request. Created lazily
+        so scripts that never start the app still work.
+        """
+        if self._session is None or self._session.closed:
+            import aiohttp
+
+            # A machine that has gone away should fail at connect time, not after the full timeout.
+            self.session_timeout = aiohttp.ClientTimeout(
+                total=settings.extension_timeout, sock_connect=settings.extension_probe_timeout
+            )
+            self.probe_timeout = aiohttp.ClientTimeout(total=settings.extension_probe_timeout)
+            # Exports are streamed: a large body may take a while, but must keep arriving.
+            self.export_timeout = aiohttp.ClientTimeout(
+                total=None, sock_connect=settings.extension_probe_timeout, sock_read=settings.extension_timeout
+            )
+            connector = aiohttp.TCPConnector(
+                limit=settings.extension_connection_limit,
+                limit_per_host=settings.extension_connection_limit_per_host,
+                keepalive_timeout=settings.extension_keepalive_timeout,
+                ttl_dns_cache=settings.extension_dns_cache_ttl,
+            )
+            self._session = aiohttp.ClientSession(connector=connector, timeout=self.session_timeout)
+        return self._session
+    
+    async def load_registry(self):
+        """Restore known extension endpoints saved by earlier runs."""
+        async with async_session_maker() as db:
+            result = await db.execute(select(ExtensionEndpoint))
+            for row in result.scalars():
+                self._extension_registry[row.user_id] = self._registry_entry(row)
+        logger.info("Loaded %d extension endpoints", len(self._extension_registry))
+    
+    @staticmethod
+    def _registry_entry(row: ExtensionEndpoint) -> Dict[str, Any]:
+        return {
+            "user_id": row.user_id,
+            "github_id": row.github_id,
+            "host": row.host,
+            "port": row.port,
+            "endpoint": row.endpoint,
+            "last_seen": row.last_seen,
+            "is_active": row.is_active,
+        }
+    
+    async def _stored_extension(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """The endpoint saved for a user, which another worker may have discovered since we loaded."""
+        try:
+            async with async_session_maker() as db:
+                row = await db.get(ExtensionEndpoint, user_id)
+                return self._registry_entry(row) if row is not None else None
+        except Exception as e:
+            logger.warning("Failed to load extension endpoint for user %s: %s", user_id, e)
+            return None
+    
+    async def _persist_extension(self, user_id: str):
+        """Save a registry entry; failures only cost a rediscovery after restart."""
+        info = self._extension_registry.get(user_id)
+        if info is None:
+            return
+        values = {
+            "github_id": info.get("github_id"),
+            "host": info["host"],
+            "port": info["port"],
+            "endpoint": info["endpoint"],
+            "last_seen": info["last_seen"],
+            "is_active": info["is_active"],
+        }
+        try:
+            async with async_session_maker() as db:
+                await db.execute(
+                    sqlite_insert(ExtensionEndpoint)
+                    .values(user_id=user_id, **values)
+                    .on_conflict_do_update(index_elements=[ExtensionEndpoint.user_id], set_=values)
+                )
+                await db.commit()
+        except Exception as e:
+            logger.warning("Failed to persist extension endpoint for user %s: %s", user_id, e)
+    
+    async def _probe(self, user: User, host: str, port: int) -> Optional[Dict[str, Any]]:
+        """Check one candidate endpoint; returns registry info if it is this user's extension."""
+        endpoint = f"http://{host}:{port}"
+        try:
+            session = self._get_session()
+            async with session.get(f"{endpoint}/api/health", timeout=self.probe_timeout) as response:
+                if response.status != 200:
+                    return None
+                data = await response.json()
+        except Exception as e:
+            logger.debug("Failed to discover extension at %s:%s - %s", host, port, e)
+            return None
+        
+        # Verify this is the correct user's extension
+        if data.get("userId") == str(user.id) or data.get("githubId") == user.github_id:
+            return {
+                "user_id": str(user.id),
+                "github_id": user.github_id,
+                "host": host,
+                "port": port,
+                "endpoint": endpoint,
+                "last_seen": datetime.now(timezone.utc),
+                "is_active": True
+            }
+        return None
     
     async def discover_extension(self, user: User) -> Optional[Dict[str, Any]]:
         """
         Discover extension endpoint for a user.
-        This could be enhanced with service discovery mechanisms.
+        
+        Every candidate host/port is probed at once with a short timeout, and
+        the first match wins; the remaining probes are cancelled. A miss is
+        remembered for `extension_negative_cache_ttl` seconds so a user without
+        a running extension doesn't trigger a rescan on every request.
+        Concurrent callers for the same user share one scan.
         """
-        # For now, we'll use common ports and localhost
-        # This should be enhanced with proper service discovery
-        common_ports = [8001, 8002, 8003, 8004, 8005]
-        hosts = ["localhost", "127.0.0.1"]
-        
-        for host in hosts:
-            for port in common_ports:
-                try:
-                    endpoint = f"http://{host}:{port}"
-                    async with aiohttp.ClientSession(timeout=self.session_timeout) as session:
-                        async with session.get(f"{endpoint}/api/health") as response:
-                            if response.status == 200:
-                                data = await response.json()
-                                # Verify this is the correct user's extension
-                                if data.get("userId") == str(user.id) or data.get("githubId") == user.github_id:
-                                    extension_info = {
-                                        "user_id": user.id,
-                                        "github_id": user.github_id,
-                                        "host": host,
-                                        "port": port,
-                                        "endpoint": endpoint,
-                                        "last_seen": datetime.now(timezone.utc),
-                                        "is_active": True
-                                    }
-                                    self._extension_registry[str(user.id)] = extension_info
-                                    logger.info(f"Discovered extension for user {user.username} at {endpoint}")
-                                    return extension_info
-                except Exception as e:
-                    logger.debug(f"Failed to discover extension at {host}:{port} - {e}")
-                    continue
-        
-        logger.warning(f"Could not discover extension for user {user.username}")
+        user_id = str(user.id)
+        retry_at = self._negative_cache.get(user_id)
+        if retry_at is not None:
+            if time.monotonic() < retry_at:
+                return None
+            del self._negative_cache[user_id]
+        
+        scan = self._discovery_scans.get(user_id)
+        if scan is None:
+            scan = asyncio.ensure_future(self._scan(user))
+            self._discovery_scans[user_id] = scan
+            scan.add_done_callback(lambda _: self._discovery_scans.pop(user_id, None))
+        return await asyncio.shield(scan)
+    
+    async def _scan(self, user: User) -> Optional[Dict[str, Any]]:
+        user_id = str(user.id)
+        # With several workers, another one may already have found the extension:
+        # one probe of the saved endpoint is cheaper than a full scan.
+        stored = await self._stored_extension(user_id)
+        known = self._extension_registry.get(user_id)
+        if stored and stored["is_active"] and (not known or known["endpoint"] != stored["endpoint"]):
+            extension_info = await self._probe(user, stored["host"], stored["port"])
+            if extension_info:
+                self._extension_registry[user_id] = extension_info
+                self._breaker(extension_info["endpoint"]).record_success()
+                return extension_info
+        
+        probes = [
+            asyncio.ensure_future(self._probe(user, host, port))
+            for host in settings.extension_discovery_hosts
+            for port in settings.extension_discovery_ports
+        ]
+        try:
+            for next_probe in asyncio.as_completed(probes):
+                extension_info = await next_probe
+                if extension_info:
+                    self._extension_registry[user_id] = extension_info
+                    self._breaker(extension_info["endpoint"]).record_success()
+                    await self._persist_extension(user_id)
+                    logger.info("Discovered extension for user %s at %s", user.username, extension_info["endpoint"])
+                    return extension_info
+        finally:
+            for probe in probes:
+                probe.cancel()
+            await asyncio.gather(*probes, return_exceptions=True)
+        
+        self._negative_cache[user_id] = time.monotonic() + settings.extension_negative_cache_ttl
+        logger.warning("Could not discover extension for user %s", user.username)
         return None
     
     async def fetch_sessions_from_extension(
@@ -73,69 +314,236 @@ class ExtensionClient:
         limit: int = 100
     ) -> List[FileSessionSchema]:
         """
-        Fetch session data from an extension.
+        Fetch one page of session data from an extension.
         """
-        # Get or discover extension endpoint
-        extension_info = self._extension_registry.get(str(user.id))
-        if not extension_info or not extension_info.get("is_active"):
-            extension_info = await self.discover_extension(user)
-            if not extension_info:
-                raise ConnectionError(f"Cannot connect to extension for user {user.username}")
+        page = await self.fetch_session_page(user, user_token, since, limit)
+        return page.sessions
+    
+    async def fetch_session_page(
+        self,
+        user: User,
+        user_token: str,
+        since: Optional[datetime] = None,
+        limit: int = 100
+    ) -> ExtensionSessionsResponse:
+        """
+        Fetch one export page, including its `hasMore` flag and `lastSyncTime` watermark.
+        
+        Holds the whole page in memory; syncs use `stream_session_page` instead.
+        """
+        # Keyed by id: a retried request hands over sessions that were already received.
+        sessions: Dict[str, FileSessionSchema] = {}
+        
+        async def collect(batch: List[FileSessionSchema]):
+            for session in batch:
+                sessions[session.id] = session
         
+        page = await self.stream_session_page(user, user_token, collect, since, limit)
+        page.sessions = list(sessions.values())
+        return page
+    
+    async def stream_session_page(
+        self,
+        user: User,
+        user_token: str,
+        on_batch: SessionBatchHandler,
+        since: Optional[datetime] = None,
+        limit: int = 100
+    ) -> ExtensionSessionsResponse:
+        """
+        Fetch one export page, passing its sessions to `on_batch` as they are decoded.
+        
+        The body is parsed incrementally (see `app/services/export_stream.py`)
+        and handed over in batches of `extension_sync_batch_size`, so a huge
+        page never sits in memory whole. If an attempt fails part-way and is
+        retried, `on_batch` sees the sessions of the retried page again. The
+        returned page carries `hasMore` and `lastSyncTime`; its `sessions` is
+        empty.
+        
+        Calls go through the endpoint's circuit breaker: while it is open this
+        raises `CircuitOpenError` straight away instead of waiting on a dead
+        extension, and retries are immediate rather than slept between.
+        """
+        user_id = str(user.id)
+        extension_info = self._extension_registry.get(user_id)
+        breaker = self._breaker(extension_info["endpoint"]) if extension_info else None
+        if breaker is not None and not breaker.allow():
+            raise CircuitOpenError(
+                f"Extension for user {user.username} is unavailable; retrying in {breaker.retry_in():.0f}s"
+            )
+        
+        try:
+            # Get or rediscover the extension endpoint; it may have moved port.
+            if not extension_info or not extension_info.get("is_active"):
+                discovered = await self.discover_extension(user)
+                if not discovered:
+                    if breaker is not None:
+                        breaker.record_failure()
+                    raise ConnectionError(f"Cannot connect to extension for user {user.username}")
+                if breaker is not None and discovered["endpoint"] != extension_info["endpoint"]:
+                    breaker.release()
+                extension_info = discovered
+                breaker = self._breaker(extension_info["endpoint"])
+            
+            return await self._request_page(user, user_token, extension_info, breaker, on_batch, since, limit)
+        finally:
+            # A cancelled half-open trial must not keep the breaker shut.
+            if breaker is not None:
+                breaker.release()
+    
+    async def _request_page(
+        self,
+        user: User,
+        user_token: str,
+        extension_info: Dict[str, Any],
+        breaker: CircuitBreaker,
+        on_batch: SessionBatchHandler,
+        since: Optional[datetime],
+        limit: int
+    ) -> ExtensionSessionsResponse:
+        import aiohttp
+
         endpoint = extension_info["endpoint"]
         
         # Prepare request payload
         request_data = ExtensionSessionsRequest(
             since=since,
             limit=limit
-        ).dict()
+        ).model_dump(mode="json")
         
-        # Attempt to fetch sessions with retry logic
         for attempt in range(self.retry_attempts):
+            # Stop retrying as soon as the failures so far have opened the breaker.
+            if attempt and not breaker.allow():
+                break
             try:
-                async with aiohttp.ClientSession(timeout=self.session_timeout) as session:
-                    async with session.post(
-                        f"{endpoint}/api/sessions/export",
-                        json=request_data,
-                        headers={"Authorization": f"Bearer {user_token}"}
-                    ) as response:
-                        if response.status == 200:
-                            data = await response.json()
-                            
-                            # Parse response
-                            sessions_response = ExtensionSessionsResponse(**data)
-                            
-                            # Update extension registry
-                            extension_info["last_seen"] = datetime.now(timezone.utc)
-                            extension_info["is_active"] = True
-                            
-                            logger.info(f"Fetched {len(sessions_response.sessions)} sessions from extension for user {user.username}")
-                            return sessions_response.sessions
+                session = self._get_session()
+                async with session.post(
+                    f"{endpoint}/api/sessions/export",
+                    json=request_data,
+                    headers={"Authorization": f"Bearer {user_token}", "Accept": ACCEPT_HEADER},
+                    timeout=self.export_timeout
+                ) as response:
+                    if response.status == 200:
+                        stream = ExportStream(response.content_type, settings.extension_sync_batch_size)
+                        async for batch in stream.batches(response.content.iter_chunked(EXPORT_CHUNK_BYTES)):
+                            await on_batch(batch)
+                        sessions_response = stream.page()
                         
-                        elif response.status == 404:
-                            logger.warning(f"Extension endpoint not found for user {user.username}")
-                            break
+                        # Update extension registry
+                        extension_info["last_seen"] = datetime.now(timezone.utc)
+                        extension_info["is_active"] = True
+                        breaker.record_success()
                         
-                        elif response.status == 401:
-                            logger.warning(f"Authentication failed for user {user.username}")
-                            break
+                        logger.debug("Fetched %d sessions from extension for user %s", stream.count, user.username)
+                        return sessions_response
+                    
+                    elif response.status == 401:
+                        # The extension is up; only the token is wrong.
+                        logger.warning("Authentication failed for user %s", user.username)
+                        breaker.record_success()
+                        raise ConnectionError(f"Extension rejected the token for user {user.username}")
+                    
+                    elif response.status == 404:
+                        logger.warning("Extension endpoint not found for user %s", user.username)
+                        breaker.record_failure()
+                        break
+                    
+                    else:
+                        logger.warning("Extension returned status %s for user %s", response.status, user.username)
                         
-                        else:
-                            logger.warning(f"Extension returned status {response.status} for user {user.username}")
-                            
             except asyncio.TimeoutError:
-                logger.warning(f"Timeout connecting to extension for user {user.username} (attempt {attempt + 1})")
-            except Exception as e:
-                logger.error(f"Error fetching sessions from extension for user {user.username}: {e}")
+                logger.warning("Timeout connecting to extension for user %s (attempt %d)", user.username, attempt + 1)
+            except aiohttp.ClientError as e:
+                logger.warning("Cannot reach extension for user %s (attempt %d): %s", user.username, attempt + 1, e)
+            except ConnectionError:
+                raise
+            except ValueError as e:
+                # Includes JSON and schema validation errors; storage errors from on_batch propagate.
+                logger.error("Malformed export response from extension for user %s: %s", user.username, e)
             
-            if attempt < self.retry_attempts - 1:
-                await asyncio.sleep(2 ** attempt)  # Exponential backoff
+            breaker.record_failure()
         
         # Mark extension as inactive if all attempts failed
-        if extension_info:
-            extension_info["is_active"] = False
+        extension_info["is_active"] = False
+        await self._persist_extension(str(user.id))
+        
+        raise ConnectionError(f"Failed to fetch sessions from extension for user {user.username}")
+    
+    async def get_sync_cursor(self, db: AsyncSession, user_id: str) -> Optional[datetime]:
+        """The watermark the next sync for this user continues from."""
+        result = await db.execute(
+            select(SyncCursor.last_sync_time).where(SyncCursor.user_id == user_id)
+        )
+        return _as_utc(result.scalar_one_or_none())
+    
+    async def _save_sync_cursor(self, db: AsyncSession, user_id: str, last_sync_time: datetime):
+        values = {"last_sync_time": last_sync_time, "updated_at": datetime.now(timezone.utc)}
+        await db.execute(
+            sqlite_insert(SyncCursor)
+            .values(user_id=user_id, **values)
+            .on_conflict_do_update(index_elements=[SyncCursor.user_id], set_=values)
+        )
+    
+    async def _store_sessions(self, db: AsyncSession, user: User, sessions: List[FileSessionSchema]) -> int:
+        """
+        Upsert fetched sessions. Returns the number processed.
+        
+        Each chunk of up to `UPSERT_ROWS_PER_STATEMENT` sessions is written by
+        a single multi-row INSERT ... ON CONFLICT DO UPDATE, so SQLite parses
+        and runs one statement per chunk rather than one per session (see
+        `_compiled_upsert`). Ids already owned by another user are left
+        alone, and an "unknown" editor/platform never overwrites a known one.
+        """
+        if not sessions:
+            return 0
+        
+        user_id = str(user.id)
+        now = datetime.now(timezone.utc)
+        rows = [
+            {
+                "id": session_data.id,
+                "user_id": user_id,
+                "file_path": session_data.filePath,
+                "file_name": session_data.fileName,
+                "file_extension": session_data.fileExtension,
+                "language": normalize_language(session_data.language),
+                "project_name": session_data.projectName,
+                "project_path": session_data.projectPath,
+                "session_start_time": session_data.sessionStartTime,
+                "session_end_time": session_data.sessionEndTime,
+                **session_time_columns(session_data.sessionStartTime, session_data.sessionEndTime),
+                "total_duration": session_data.totalDuration,
+                "lines_added": session_data.linesAdded,
+                "lines_deleted": session_data.linesDeleted,
+                "lines_modified": session_data.linesModified,
+                "characters_added": session_data.charactersAdded,
+                "characters_deleted": session_data.charactersDeleted,
+                "characters_modified": session_data.charactersModified,
+                "total_edits": session_data.totalEdits,
+                "editor": session_data.editor or UNKNOWN,
+                "platform": session_data.platform or UNKNOWN,
+                "is_active": session_data.isActive,
+                "created_at": now,
+                "updated_at": now,
+            }
+            for session_data in sessions
+        ]
         
-        raise ConnectionError(f"Failed to fetch sessions from extension for user {user.username} after {self.retry_attempts} attempts")
+        connection = await db.connection()
+        dialect = connection.dialect
+        processors = _bind_processors(dialect)
+        for row in rows:
+            for name, processor in processors.items():
+                row[name] = processor(row[name])
+        for start in range(0, len(rows), UPSERT_ROWS_PER_STATEMENT):
+            chunk = rows[start:start + UPSERT_ROWS_PER_STATEMENT]
+            sql, slots = _compiled_upsert(dialect, len(chunk))
+            parameters = tuple(chunk[row][column] if row is not None else column for row, column in slots)
+            await connection.exec_driver_sql(sql, parameters)
+        SESSIONS_SYNCED.inc(len(rows))
+        
+        logger.debug("Upserted %d sessions for user %s", len(rows), user.username)
+        return len(rows)
     
     async def sync_user_sessions(
         self, 
@@ -146,99 +554,81 @@ class ExtensionClient:
     ) -> int:
         """
         Sync sessions from extension to database for a specific user.
-        Returns the number of sessions synced.
+        
+        Continues from the user's persisted sync cursor unless `since` is
+        given, and keeps requesting pages while the extension reports
+        `hasMore`. Sessions are stored and committed in batches while a page
+        is still downloading; the cursor advances once the whole page is in,
+        so an interrupted sync resumes from the last complete page instead of
+        skipping data. `db` must be a session on the user's shard. Returns
+        the number of sessions synced.
         """
+        user_id = str(user.id)
+        synced_count = 0
         try:
-            # Fetch sessions from extension
-            sessions = await self.fetch_sessions_from_extension(user, user_token, since)
+            cursor = since if since is not None else await self.get_sync_cursor(db, user_id)
             
-            if not sessions:
-                logger.info(f"No new sessions found for user {user.username}")
-                return 0
+            received = 0
             
-            synced_count = 0
+            async def store(batch: List[FileSessionSchema]):
+                # Batches are committed as they arrive; storing is idempotent, so
+                # a page interrupted before its cursor is saved is simply re-sent.
+                nonlocal synced_count, received
+                received += len(batch)
+                synced_count += await self._store_sessions(db, user, batch)
+                await db.commit()
             
-            for session_data in sessions:
-                # Check if session already exists
-                existing_session_query = select(FileSession).where(
-                    FileSession.id == session_data.id,
-                    FileSession.user_id == user.id
+            for _ in range(settings.extension_sync_max_pages):
+                received = 0
+                page = await self.stream_session_page(
+                    user, user_token, store, cursor, settings.extension_sync_page_size
                 )
-                existing_session_result = await db.execute(existing_session_query)
-                existing_session = existing_session_result.scalar_one_or_none()
+                await self._save_sync_cursor(db, user_id, page.lastSyncTime)
+                await db.commit()
                 
-                if existing_session:
-                    # Update existing session
-                    await db.execute(
-                        update(FileSession)
-                        .where(FileSession.id == session_data.id, FileSession.user_id == user.id)
-                        .values(
-                            file_path=session_data.filePath,
-                            file_name=session_data.fileName,
-                            file_extension=session_data.fileExtension,
-                            language=session_data.language,
-                            project_name=session_data.projectName,
-                            project_path=session_data.projectPath,
-                            session_start_time=session_data.sessionStartTime,
-                            session_end_time=session_data.sessionEndTime,
-                            total_duration=session_data.totalDuration,
-                            lines_added=session_data.linesAdded,
-                            lines_deleted=session_data.linesDeleted,
-                            lines_modified=session_data.linesModified,
-                            characters_added=session_data.charactersAdded,
-                            characters_deleted=session_data.charactersDeleted,
-                            characters_modified=session_data.charactersModified,
-                            total_edits=session_data.totalEdits,
-                            is_active=session_data.isActive,
-                            updated_at=datetime.now(timezone.utc)
-                        )
+                if not page.hasMore or not received:
+                    break
+                if cursor is not None and _as_utc(page.lastSyncTime) <= _as_utc(cursor):
+                    # The watermark didn't move: asking again would return the same page.
+                    logger.warning(
+                        "Extension for user %s reported more sessions without advancing lastSyncTime", user.username
                     )
-                    logger.debug(f"Updated session {session_data.id} for user {user.username}")
-                else:
-                    # Create new session
-                    new_session = FileSession(
-                        id=session_data.id,
-                        user_id=user.id,  # Use user_id instead of device_id
-                        file_path=session_data.filePath,
-                        file_name=session_data.fileName,
-                        file_extension=session_data.fileExtension,
-                        language=session_data.language,
-                        project_name=session_data.projectName,
-                        project_path=session_data.projectPath,
-                        session_start_time=session_data.sessionStartTime,
-                        session_end_time=session_data.sessionEndTime,
-                        total_duration=session_data.totalDuration,
-                        lines_added=session_data.linesAdded,
-                        lines_deleted=session_data.linesDeleted,
-                        lines_modified=session_data.linesModified,
-                        characters_added=session_data.charactersAdded,
-                        characters_deleted=session_data.charactersDeleted,
-                        characters_modified=session_data.charactersModified,
-                        total_edits=session_data.totalEdits,
-                        editor="unknown",  # Can be populated from extension data
-                        platform="unknown",  # Can be populated from extension data
-                        is_active=session_data.isActive
-                    )
-                    db.add(new_session)
-                    logger.debug(f"Created new session {session_data.id} for user {user.username}")
-                
-                synced_count += 1
+                    break
+                cursor = page.lastSyncTime
+            else:
+                logger.warning("Stopped syncing user %s after %d pages", user.username, settings.extension_sync_max_pages)
             
-            await db.commit()
-            logger.info(f"Synced {synced_count} sessions for user {user.username}")
+            if synced_count == 0:
+                logger.debug("No new sessions found for user %s", user.username)
+            else:
+                logger.info("Synced %d sessions for user %s", synced_count, user.username)
             return synced_count
             
         except ConnectionError as e:
-            logger.warning(f"Failed to sync sessions for user {user.username}: {e}")
-            return 0
+            # Pages committed before the failure stay, along with their cursor.
+            logger.warning("Failed to sync sessions for user %s: %s", user.username, e)
+            return synced_count
         except Exception as e:
             await db.rollback()
-            logger.error(f"Error syncing sessions for user {user.username}: {e}")
+            logger.error("Error syncing sessions for user %s: %s", user.username, e)
             raise
     
+    def _breaker(self, endpoint: str) -> CircuitBreaker:
+        breaker = self._breakers.get(endpoint)
+        if breaker is None:
+            breaker = CircuitBreaker(
+                settings.extension_breaker_failure_threshold,
+                settings.extension_breaker_reset_timeout,
+            )
+            self._breakers[endpoint] = breaker
+        return breaker
+    
     def get_extension_status(self, user_id: str) -> Optional[Dict[str, Any]]:
-        """Get the current status of an extension for a user."""
-        return self._extension_registry.get(user_id)
+        """Get the current status of an extension for a user, including its circuit breaker."""
+        info = self._extension_registry.get(user_id)
+        if info is None:
+            return None
+        return {**info, "breaker": self._breaker(info["endpoint"]).snapshot()}
     
     def mark_extension_inactive(self, user_id: str):
         """Mark an extension as inactive for a user."""
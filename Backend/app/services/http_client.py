@@ -0,0 +1,51 @@
+"""
+Shared outbound HTTP client for third-party APIs (GitHub OAuth).
+
+One pooled `httpx.AsyncClient` lives for the whole process, so logins reuse
+warm TLS connections instead of paying a handshake to each host on every
+request. HTTP/2 is negotiated when the optional `h2` package is installed
+(`pip install httpx[http2]`), letting concurrent calls to the same host share
+one connection.
+"""
+
+import importlib.util
+from typing import TYPE_CHECKING, Optional
+
+from app.config import settings
+
+if TYPE_CHECKING:
+    import httpx
+
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+_client: Optional["httpx.AsyncClient"] = None
+
+
+def get_http_client() -> "httpx.AsyncClient":
+    """
+    The shared client, created on first use so scripts and tests need no lifespan.
+
+    httpx is imported here rather than at module level: only GitHub logins
+    need it, and boot shouldn't pay for the import.
+    """
+    global _client
+    if _client is None or _client.is_closed:
+        import httpx
+
+        _client = httpx.AsyncClient(
+            http2=HTTP2_AVAILABLE,
+            timeout=settings.http_client_timeout,
+            limits=httpx.Limits(
+                max_connections=settings.http_client_max_connections,
+                max_keepalive_connections=settings.http_client_max_keepalive,
+            ),
+        )
+    return _client
+
+
+async def close_http_client():
+    """Close the shared client. Called from the app lifespan."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
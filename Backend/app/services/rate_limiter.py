@@ -0,0 +1,237 @@
+"""
+Per-user admission control: a token bucket plus a bound on requests in flight.
+
+Each route class ("ingest" for session writes, "read" for dashboard queries)
+has its own limits. A user gets `burst` requests at once, refilled at `rate`
+per second, and at most `max_in_flight` of their requests of that class run
+concurrently; anything beyond is refused with 429 and a `Retry-After` hint.
+One extension stuck in a resend loop then costs its own user a 429 instead of
+holding the shared SQLite writer for everyone.
+
+State lives in process by default. With several workers, set
+`rate_limit_backend = "redis"` (requires the optional `redis` package) so all
+workers draw from the same buckets.
+"""
+
+import logging
+import math
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional
+
+from app import metrics
+from app.config import settings
+from app.utils.cache import TTLCache
+
+try:
+    import redis.asyncio as redis
+except ImportError:  # optional dependency
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMIT_DECISIONS = metrics.counter(
+    "afk_rate_limit_decisions_total",
+    "Admission decisions by route class and outcome",
+    ["route_class", "outcome"],
+)
+
+
+@dataclass(frozen=True)
+class RouteLimit:
+    rate: float  # tokens per second
+    burst: int
+    max_in_flight: int
+
+
+class RateLimited(Exception):
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class InMemoryBackend:
+    """Buckets and in-flight counts for this process only."""
+
+    def __init__(self, max_keys: int = 100_000, clock: Callable[[], float] = time.monotonic):
+        self.max_keys = max_keys
+        self._clock = clock
+        self._buckets: Dict[str, TTLCache] = {}
+        self._in_flight: Dict[str, int] = {}
+
+    async def take(self, key: str, limit: RouteLimit) -> float:
+        """Take one token; returns 0 if granted, else seconds until one is available."""
+        route_class = key.split(":", 1)[0]
+        # An untouched bucket refills completely in burst / rate seconds, after
+        # which forgetting it is the same as keeping it full.
+        buckets = self._buckets.get(route_class)
+        if buckets is None:
+            buckets = TTLCache(f"rate_limit_{route_class}", self.max_keys, limit.burst / limit.rate, self._clock)
+            self._buckets[route_class] = buckets
+
+        now = self._clock()
+        tokens, updated = buckets.get(key) or (float(limit.burst), now)
+        tokens = min(limit.burst, tokens + (now - updated) * limit.rate)
+        if tokens >= 1:
+            buckets.set(key, (tokens - 1, now))
+            return 0.0
+        buckets.set(key, (tokens, now))
+        return (1 - tokens) / limit.rate
+
+    async def enter(self, key: str, limit: RouteLimit) -> bool:
+        current = self._in_flight.get(key, 0)
+        if current >= limit.max_in_flight:
+            return False
+        self._in_flight[key] = current + 1
+        return True
+
+    async def leave(self, key: str) -> None:
+        current = self._in_flight.get(key, 0) - 1
+        if current > 0:
+            self._in_flight[key] = current
+        else:
+            self._in_flight.pop(key, None)
+
+    def in_flight(self) -> Dict[str, int]:
+        return dict(self._in_flight)
+
+
+# Token bucket in one round trip, timed by the Redis server's clock so workers agree.
+_TAKE_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(state[1]) or burst
+local updated = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - updated) * rate)
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(burst / rate * 1000) + 1000)
+return tostring(wait)
+"""
+
+
+class RedisBackend:
+    """Buckets and in-flight counts shared by every worker through Redis."""
+
+    # In-flight counters expire so a worker that dies mid-request can't leak slots forever.
+    IN_FLIGHT_TTL_SECONDS = 60
+
+    def __init__(self, url: str, prefix: str = "afk:rl:"):
+        if redis is None:
+            raise RuntimeError("rate_limit_backend is 'redis' but the redis package is not installed")
+        self._redis = redis.from_url(url)
+        self._prefix = prefix
+        self._take = self._redis.register_script(_TAKE_SCRIPT)
+
+    async def take(self, key: str, limit: RouteLimit) -> float:
+        wait = await self._take(keys=[f"{self._prefix}bucket:{key}"], args=[limit.rate, limit.burst])
+        return float(wait)
+
+    async def enter(self, key: str, limit: RouteLimit) -> bool:
+        name = f"{self._prefix}inflight:{key}"
+        async with self._redis.pipeline(transaction=True) as pipe:
+            current, _ = await pipe.incr(name).expire(name, self.IN_FLIGHT_TTL_SECONDS).execute()
+        if current > limit.max_in_flight:
+            await self._redis.decr(name)
+            return False
+        return True
+
+    async def leave(self, key: str) -> None:
+        await self._redis.decr(f"{self._prefix}inflight:{key}")
+
+    def in_flight(self) -> Dict[str, int]:
+        return {}  # lives in Redis; not mirrored locally
+
+    async def close(self) -> None:
+        await self._redis.aclose()
+
+
+class RateLimiter:
+    def __init__(self, limits: Dict[str, RouteLimit], backend=None, enabled: bool = True):
+        self.limits = limits
+        self.backend = backend or InMemoryBackend()
+        self.enabled = enabled
+
+    async def acquire(self, route_class: str, user_id: str) -> Optional[str]:
+        """
+        Admit one request, or raise `RateLimited`.
+
+        Returns the key to pass to `release` once the request is done, or
+        None if nothing needs releasing.
+        """
+        limit = self.limits.get(route_class)
+        if not self.enabled or limit is None:
+            return None
+
+        key = f"{route_class}:{user_id}"
+        if not await self.backend.enter(key, limit):
+            RATE_LIMIT_DECISIONS.inc(route_class=route_class, outcome="in_flight")
+            raise RateLimited("Too many requests in progress", retry_after=1)
+
+        try:
+            wait = await self.backend.take(key, limit)
+        except Exception:
+            await self.backend.leave(key)
+            raise
+        if wait > 0:
+            await self.backend.leave(key)
+            RATE_LIMIT_DECISIONS.inc(route_class=route_class, outcome="rate")
+            raise RateLimited("Rate limit exceeded", retry_after=wait)
+
+        RATE_LIMIT_DECISIONS.inc(route_class=route_class, outcome="admitted")
+        return key
+
+    async def release(self, key: Optional[str]) -> None:
+        if key is not None:
+            await self.backend.leave(key)
+
+    async def close(self) -> None:
+        if isinstance(self.backend, RedisBackend):
+            await self.backend.close()
+
+
+def retry_after_header(seconds: float) -> str:
+    return str(max(1, math.ceil(seconds)))
+
+
+def _create_rate_limiter() -> RateLimiter:
+    limits = {
+        "ingest": RouteLimit(
+            settings.rate_limit_ingest_per_second,
+            settings.rate_limit_ingest_burst,
+            settings.rate_limit_ingest_in_flight,
+        ),
+        "read": RouteLimit(
+            settings.rate_limit_read_per_second,
+            settings.rate_limit_read_burst,
+            settings.rate_limit_read_in_flight,
+        ),
+    }
+    backend = RedisBackend(settings.rate_limit_redis_url) if settings.rate_limit_backend == "redis" else None
+    return RateLimiter(limits, backend, enabled=settings.rate_limit_enabled)
+
+
+rate_limiter = _create_rate_limiter()
+
+
+def _in_flight_samples():
+    totals: Dict[str, int] = {}
+    for key, count in rate_limiter.backend.in_flight().items():
+        route_class = key.split(":", 1)[0]
+        totals[route_class] = totals.get(route_class, 0) + count
+    for route_class, count in totals.items():
+        yield (route_class,), count
+
+
+metrics.gauge(
+    "afk_rate_limit_in_flight", "Admitted requests still running, by route class", ["route_class"]
+).set_function(_in_flight_samples)
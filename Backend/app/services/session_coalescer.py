@@ -0,0 +1,312 @@
+"""
+Merging of adjacent focus sessions.
+
+The extension opens a new session every time focus returns to a file, so
+flicking between two tabs produces a stream of short rows for the same file.
+Consecutive sessions for the same user, file and editor separated by less than
+`session_coalesce_gap_seconds` are folded into the earlier row with their
+counters summed.
+
+At ingest, only the user's most recently started row (their "tail") can
+absorb a new session. Each worker keeps a small per-user buffer of tails so
+the common case doesn't re-read it; the buffer is only a hint. The merge is a
+single UPDATE that applies only while that row is still the user's latest and
+still ends where the buffer says, and it runs under SQLite's write lock. When
+another worker moved the tail in the meantime, the buffer entry is dropped
+and the tail re-read from the database once; a session that still doesn't
+fit is inserted rather than folded into a row that is no longer its
+predecessor. Rows written before coalescing existed — or while the gap was set
+to 0 — are merged by `coalesce_existing_sessions`, run from
+`coalesce_sessions.py`.
+
+Every id folded into another row, by either path, is stored in
+`session_aliases` with the row it went into. The extension may resend a session
+long after it was merged, so the alias outlives the tail and restarts; a
+resent id is answered as a duplicate instead of being stored and counted again.
+At ingest the alias is claimed before the merge, so of two concurrent sends of
+the same id only one is counted.
+"""
+
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import delete, exists, func, insert, select, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import queries
+from app.config import settings
+from app.models import FileSession, SessionAlias, to_epoch
+from app.utils.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# Counters that add up when two sessions are merged.
+COALESCED_COUNTERS = (
+    "total_duration",
+    "lines_added",
+    "lines_deleted",
+    "lines_modified",
+    "characters_added",
+    "characters_deleted",
+    "characters_modified",
+    "total_edits",
+)
+
+
+@dataclass
+class _Tail:
+    row_id: str
+    file_path: str
+    editor: str
+    end_time: Optional[datetime]
+    start_epoch: int
+
+
+def _naive(value: datetime) -> datetime:
+    # Stored timestamps come back naive (UTC); incoming ones are aware.
+    return value.replace(tzinfo=None) if value.tzinfo else value
+
+
+def is_adjacent(previous_end: Optional[datetime], next_start: datetime, gap_seconds: int) -> bool:
+    """Whether a session starting at `next_start` continues one that ended at `previous_end`."""
+    if previous_end is None or gap_seconds <= 0:
+        return False
+    gap = _naive(next_start) - _naive(previous_end)
+    return timedelta(0) <= gap <= timedelta(seconds=gap_seconds)
+
+
+class SessionCoalescer:
+    """Merges sessions into the user's tail row as they are ingested."""
+
+    def __init__(self, gap_seconds: int, max_users: int):
+        self.gap_seconds = gap_seconds
+        self._tails: TTLCache[str, _Tail] = TTLCache("coalesce_tails", max_users)
+
+    @property
+    def enabled(self) -> bool:
+        return self.gap_seconds > 0
+
+    @staticmethod
+    async def merged_into(db: AsyncSession, user_id: str, session_id: str) -> Optional[str]:
+        """The row a previously merged session id was folded into, if any."""
+        return (await db.execute(queries.session_alias_target(session_id, user_id))).scalar_one_or_none()
+
+    async def _load_tail(self, db: AsyncSession, user_id: str) -> Optional[_Tail]:
+        row = (await db.execute(queries.user_latest_session(user_id))).one_or_none()
+        if row is None:
+            return None
+        tail = _Tail(row.id, row.file_path, row.editor, row.session_end_time, row.start_epoch)
+        self._tails.set(user_id, tail)
+        return tail
+
+    def _continues(self, tail: Optional[_Tail], file_path: str, editor: str, start_time: datetime) -> bool:
+        return (
+            tail is not None
+            and tail.file_path == file_path
+            and tail.editor == editor
+            and is_adjacent(tail.end_time, start_time, self.gap_seconds)
+        )
+
+    async def merge_into_tail(
+        self,
+        db: AsyncSession,
+        user_id: str,
+        session_id: str,
+        file_path: str,
+        editor: str,
+        start_time: datetime,
+        end_time: Optional[datetime],
+        is_active: Optional[bool],
+        counters: Dict[str, int],
+    ) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Fold a new session into the user's tail row when it continues it.
+
+        Returns the id of the row it went into and "merged", or "duplicate"
+        when a concurrent request already merged the same id. (None, None)
+        means it should be inserted: no adjacent tail, or the tail moved and
+        the one re-read from the database doesn't fit either.
+        """
+        if not self.enabled or end_time is None:
+            return None, None
+        tail = self._tails.get(user_id)
+        buffered = tail is not None
+        if not buffered:
+            tail = await self._load_tail(db, user_id)
+
+        while self._continues(tail, file_path, editor, start_time):
+            # Claiming the alias first takes the write lock, so a second
+            # request merging the same id waits here and then finds it taken.
+            claimed = await db.execute(
+                sqlite_insert(SessionAlias)
+                .values(user_id=user_id, session_id=session_id, row_id=tail.row_id)
+                .on_conflict_do_nothing()
+            )
+            if not claimed.rowcount:
+                return await self.merged_into(db, user_id, session_id), "duplicate"
+
+            later = (
+                select(FileSession.id)
+                .where(FileSession.user_id == user_id, FileSession.start_epoch > tail.start_epoch)
+            )
+            result = await db.execute(
+                update(FileSession)
+                .where(
+                    FileSession.id == tail.row_id,
+                    FileSession.user_id == user_id,
+                    FileSession.session_end_time == tail.end_time,
+                    ~exists(later),
+                )
+                .values(
+                    session_end_time=end_time,
+                    end_epoch=to_epoch(end_time),
+                    is_active=is_active,
+                    updated_at=datetime.now(timezone.utc),
+                    **{
+                        name: func.coalesce(getattr(FileSession, name), 0) + (counters.get(name) or 0)
+                        for name in COALESCED_COUNTERS
+                    },
+                )
+                .execution_options(synchronize_session=False)
+            )
+            if result.rowcount:
+                return tail.row_id, "merged"
+
+            await db.execute(
+                delete(SessionAlias).where(SessionAlias.user_id == user_id, SessionAlias.session_id == session_id)
+            )
+            self._tails.pop(user_id)
+            if not buffered:
+                break
+            buffered = False
+            tail = await self._load_tail(db, user_id)
+        return None, None
+
+    def remember(
+        self,
+        user_id: str,
+        row_id: str,
+        file_path: str,
+        editor: str,
+        end_time: Optional[datetime],
+        start_epoch: Optional[int] = None,
+    ) -> None:
+        """
+        Record the user's tail after the transaction that wrote it committed:
+        a row merged into (`start_epoch` unchanged) or a newly inserted one.
+        """
+        if not self.enabled:
+            return
+        tail = self._tails.get(user_id)
+        if tail is not None and tail.row_id == row_id:
+            tail.end_time = end_time
+        elif start_epoch is not None and (tail is None or start_epoch >= tail.start_epoch):
+            self._tails.set(user_id, _Tail(row_id, file_path, editor, end_time, start_epoch))
+
+
+async def coalesce_existing_sessions(
+    db: AsyncSession,
+    gap_seconds: int,
+    user_id: Optional[str] = None,
+    dry_run: bool = False,
+) -> Dict[str, int]:
+    """
+    Merge adjacent sessions already in the database.
+
+    Works one user at a time, committing after each, and folds every run of
+    adjacent sessions on the same file and editor into the first row of the
+    run. Each deleted id is kept as an alias of the row it went into, and
+    aliases that pointed at a deleted row are moved along with it. Returns how
+    many rows were scanned, how many absorbed others, and how many were
+    deleted.
+    """
+    if user_id:
+        user_ids = [user_id]
+    else:
+        user_ids = (await db.execute(select(FileSession.user_id).distinct())).scalars().all()
+
+    columns = [
+        FileSession.id,
+        FileSession.file_path,
+        FileSession.editor,
+        FileSession.session_start_time,
+        FileSession.session_end_time,
+        FileSession.is_active,
+    ] + [getattr(FileSession, name) for name in COALESCED_COUNTERS]
+
+    stats = {"scanned": 0, "merged_into": 0, "deleted": 0}
+    for uid in user_ids:
+        rows = (
+            await db.execute(
+                select(*columns)
+                .where(FileSession.user_id == uid)
+                .order_by(FileSession.session_start_time)
+            )
+        ).mappings().all()
+
+        updates: Dict[str, dict] = {}
+        deletes: List[Tuple[str, str]] = []  # (deleted row, row it was merged into)
+        target: Optional[dict] = None
+        for row in rows:
+            stats["scanned"] += 1
+            if (
+                target is not None
+                and row["session_end_time"] is not None
+                and target["file_path"] == row["file_path"]
+                and target["editor"] == row["editor"]
+                and is_adjacent(target["session_end_time"], row["session_start_time"], gap_seconds)
+            ):
+                for name in COALESCED_COUNTERS:
+                    target[name] = (target[name] or 0) + (row[name] or 0)
+                target["session_end_time"] = row["session_end_time"]
+                target["is_active"] = row["is_active"]
+                updates[target["id"]] = target
+                deletes.append((row["id"], target["id"]))
+                continue
+            target = dict(row) if row["session_end_time"] is not None else None
+
+        stats["merged_into"] += len(updates)
+        stats["deleted"] += len(deletes)
+        if dry_run or not deletes:
+            continue
+
+        for row in updates.values():
+            await db.execute(
+                update(FileSession)
+                .where(FileSession.id == row["id"])
+                .values(
+                    session_end_time=row["session_end_time"],
+                    end_epoch=to_epoch(row["session_end_time"]),
+                    is_active=row["is_active"],
+                    **{name: row[name] for name in COALESCED_COUNTERS},
+                )
+            )
+        for deleted_id, target_id in deletes:
+            await db.execute(
+                update(SessionAlias)
+                .where(SessionAlias.user_id == uid, SessionAlias.row_id == deleted_id)
+                .values(row_id=target_id)
+            )
+        await db.execute(
+            insert(SessionAlias).prefix_with("OR REPLACE"),
+            [{"user_id": uid, "session_id": deleted_id, "row_id": target_id} for deleted_id, target_id in deletes],
+        )
+        deleted_ids = [deleted_id for deleted_id, _ in deletes]
+        for start in range(0, len(deleted_ids), 500):
+            await db.execute(delete(FileSession).where(FileSession.id.in_(deleted_ids[start:start + 500])))
+        await db.commit()
+
+    logger.info(
+        "Coalesced sessions: scanned %d, merged into %d rows, deleted %d",
+        stats["scanned"], stats["merged_into"], stats["deleted"],
+    )
+    return stats
+
+
+session_coalescer = SessionCoalescer(
+    gap_seconds=settings.session_coalesce_gap_seconds,
+    max_users=settings.session_coalesce_max_users,
+)
@@ -0,0 +1,254 @@
+"""
+Background pull sync for every active user.
+
+Without this, sessions are only pulled from an extension when a request asks
+for it, so dashboards show whatever was synced last. The scheduler keeps one
+entry per active `User` and syncs each on its own interval:
+
+- a sync that stored new sessions resets the user to `sync_interval_active`;
+- a sync that found nothing (or couldn't reach the extension) doubles the
+  interval, up to `sync_interval_idle`;
+- every interval is jittered so users discovered together don't stay in
+  lockstep, and at most `sync_max_concurrency` syncs run at once.
+
+Extensions are sent a short-lived token limited to pulling (`pull_token`),
+never a full API token, since whatever answers on the extension ports gets it.
+
+Lag — seconds since a user's last successful sync — is kept per user and
+reported through /api/health/sync. Metrics only export its maximum and its
+distribution across users, so series don't grow with the user count.
+"""
+
+import asyncio
+import logging
+import random
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional, Set
+
+from sqlalchemy import select
+
+from app import metrics
+from app.config import settings
+from app.database import async_session_maker
+from app.models import User
+from app.services.extension_client import ExtensionClient, extension_client
+from app.sharding import shard_router
+from app.utils.auth import pull_token
+
+logger = logging.getLogger(__name__)
+
+SYNC_RUNS = metrics.counter(
+    "afk_sync_runs_total", "Background syncs by outcome", ["outcome"]
+)
+SYNC_SECONDS = metrics.histogram(
+    "afk_sync_duration_seconds", "Duration of one user's background sync"
+)
+
+
+@dataclass
+class _UserState:
+    user: User
+    interval: float
+    next_run: float
+    last_success: Optional[float] = None  # wall-clock time
+    last_synced: int = 0
+    failures: int = 0
+
+
+class SyncScheduler:
+    """Periodically runs `sync_user_sessions` for every active user."""
+
+    # How often the loop wakes to start due syncs, and reloads the user list.
+    TICK_SECONDS = 1.0
+    USER_REFRESH_SECONDS = 60.0
+
+    def __init__(
+        self,
+        client: ExtensionClient,
+        max_concurrency: int,
+        active_interval: float,
+        idle_interval: float,
+        jitter: float,
+    ):
+        self.client = client
+        self.active_interval = active_interval
+        self.idle_interval = max(idle_interval, active_interval)
+        self.jitter = jitter
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._users: Dict[str, _UserState] = {}
+        self._running: Set[str] = set()
+        self._tasks: Set[asyncio.Task] = set()
+        self._loop_task: Optional[asyncio.Task] = None
+        self._users_loaded_at = 0.0
+        self.started_at: Optional[float] = None
+
+    @property
+    def running(self) -> bool:
+        return self._loop_task is not None and not self._loop_task.done()
+
+    async def start(self):
+        if self.running:
+            return
+        self.started_at = time.time()
+        self._loop_task = asyncio.create_task(self._run())
+        logger.info("Background sync scheduler started")
+
+    async def stop(self):
+        if self._loop_task is None:
+            return
+        self._loop_task.cancel()
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(self._loop_task, *self._tasks, return_exceptions=True)
+        self._loop_task = None
+        self._tasks.clear()
+        self._running.clear()
+        logger.info("Background sync scheduler stopped")
+
+    def _jittered(self, interval: float) -> float:
+        return interval * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    async def _refresh_users(self):
+        async with async_session_maker() as db:
+            result = await db.execute(select(User).where(User.is_active == True))
+            users = result.scalars().all()
+
+        now = time.monotonic()
+        seen = set()
+        for user in users:
+            user_id = str(user.id)
+            seen.add(user_id)
+            state = self._users.get(user_id)
+            if state is None:
+                # Spread first syncs over one active interval rather than all at once.
+                self._users[user_id] = _UserState(
+                    user=user,
+                    interval=self.active_interval,
+                    next_run=now + random.uniform(0, self.active_interval),
+                )
+            else:
+                state.user = user
+        for user_id in set(self._users) - seen:
+            del self._users[user_id]
+        self._users_loaded_at = now
+
+    async def _run(self):
+        while True:
+            try:
+                now = time.monotonic()
+                if now - self._users_loaded_at >= self.USER_REFRESH_SECONDS:
+                    await self._refresh_users()
+                for user_id, state in self._users.items():
+                    if state.next_run <= now and user_id not in self._running:
+                        self._running.add(user_id)
+                        task = asyncio.create_task(self._sync_user(state))
+                        self._tasks.add(task)
+                        task.add_done_callback(self._tasks.discard)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("Sync scheduler iteration failed: %s", e)
+            await asyncio.sleep(self.TICK_SECONDS)
+
+    async def _sync_user(self, state: _UserState):
+        user_id = str(state.user.id)
+        try:
+            async with self._semaphore:
+                started = time.perf_counter()
+                token = pull_token(user_id)
+                async with shard_router.session_maker_for(user_id)() as db:
+                    synced = await self.client.sync_user_sessions(state.user, token, db)
+                SYNC_SECONDS.observe(time.perf_counter() - started)
+
+            # sync_user_sessions swallows connection failures; the registry tells them apart.
+            status = self.client.get_extension_status(user_id)
+            reachable = bool(status and status.get("is_active"))
+            if reachable:
+                state.last_success = time.time()
+                state.failures = 0
+                SYNC_RUNS.inc(outcome="synced" if synced else "empty")
+            else:
+                state.failures += 1
+                SYNC_RUNS.inc(outcome="unreachable")
+            state.last_synced = synced
+            state.interval = (
+                self.active_interval if synced else min(state.interval * 2, self.idle_interval)
+            )
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            state.failures += 1
+            state.interval = min(state.interval * 2, self.idle_interval)
+            SYNC_RUNS.inc(outcome="error")
+            logger.error("Background sync failed for user %s: %s", user_id, e)
+        finally:
+            state.next_run = time.monotonic() + self._jittered(state.interval)
+            self._running.discard(user_id)
+
+    def lag_seconds(self, user_id: str) -> Optional[float]:
+        """Seconds since the user's last successful sync (or since startup, if none yet)."""
+        state = self._users.get(user_id)
+        if state is None:
+            return None
+        reference = state.last_success or self.started_at
+        return time.time() - reference if reference else None
+
+    def lags(self) -> Dict[str, float]:
+        """Lag of every scheduled user that has one, keyed by user id."""
+        lags = {}
+        for user_id in list(self._users):
+            lag = self.lag_seconds(user_id)
+            if lag is not None:
+                lags[user_id] = lag
+        return lags
+
+    def status(self) -> dict:
+        return {
+            "running": self.running,
+            "users": len(self._users),
+            "inFlight": len(self._running),
+            "perUser": {
+                user_id: {
+                    "lagSeconds": self.lag_seconds(user_id),
+                    "intervalSeconds": state.interval,
+                    "lastSynced": state.last_synced,
+                    "consecutiveFailures": state.failures,
+                }
+                for user_id, state in self._users.items()
+            },
+        }
+
+
+sync_scheduler = SyncScheduler(
+    extension_client,
+    max_concurrency=settings.sync_max_concurrency,
+    active_interval=settings.sync_interval_active,
+    idle_interval=settings.sync_interval_idle,
+    jitter=settings.sync_jitter,
+)
+
+
+# Lag runs from seconds (just synced) to the idle interval and beyond (unreachable).
+LAG_BUCKETS = (10, 30, 60, 120, 300, 600, 900, 1800, 3600, 7200, 21600, 86400)
+
+
+def _max_lag():
+    lags = sync_scheduler.lags()
+    if lags:
+        yield (), max(lags.values())
+
+
+def _lag_distribution():
+    for lag in sync_scheduler.lags().values():
+        yield (), lag
+
+
+metrics.gauge(
+    "afk_sync_lag_max_seconds", "Largest time since a user's last successful background sync"
+).set_function(_max_lag)
+metrics.histogram(
+    "afk_sync_lag_seconds",
+    "Time since each user's last successful background sync, across users",
+    buckets=LAG_BUCKETS,
+).set_function(_lag_distribution)
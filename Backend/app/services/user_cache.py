@@ -0,0 +1,97 @@
+"""
+In-process cache of `users` rows for authenticated requests.
+
+Resolving the caller used to cost a `users` query on every request. Rows are
+now kept for `user_cache_ttl` seconds, and ids that don't exist are remembered
+for `user_cache_negative_ttl` seconds so a stale or forged token can't drive a
+query per request either.
+
+Cached users are detached instances: read them freely, but `merge()` one into
+a session before changing it. Any ORM change to a user (the GitHub login
+refresh, deactivation, deletion) evicts its entry when the change is flushed
+and again once it commits. Each worker process has its own cache, so a change
+made elsewhere is picked up within one TTL.
+"""
+
+from typing import Optional, Set, Union
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, make_transient_to_detached
+
+from app import queries
+from app.config import settings
+from app.models import User
+from app.utils.cache import TTLCache
+
+_NOT_FOUND = object()
+_PENDING_KEY = "user_cache_invalidations"
+
+
+def _detached_copy(user: User) -> User:
+    """A copy bound to no session, so nothing the loading session does later can expire it."""
+    copy = User(**{column.key: getattr(user, column.key) for column in User.__table__.columns})
+    make_transient_to_detached(copy)
+    return copy
+
+
+class UserCache:
+    def __init__(self, maxsize: int, ttl: float, negative_ttl: float):
+        self.negative_ttl = negative_ttl
+        self._cache: TTLCache[int, object] = TTLCache("users", maxsize, ttl)
+
+    async def get(self, db: AsyncSession, user_id: Union[int, str]) -> Optional[User]:
+        """The user with this id, active or not; None if there is none."""
+        try:
+            key = int(user_id)
+        except (TypeError, ValueError):
+            return None
+
+        cached = self._cache.get(key)
+        if cached is _NOT_FOUND:
+            return None
+        if cached is not None:
+            return cached
+
+        result = await db.execute(queries.user_by_id(key))
+        user = result.scalar_one_or_none()
+        if user is None:
+            self._cache.set(key, _NOT_FOUND, ttl=self.negative_ttl)
+            return None
+        # Hand out the same detached copy a hit would, not the row bound to `db`.
+        user = _detached_copy(user)
+        self._cache.set(key, user)
+        return user
+
+    def invalidate(self, user_id: Union[int, str, None]) -> None:
+        if user_id is not None:
+            self._cache.pop(int(user_id))
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+
+user_cache = UserCache(settings.user_cache_size, settings.user_cache_ttl, settings.user_cache_negative_ttl)
+
+
+@event.listens_for(User, "after_insert")
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _user_changed(mapper, connection, target: User) -> None:
+    user_cache.invalidate(target.id)
+    # Evict again after commit, in case a reader re-cached the old row meanwhile.
+    session = Session.object_session(target)
+    if session is not None:
+        pending: Set[int] = session.info.setdefault(_PENDING_KEY, set())
+        pending.add(target.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _evict_committed_users(session: Session) -> None:
+    for user_id in session.info.pop(_PENDING_KEY, ()):
+        user_cache.invalidate(user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_rolled_back_users(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
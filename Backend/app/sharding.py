@@ -0,0 +1,84 @@
+"""
+Per-user database sharding.
+
+With `db_shard_count` above 1, each user's `file_sessions` rows live in one of N
+SQLite files, so one user's ingest no longer holds the single database write
+lock everyone else is waiting on. Accounts (the `users` table) stay in the
+primary database.
+
+Users are placed by rendezvous hashing: every shard scores the user id and the
+highest score wins. The placement is stable across processes and restarts, and
+changing the shard count only moves the users whose winning shard changed —
+roughly 1/N of them — which `rebalance_shards.py` then copies across.
+
+With the default of one shard everything resolves to the primary engine, and
+nothing changes.
+"""
+
+import hashlib
+from typing import Dict, List, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+
+from app.config import settings
+from app.database import async_session_maker, create_engine, engine
+from app.models import FileSession, SessionAlias, SyncCursor
+
+# Tables that are partitioned by user; everything else stays on the primary.
+# Sync cursors and session aliases live beside the sessions, so each page or
+# merge commits atomically with them.
+SHARDED_TABLES = [FileSession.__table__, SessionAlias.__table__, SyncCursor.__table__]
+
+
+def shard_for(user_id: str, shard_count: int) -> int:
+    """Index of the shard that owns `user_id`."""
+    if shard_count <= 1:
+        return 0
+
+    def score(index: int) -> bytes:
+        return hashlib.blake2b(f"{index}:{user_id}".encode(), digest_size=8).digest()
+
+    return max(range(shard_count), key=score)
+
+
+class ShardRouter:
+    """Maps users to shard engines, creating each engine on first use."""
+
+    def __init__(self, shard_count: int, url_template: str):
+        self.shard_count = max(shard_count, 1)
+        self.url_template = url_template
+        self._shards: Dict[int, Tuple[AsyncEngine, async_sessionmaker]] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self.shard_count > 1
+
+    def shard_url(self, index: int) -> str:
+        return self.url_template.format(shard=index)
+
+    def shard(self, index: int) -> Tuple[AsyncEngine, async_sessionmaker]:
+        """Engine and session factory for shard `index`."""
+        if not self.enabled:
+            return engine, async_session_maker
+        if index not in self._shards:
+            shard_engine = create_engine(self.shard_url(index), f"shard{index}")
+            self._shards[index] = (
+                shard_engine,
+                async_sessionmaker(shard_engine, class_=AsyncSession, expire_on_commit=False),
+            )
+        return self._shards[index]
+
+    def session_maker_for(self, user_id: str) -> async_sessionmaker:
+        return self.shard(shard_for(user_id, self.shard_count))[1]
+
+    def engines(self) -> List[AsyncEngine]:
+        """Every shard engine, opening any not yet used."""
+        return [self.shard(index)[0] for index in range(self.shard_count)]
+
+    async def close(self) -> None:
+        for shard_engine, _ in self._shards.values():
+            await shard_engine.dispose()
+        self._shards.clear()
+
+
+shard_router = ShardRouter(settings.db_shard_count, settings.db_shard_url_template)
@@ -6,6 +6,16 @@ from datetime import datetime, timedelta, timezone
 from typing import Optional, Dict, Any
 from jose import JWTError, jwt
 from app.config import settings
+from app.utils.cache import TTLCache
+
+# Scope of the tokens background sync sends to extensions. They only let the
+# extension check whose sessions are being pulled; API routes refuse any token
+# that carries a scope.
+PULL_SCOPE = "sessions:pull"
+
+# user id -> pull token, reused for the first half of its lifetime so a sync
+# that starts with one has the other half to finish.
+_pull_tokens: TTLCache[str, str] = TTLCache("pull_tokens", settings.token_cache_size)
 
 
 def create_access_token(data: Dict[str, Any], expires_delta: Optional[timedelta] = None) -> str:
@@ -22,6 +32,16 @@ def create_access_token(data: Dict[str, Any], expires_delta: Optional[timedelta]
     return encoded_jwt
 
 
+def pull_token(user_id: str) -> str:
+    """A short-lived token limited to `PULL_SCOPE`, cached per user."""
+    token = _pull_tokens.get(user_id)
+    if token is None:
+        lifetime = settings.pull_token_expire_seconds
+        token = create_access_token({"sub": user_id, "scope": PULL_SCOPE}, timedelta(seconds=lifetime))
+        _pull_tokens.set(user_id, token, ttl=lifetime / 2)
+    return token
+
+
 def create_refresh_token() -> str:
     """Create a secure refresh token."""
     return secrets.token_urlsafe(32)
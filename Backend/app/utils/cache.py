@@ -0,0 +1,72 @@
+"""Small in-process caches."""
+
+import time
+from collections import OrderedDict
+from typing import Callable, Generic, Hashable, Optional, Tuple, TypeVar
+
+from app import metrics
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+CACHE_LOOKUPS = metrics.counter(
+    "afk_cache_lookups_total", "In-process cache lookups by cache and result", ["cache", "result"]
+)
+
+_MISSING = object()
+
+
+class TTLCache(Generic[K, V]):
+    """
+    Bounded LRU cache whose entries also expire.
+
+    Every entry has its own deadline on `clock`: `ttl` seconds from when it was
+    set, or the cache's default TTL. Expired entries are dropped when looked up;
+    once `maxsize` is reached the least recently used entry is evicted. Meant for
+    use from the event loop: it does no locking of its own.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        maxsize: int,
+        ttl: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._entries: "OrderedDict[K, Tuple[V, Optional[float]]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: K, default=None):
+        entry = self._entries.get(key, _MISSING)
+        if entry is _MISSING:
+            CACHE_LOOKUPS.inc(cache=self.name, result="miss")
+            return default
+        value, deadline = entry
+        if deadline is not None and self._clock() >= deadline:
+            del self._entries[key]
+            CACHE_LOOKUPS.inc(cache=self.name, result="expired")
+            return default
+        self._entries.move_to_end(key)
+        CACHE_LOOKUPS.inc(cache=self.name, result="hit")
+        return value
+
+    def set(self, key: K, value: V, ttl: Optional[float] = None) -> None:
+        if self.maxsize <= 0:
+            return
+        ttl = self.ttl if ttl is None else ttl
+        self._entries[key] = (value, None if ttl is None else self._clock() + ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def pop(self, key: K) -> None:
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
@@ -0,0 +1,47 @@
+"""Canonical display names for the languages editors report."""
+
+from typing import Optional
+
+# VS Code reports `languageId` in lowercase ("python", "typescriptreact"), while
+# the display names used for colours and grouping are capitalised. Without
+# normalising on ingest, every session the extension records forks into a second,
+# grey-coloured entry alongside the canonical one.
+LANGUAGE_DISPLAY_NAMES = {
+    "typescript": "TypeScript",
+    "typescriptreact": "TypeScript",
+    "javascript": "JavaScript",
+    "javascriptreact": "JavaScript",
+    "python": "Python",
+    "rust": "Rust",
+    "go": "Go",
+    "java": "Java",
+    "cpp": "C++",
+    "c": "C",
+    "csharp": "C#",
+    "html": "HTML",
+    "css": "CSS",
+    "scss": "CSS",
+    "vue": "Vue",
+    "json": "JSON",
+    "jsonc": "JSON",
+    "yaml": "YAML",
+    "toml": "TOML",
+    "markdown": "Markdown",
+    "shellscript": "Shell",
+    "bash": "Shell",
+    "powershell": "PowerShell",
+    "sql": "SQL",
+    "dockerfile": "Dockerfile",
+    "plaintext": "Plain Text",
+}
+
+
+def normalize_language(raw: Optional[str]) -> str:
+    """Map a client-supplied language to its canonical display name."""
+    if not raw:
+        return "Unknown"
+    key = raw.strip().lower()
+    if key in LANGUAGE_DISPLAY_NAMES:
+        return LANGUAGE_DISPLAY_NAMES[key]
+    # Already-capitalised names (and anything unmapped) pass through unchanged.
+    return raw.strip()
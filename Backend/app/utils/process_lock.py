@@ -0,0 +1,66 @@
+"""
+Advisory file locks for coordinating worker processes on one host.
+
+Used so that, with several workers, only one runs startup DDL at a time and
+only one runs the background sync scheduler. The OS drops the lock when its
+holder exits, so a crashed worker never leaves it stuck. Where `fcntl` isn't
+available (Windows) locks always succeed, which is correct for the single
+process that platform runs.
+"""
+
+import asyncio
+import os
+from typing import Optional
+
+from app.config import settings
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+
+class ProcessLock:
+    def __init__(self, name: str, directory: Optional[str] = None):
+        self.path = os.path.join(directory or settings.worker_lock_dir, f".afk-{name}.lock")
+        self._fd: Optional[int] = None
+
+    @property
+    def held(self) -> bool:
+        return self._fd is not None
+
+    def _lock(self, blocking: bool) -> bool:
+        if self._fd is not None:
+            return True
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        if fcntl is not None:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                os.close(fd)
+                return False
+        self._fd = fd
+        return True
+
+    def try_acquire(self) -> bool:
+        """Take the lock if it is free; never waits."""
+        return self._lock(blocking=False)
+
+    async def acquire(self) -> None:
+        """Wait for the lock without blocking the event loop."""
+        await asyncio.to_thread(self._lock, True)
+
+    def release(self) -> None:
+        if self._fd is None:
+            return
+        if fcntl is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        os.close(self._fd)
+        self._fd = None
+
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, *exc):
+        self.release()
@@ -0,0 +1,56 @@
+"""
+Where boot time goes.
+
+The lifespan times each startup phase, and imports are counted from the first
+`app` module import. The breakdown is logged once startup completes and kept
+as the `afk_startup_seconds` gauge, so a slow cold start in a scale-to-zero
+container can be traced to imports, schema checks or the extension registry.
+"""
+
+import logging
+import time
+from contextlib import contextmanager
+from typing import Dict
+
+from app import IMPORT_STARTED, metrics
+
+logger = logging.getLogger(__name__)
+
+
+class StartupTimer:
+    def __init__(self):
+        self.phases: Dict[str, float] = {}
+        self.notes: Dict[str, str] = {}
+
+    def record(self, name: str, seconds: float, note: str = "") -> None:
+        self.phases[name] = seconds
+        if note:
+            self.notes[name] = note
+
+    def imports_done(self) -> None:
+        self.record("imports", time.perf_counter() - IMPORT_STARTED)
+
+    @contextmanager
+    def phase(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - started)
+
+    def summary(self) -> str:
+        parts = []
+        for name, seconds in self.phases.items():
+            note = f" ({self.notes[name]})" if name in self.notes else ""
+            parts.append(f"{name} {seconds * 1000:.0f} ms{note}")
+        return f"Startup took {sum(self.phases.values()) * 1000:.0f} ms: " + ", ".join(parts)
+
+    def report(self) -> None:
+        logger.info(self.summary())
+
+
+startup_timer = StartupTimer()
+
+metrics.gauge(
+    "afk_startup_seconds", "Time spent in each startup phase", ["phase"]
+).set_function(lambda: (((name,), seconds) for name, seconds in startup_timer.phases.items()))
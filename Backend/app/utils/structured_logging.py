@@ -0,0 +1,220 @@
+"""
+Non-blocking, structured logging.
+
+`configure_logging` puts a single `QueueHandler` on the root logger. Logging
+from a request filters the record, renders its message (and traceback, if
+any) so later changes to mutable arguments can't alter it, and appends it to
+an in-memory queue; the JSON or text line is built and written on a
+`QueueListener` thread, so a slow terminal, pipe or log collector never stalls
+the event loop. If the queue fills, records are dropped and counted rather
+than waited on.
+
+Records are emitted as one JSON object per line (or plain text with
+`log_format = "text"`), carrying the request id set by `RequestIdMiddleware`
+and any `extra=` fields.
+
+High-frequency messages are sampled: each message template (the `%`-style
+format string, which is why logging calls pass arguments separately instead of
+using f-strings) may log `log_sample_burst` times per second; past that only
+one in `log_sample_every` gets through, annotated with how many were skipped.
+Errors are never sampled.
+"""
+
+import contextvars
+import copy
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, Optional, Tuple
+
+from app import metrics
+from app.config import settings
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+request_id_var: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("afk_request_id", default=None)
+
+LOG_RECORDS_DROPPED = metrics.counter(
+    "afk_log_records_dropped_total",
+    "Log records not written, because they were sampled out or the queue was full",
+    ["reason"],
+)
+
+# Attributes every LogRecord has; anything else on a record came from `extra=`
+# (uvicorn adds an ANSI-coloured copy of its messages, which is dropped too).
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {
+    "message", "asctime", "color_message",
+}
+
+# Libraries that attach their own synchronous stream handlers: uvicorn always,
+# SQLAlchemy when `echo` is on. Their records are sent to the root logger instead.
+_SELF_HANDLING_LOGGERS = ("uvicorn", "sqlalchemy")
+
+_exception_formatter = logging.Formatter()
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record: time, level, logger, message, request id, extras."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc"] = record.exc_text
+        if record.stack_info:
+            entry["stack"] = record.stack_info
+        if orjson is not None:
+            return orjson.dumps(entry, default=str).decode()
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)-7s %(name)s [%(request_id)s] %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        if not hasattr(record, "request_id"):
+            record.request_id = "-"
+        message = super().format(record)
+        if getattr(record, "sampled", None):
+            message += f" (+{record.sampled} similar skipped)"
+        return message
+
+
+class SamplingFilter(logging.Filter):
+    """Rate-limits each message template; see the module docstring."""
+
+    def __init__(self, burst: int, every: int, window: float = 1.0):
+        super().__init__()
+        self.burst = burst
+        self.every = max(1, every)
+        self.window = window
+        self._lock = threading.Lock()
+        # (logger, template) -> [window start, count in window, skipped since last emitted]
+        self._seen: Dict[Tuple[str, object], list] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.burst <= 0 or record.levelno >= logging.ERROR:
+            return True
+        key = (record.name, record.msg)
+        now = time.monotonic()
+        with self._lock:
+            state = self._seen.get(key)
+            if state is None or now - state[0] >= self.window:
+                if len(self._seen) > 10_000:
+                    self._seen.clear()
+                skipped = state[2] if state else 0
+                self._seen[key] = [now, 1, 0]
+            else:
+                state[1] += 1
+                if state[1] <= self.burst or (state[1] - self.burst) % self.every == 0:
+                    skipped, state[2] = state[2], 0
+                else:
+                    state[2] += 1
+                    LOG_RECORDS_DROPPED.inc(reason="sampled")
+                    return False
+        if skipped:
+            record.sampled = skipped
+        return True
+
+
+class ContextQueueHandler(logging.handlers.QueueHandler):
+    """
+    Stamps the request id and enqueues a copy of the record with its message
+    and traceback already rendered.
+
+    Like the stock handler, `prepare` merges the arguments into the message
+    and clears `args` and `exc_info`, so objects passed as arguments can be
+    mutated once the call returns without changing what is logged, and the
+    traceback doesn't keep its frames alive in the queue. Unlike it, the full
+    JSON or text line is left to the listener. Sampling has already keyed on
+    the unformatted template by then. Never blocks: a full queue drops the
+    record.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        message = record.getMessage()
+        exc_text = record.exc_text
+        if record.exc_info and not exc_text:
+            exc_text = _exception_formatter.formatException(record.exc_info)
+        record = copy.copy(record)
+        record.message = record.msg = message
+        record.args = None
+        record.exc_info = None
+        record.exc_text = exc_text
+        request_id = request_id_var.get()
+        if request_id is not None:
+            record.request_id = request_id
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_RECORDS_DROPPED.inc(reason="queue_full")
+
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_queue_handler: Optional[ContextQueueHandler] = None
+
+
+def configure_logging() -> None:
+    """Route all logging, uvicorn's included, through the background queue."""
+    global _listener, _queue_handler
+    if _listener is not None:
+        return
+
+    output = logging.StreamHandler(sys.stderr)
+    output.setFormatter(TextFormatter() if settings.log_format == "text" else JsonFormatter())
+
+    records: queue.Queue = queue.Queue(maxsize=settings.log_queue_size)
+    _queue_handler = ContextQueueHandler(records)
+    _queue_handler.addFilter(SamplingFilter(settings.log_sample_burst, settings.log_sample_every))
+
+    root = logging.getLogger()
+    for existing in root.handlers[:]:
+        root.removeHandler(existing)
+    root.addHandler(_queue_handler)
+    root.setLevel(settings.log_level.upper())
+
+    for name in list(logging.root.manager.loggerDict):
+        if name.split(".")[0] in _SELF_HANDLING_LOGGERS:
+            library_logger = logging.getLogger(name)
+            library_logger.handlers.clear()
+            library_logger.propagate = True
+
+    _listener = logging.handlers.QueueListener(records, output, respect_handler_level=True)
+    _listener.start()
+
+
+def stop_logging() -> None:
+    """
+    Flush queued records and stop the listener thread. Anything logged after
+    this (the server's own shutdown messages) is written directly.
+    """
+    global _listener, _queue_handler
+    if _listener is None:
+        return
+    _listener.stop()
+    root = logging.getLogger()
+    root.removeHandler(_queue_handler)
+    for output in _listener.handlers:
+        root.addHandler(output)
+    _listener = _queue_handler = None
@@ -0,0 +1,84 @@
+"""
+Cold-start time: a fresh process importing the app and running its startup.
+
+Each boot is a new interpreter (as a scale-to-zero container would start),
+against a scratch database: the first boot creates it, later boots find the
+schema up to date. Reports the startup phases from `app.utils.startup` and the
+whole process time, median over `--boots` warm boots.
+
+    python -m benchmarks.bench_cold_start
+    python -m benchmarks.bench_cold_start --boots 10 --shards 4
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BACKEND = Path(__file__).resolve().parent.parent
+
+# Runs in the child: boot the app through its lifespan and report the phases.
+BOOT = """
+import asyncio, json, sys
+from app.main import app
+from app.utils.startup import startup_timer
+
+async def boot():
+    async with app.router.lifespan_context(app):
+        pass
+
+asyncio.run(boot())
+json.dump({"phases": startup_timer.phases, "notes": startup_timer.notes,
+           "loaded": sorted(m for m in ("aiohttp", "httpx") if m in sys.modules)}, sys.stdout)
+"""
+
+
+def boot(database_dir: str, shards: int) -> dict:
+    env = {
+        **os.environ,
+        "DATABASE_URL": f"sqlite+aiosqlite:///{database_dir}/bench.db",
+        "DB_SHARD_COUNT": str(shards),
+        "DB_SHARD_URL_TEMPLATE": f"sqlite+aiosqlite:///{database_dir}/bench.shard{{shard}}.db",
+        "WORKER_LOCK_DIR": database_dir,
+        "DEBUG": "false",
+    }
+    started = time.perf_counter()
+    output = subprocess.run([sys.executable, "-c", BOOT], cwd=BACKEND, env=env,
+                            capture_output=True, text=True, check=True).stdout
+    result = json.loads(output)
+    result["process"] = time.perf_counter() - started
+    return result
+
+
+def row(label: str, result: dict) -> str:
+    phases = "  ".join(f"{name} {seconds * 1000:6.1f} ms" for name, seconds in result["phases"].items())
+    return f"{label:<12} process {result['process'] * 1000:6.0f} ms  {phases}"
+
+
+def main(boots: int, shards: int) -> None:
+    with tempfile.TemporaryDirectory(prefix="afk-bench-") as scratch:
+        first = boot(scratch, shards)
+        warm = [boot(scratch, shards) for _ in range(boots)]
+
+    median = {
+        "process": statistics.median(r["process"] for r in warm),
+        "phases": {name: statistics.median(r["phases"][name] for r in warm) for name in warm[0]["phases"]},
+    }
+    print(f"{shards} shard(s), {boots} warm boots; aiohttp/httpx imported at boot: {warm[0]['loaded'] or 'neither'}")
+    print(row("first boot", first), f"  [{first['notes'].get('schema', '')}]")
+    print(row("warm median", median), f"  [{warm[0]['notes'].get('schema', '')}]")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--boots", type=int, default=5)
+    parser.add_argument("--shards", type=int, default=1)
+    args = parser.parse_args()
+    main(args.boots, args.shards)
@@ -0,0 +1,178 @@
+"""
+Response compression: bytes saved against CPU time, per encoding and level.
+
+Seeds a scratch database with one user's sessions and fetches real
+`GET /api/sessions` responses uncompressed: a full 100-session page, and every
+page joined into one JSON array, about what an export of the history would
+send. For each available encoding (gzip always; br and zstd when `brotli` /
+`zstandard` are installed) and a range of levels, reports the compressed size
+and the median time to compress each body, both in one piece and streamed in
+16 KiB chunks with a flush after each (how `CompressionMiddleware` handles
+`more_body`). Finally times the page request end to end through the app at
+the configured levels.
+
+    python -m benchmarks.bench_compression
+    python -m benchmarks.bench_compression --sessions 5000 --repeat 100
+"""
+
+from __future__ import annotations
+
+import os
+import tempfile
+
+# Point the app at a scratch database before anything imports its engine.
+_SCRATCH = tempfile.TemporaryDirectory(prefix="afk-bench-")
+os.environ.update({
+    "DATABASE_URL": f"sqlite+aiosqlite:///{_SCRATCH.name}/bench.db",
+    "DEBUG": "false",
+    "GITHUB_CLIENT_ID": "",
+    "GITHUB_CLIENT_SECRET": "",
+    "RATE_LIMIT_ENABLED": "false",
+    "LOG_LEVEL": "WARNING",
+    "WORKER_LOCK_DIR": _SCRATCH.name,
+})
+
+import argparse  # noqa: E402
+import asyncio  # noqa: E402
+import json  # noqa: E402
+import random  # noqa: E402
+import statistics  # noqa: E402
+import time  # noqa: E402
+from datetime import datetime, timedelta, timezone  # noqa: E402
+
+import httpx  # noqa: E402
+
+from app.config import settings  # noqa: E402
+from app.database import async_session_maker  # noqa: E402
+from app.main import app  # noqa: E402
+from app.middleware.compression import _Brotli, _Gzip, _Zstd, available_encodings  # noqa: E402
+from app.models import FileSession, session_time_columns  # noqa: E402
+from app.routers.auth import LOCAL_USER_ID  # noqa: E402
+
+LEVELS = {
+    "gzip": (_Gzip, [1, 4, 6, 9]),
+    "br": (_Brotli, [1, 4, 6, 9, 11]),
+    "zstd": (_Zstd, [1, 3, 6, 12, 19]),
+}
+CHUNK = 16 * 1024
+MAX_SECONDS_PER_CASE = 3
+LANGUAGES = {".py": "Python", ".ts": "TypeScript", ".tsx": "TypeScript", ".go": "Go", ".rs": "Rust", ".md": "Markdown"}
+
+
+async def seed(count: int) -> None:
+    """Sessions spread over a dozen projects and a few hundred files, like a month of real use."""
+    rnd = random.Random(7)
+    now = datetime.now(timezone.utc)
+    async with async_session_maker() as db:
+        for i in range(count):
+            start = now - timedelta(seconds=rnd.randrange(60 * 60 * 24 * 28))
+            end = start + timedelta(seconds=rnd.randrange(30, 45 * 60))
+            project = f"{rnd.choice(['afk', 'dashboard', 'infra', 'billing'])}-{i % 12}"
+            extension = rnd.choice(list(LANGUAGES))
+            directory = rnd.choice(["src", "src/components", "src/services", "tests", "docs", "scripts"])
+            stem = rnd.choice(["index", "client", "handler", "models", "utils", "view"])
+            file_name = f"{stem}_{rnd.randrange(40)}{extension}"
+            db.add(FileSession(
+                id=f"bench-{i}", user_id=LOCAL_USER_ID,
+                file_path=f"/home/dev/work/{project}/{directory}/{file_name}", file_name=file_name,
+                file_extension=extension, language=LANGUAGES[extension],
+                project_name=project, project_path=f"/home/dev/work/{project}",
+                session_start_time=start.replace(tzinfo=None), session_end_time=end.replace(tzinfo=None),
+                **session_time_columns(start, end),
+                total_duration=int((end - start).total_seconds()), lines_added=rnd.randrange(200),
+                lines_deleted=rnd.randrange(80), lines_modified=rnd.randrange(60),
+                characters_added=rnd.randrange(6000), characters_deleted=rnd.randrange(2000),
+                characters_modified=rnd.randrange(1500), total_edits=rnd.randrange(150),
+                editor=rnd.choice(["vscode", "cursor"]), platform=rnd.choice(["linux", "darwin", "win32"]),
+                is_active=False,
+            ))
+        await db.commit()
+
+
+def time_encoder(factory, body: bytes, repeat: int) -> tuple:
+    """(size, median seconds) in one piece, then the same streamed in chunks."""
+    results = []
+    for streamed in (False, True):
+        samples = []
+        deadline = time.perf_counter() + MAX_SECONDS_PER_CASE
+        for _ in range(repeat):
+            if len(samples) >= 3 and time.perf_counter() > deadline:
+                break  # the slowest levels take seconds per run on the history
+            started = time.perf_counter()
+            encoder = factory()
+            if streamed:
+                chunks = [body[i:i + CHUNK] for i in range(0, len(body), CHUNK)]
+                out = b"".join(encoder.compress(chunk) for chunk in chunks) + encoder.finish()
+            else:
+                out = encoder.finish(body)
+            samples.append(time.perf_counter() - started)
+        results.append((len(out), statistics.median(samples)))
+    return results
+
+
+async def end_to_end(client: httpx.AsyncClient, path: str, encodings: list, requests: int) -> dict:
+    """Median request latency per Accept-Encoding; requests alternate so drift hits each equally."""
+    latencies = {encoding: [] for encoding in encodings}
+    sizes = {}
+    for _ in range(requests):
+        for encoding in encodings:
+            started = time.perf_counter()
+            response = await client.get(path, headers={"accept-encoding": encoding})
+            latencies[encoding].append(time.perf_counter() - started)
+            sizes[encoding] = int(response.headers.get("content-length") or len(response.content))
+    return {encoding: (sizes[encoding], statistics.median(latencies[encoding])) for encoding in encodings}
+
+
+async def fetch(client: httpx.AsyncClient, path: str) -> bytes:
+    response = await client.get(path, headers={"accept-encoding": "identity"})
+    response.raise_for_status()
+    return response.content
+
+
+async def main(sessions: int, repeat: int) -> None:
+    page_path = "/api/sessions?limit=100"
+    async with app.router.lifespan_context(app):
+        await seed(sessions)
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://backend") as client:
+            page = await fetch(client, page_path)
+            history = []
+            for offset in range(0, sessions, 100):
+                history += json.loads(await fetch(client, f"/api/sessions?limit=100&offset={offset}"))["data"]["sessions"]
+            encodings = available_encodings()
+            requests = await end_to_end(client, page_path, ["identity", *encodings], repeat)
+    bodies = {
+        "100-session page": page,
+        f"{sessions}-session history": json.dumps(history, separators=(",", ":")).encode(),
+    }
+
+    for label, body in bodies.items():
+        print(f"{label}: {len(body)} bytes uncompressed, median of up to {repeat} runs")
+        print(f"{'encoding':<8} {'level':>5} {'bytes':>8} {'ratio':>6} {'compress':>9} {'MB/s':>5} "
+              f"{'streamed':>9} {'streamed':>9}")
+        for encoding in encodings:
+            encoder, levels = LEVELS[encoding]
+            for level in levels:
+                (size, seconds), (streamed_size, streamed_seconds) = time_encoder(lambda: encoder(level), body, repeat)
+                print(f"{encoding:<8} {level:>5} {size:>8} {len(body) / size:>5.1f}x {seconds * 1000:>7.2f}ms "
+                      f"{len(body) / seconds / 1e6:>5.0f} {streamed_size:>9} {streamed_seconds * 1000:>7.2f}ms")
+        print()
+    missing = sorted(set(LEVELS) - set(encodings))
+    if missing:
+        print(f"not installed: {', '.join(missing)}")
+
+    print(f"GET {page_path} through the app (gzip {settings.compression_gzip_level}, "
+          f"br {settings.compression_brotli_quality}, zstd {settings.compression_zstd_level}):")
+    for encoding, (size, seconds) in requests.items():
+        print(f"  {encoding:<9} {size:>8} B  {seconds * 1000:>6.2f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=2000, help="Sessions seeded for the user")
+    parser.add_argument("--repeat", type=int, default=50, help="Timed runs per encoding and level")
+    args = parser.parse_args()
+    try:
+        asyncio.run(main(args.sessions, args.repeat))
+    finally:
+        _SCRATCH.cleanup()
@@ -0,0 +1,94 @@
+"""
+Per-sync latency of ExtensionClient with a fresh vs a shared HTTP session.
+
+Starts a minimal extension stub on localhost and times repeated
+`fetch_sessions_from_extension` calls. The "fresh" run closes the client's
+session after every call, which reproduces the old one-session-per-request
+behaviour: a new connector, DNS lookup and TCP handshake each time.
+
+    python -m benchmarks.bench_extension_client
+    python -m benchmarks.bench_extension_client --requests 2000 --sessions 50
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import statistics
+import time
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+from aiohttp import web
+
+from app.services.extension_client import ExtensionClient
+
+
+def make_stub(sessions_per_page: int) -> web.Application:
+    now = datetime.now(timezone.utc).isoformat()
+    sessions = [
+        {
+            "id": f"s{i}", "filePath": f"/src/f{i}.py", "fileName": f"f{i}.py", "fileExtension": "py",
+            "language": "python", "projectName": "bench", "projectPath": "/src",
+            "sessionStartTime": now, "sessionEndTime": now, "totalDuration": 60,
+            "linesAdded": 1, "linesDeleted": 0, "linesModified": 0, "charactersAdded": 10,
+            "charactersDeleted": 0, "charactersModified": 0, "totalEdits": 3, "isActive": False,
+        }
+        for i in range(sessions_per_page)
+    ]
+
+    async def export(request: web.Request) -> web.Response:
+        return web.json_response({"sessions": sessions, "hasMore": False, "lastSyncTime": now})
+
+    app = web.Application()
+    app.router.add_post("/api/sessions/export", export)
+    return app
+
+
+async def timed_fetches(client: ExtensionClient, user, requests: int, fresh: bool) -> list:
+    latencies = []
+    for _ in range(requests):
+        started = time.perf_counter()
+        await client.fetch_sessions_from_extension(user, "token")
+        latencies.append(time.perf_counter() - started)
+        if fresh:
+            await client.close()
+    await client.close()
+    return latencies
+
+
+def report(label: str, latencies: list) -> float:
+    ordered = sorted(latencies)
+    p50 = statistics.median(ordered)
+    p99 = ordered[int(len(ordered) * 0.99) - 1]
+    print(f"{label:<16} p50 {p50 * 1000:7.2f} ms   p99 {p99 * 1000:7.2f} ms   mean {statistics.fmean(ordered) * 1000:7.2f} ms")
+    return statistics.fmean(ordered)
+
+
+async def main(requests: int, sessions: int, port: int) -> None:
+    runner = web.AppRunner(make_stub(sessions))
+    await runner.setup()
+    await web.TCPSite(runner, "localhost", port).start()
+
+    user = SimpleNamespace(id=1, username="bench", github_id="1")
+    client = ExtensionClient()
+    client._extension_registry["1"] = {
+        "endpoint": f"http://localhost:{port}", "is_active": True, "last_seen": datetime.now(timezone.utc),
+    }
+
+    try:
+        await timed_fetches(client, user, 20, fresh=False)  # warm up
+        fresh = report("fresh session", await timed_fetches(client, user, requests, fresh=True))
+        shared = report("shared session", await timed_fetches(client, user, requests, fresh=False))
+        print(f"saved per sync   {(fresh - shared) * 1000:7.2f} ms ({(1 - shared / fresh) * 100:.0f}%)")
+    finally:
+        await runner.cleanup()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--sessions", type=int, default=20, help="Sessions per export response")
+    parser.add_argument("--port", type=int, default=8101)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.sessions, args.port))
@@ -0,0 +1,91 @@
+"""
+Login latency of POST /api/auth/github/callback against a fake GitHub.
+
+Runs `benchmarks.fake_github` in-process with a fixed per-call latency, points
+the app at it, and drives the callback through the ASGI app directly with
+waves of concurrent logins (a Monday-morning burst), each with a fresh code.
+Users are written to a scratch database.
+
+    python -m benchmarks.bench_github_login
+    python -m benchmarks.bench_github_login --logins 500 --concurrency 50 --latency-ms 120
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import tempfile
+
+PORT = int(os.environ.get("FAKE_GITHUB_PORT", "8110"))
+
+# Configure the app before anything imports it.
+_SCRATCH = tempfile.TemporaryDirectory(prefix="afk-bench-")
+os.environ.update({
+    "DATABASE_URL": f"sqlite+aiosqlite:///{_SCRATCH.name}/bench.db",
+    "DEBUG": "false",
+    "GITHUB_CLIENT_ID": "bench",
+    "GITHUB_CLIENT_SECRET": "bench",
+    "GITHUB_OAUTH_URL": f"http://localhost:{PORT}",
+    "GITHUB_API_URL": f"http://localhost:{PORT}",
+})
+
+import asyncio  # noqa: E402
+import statistics  # noqa: E402
+import time  # noqa: E402
+import uuid  # noqa: E402
+
+import httpx  # noqa: E402
+
+from app.database import close_db, engine, primary_tables  # noqa: E402
+from app.main import app  # noqa: E402
+from app.migrations import prepare_database  # noqa: E402
+from app.services.http_client import HTTP2_AVAILABLE, close_http_client  # noqa: E402
+from benchmarks.fake_github import serve  # noqa: E402
+
+
+def percentile(ordered: list, fraction: float) -> float:
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+async def login(client: httpx.AsyncClient, semaphore: asyncio.Semaphore, latencies: list) -> None:
+    async with semaphore:
+        started = time.perf_counter()
+        response = await client.post("/api/auth/github/callback", json={"code": uuid.uuid4().hex})
+        response.raise_for_status()
+        latencies.append(time.perf_counter() - started)
+
+
+async def main(logins: int, concurrency: int, latency_ms: float) -> None:
+    await prepare_database(engine, primary_tables())
+    runner = await serve("localhost", PORT, latency_ms)
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: list = []
+    try:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://backend") as client:
+            await asyncio.gather(*(login(client, semaphore, []) for _ in range(min(concurrency, 10))))  # warm up
+            started = time.perf_counter()
+            await asyncio.gather(*(login(client, semaphore, latencies) for _ in range(logins)))
+            elapsed = time.perf_counter() - started
+    finally:
+        await close_http_client()
+        await runner.cleanup()
+        await close_db()
+
+    ordered = sorted(latencies)
+    print(f"{logins} logins, concurrency {concurrency}, fake GitHub {latency_ms:g} ms/call, "
+          f"http2 {'on' if HTTP2_AVAILABLE else 'off (h2 not installed)'}")
+    print(f"login   p50 {statistics.median(ordered) * 1000:7.1f} ms   p95 {percentile(ordered, 0.95) * 1000:7.1f} ms   "
+          f"p99 {percentile(ordered, 0.99) * 1000:7.1f} ms   {logins / elapsed:7.1f} logins/s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--latency-ms", type=float, default=80, help="Simulated GitHub round trip")
+    args = parser.parse_args()
+    try:
+        asyncio.run(main(args.logins, args.concurrency, args.latency_ms))
+    finally:
+        _SCRATCH.cleanup()
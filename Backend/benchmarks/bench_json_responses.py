@@ -0,0 +1,150 @@
+"""
+Response serialisation cost: the fast JSON path against Union response_model validation.
+
+Seeds a scratch database with one user's sessions, then times the session and
+stats routes through the ASGI app with `fast_json_responses` off (the route
+returns `SuccessResponse`; FastAPI validates it against the Union model, runs
+`jsonable_encoder` and `json.dumps`) and on (`success_response`: one orjson
+pass). Also times serialisation alone for a 100-session page, without the
+database or HTTP around it.
+
+    python -m benchmarks.bench_json_responses
+    python -m benchmarks.bench_json_responses --sessions 5000 --requests 500
+"""
+
+from __future__ import annotations
+
+import os
+import tempfile
+
+# Point the app at a scratch database before anything imports its engine.
+_SCRATCH = tempfile.TemporaryDirectory(prefix="afk-bench-")
+os.environ.update({
+    "DATABASE_URL": f"sqlite+aiosqlite:///{_SCRATCH.name}/bench.db",
+    "DEBUG": "false",
+    "GITHUB_CLIENT_ID": "",
+    "GITHUB_CLIENT_SECRET": "",
+    "RATE_LIMIT_ENABLED": "false",
+    "WORKER_LOCK_DIR": _SCRATCH.name,
+})
+
+import argparse  # noqa: E402
+import asyncio  # noqa: E402
+import random  # noqa: E402
+import statistics  # noqa: E402
+import time  # noqa: E402
+from datetime import datetime, timedelta, timezone  # noqa: E402
+from typing import Union  # noqa: E402
+
+import httpx  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+from fastapi.routing import serialize_response  # noqa: E402
+from fastapi.utils import create_response_field  # noqa: E402
+
+from app.config import settings  # noqa: E402
+from app.database import async_session_maker  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models import FileSession, session_time_columns  # noqa: E402
+from app.responses import orjson, success_response  # noqa: E402
+from app.routers.auth import LOCAL_USER_ID  # noqa: E402
+from app.schemas import ErrorResponse, SuccessResponse  # noqa: E402
+
+ROUTES = [
+    "/api/sessions?limit=100",
+    "/api/sessions/stats?time_filter=last_30_days",
+    "/api/sessions/stats/daily?time_filter=last_30_days",
+    "/api/sessions/stats/languages?time_filter=last_30_days",
+    "/api/sessions/stats/projects?time_filter=last_30_days",
+    "/api/sessions/stats/hourly?time_filter=last_30_days",
+]
+
+
+async def seed(count: int) -> None:
+    rnd = random.Random(7)
+    now = datetime.now(timezone.utc)
+    async with async_session_maker() as db:
+        for i in range(count):
+            start = now - timedelta(minutes=rnd.randrange(60 * 24 * 28))
+            end = start + timedelta(minutes=rnd.randrange(1, 45))
+            project = f"project-{i % 12}"
+            db.add(FileSession(
+                id=f"bench-{i}", user_id=LOCAL_USER_ID,
+                file_path=f"/work/{project}/src/module_{i % 40}.py", file_name=f"module_{i % 40}.py",
+                file_extension=".py", language=rnd.choice(["Python", "TypeScript", "Go", "Rust"]),
+                project_name=project, project_path=f"/work/{project}",
+                session_start_time=start.replace(tzinfo=None), session_end_time=end.replace(tzinfo=None),
+                **session_time_columns(start, end),
+                total_duration=int((end - start).total_seconds()), lines_added=rnd.randrange(80),
+                lines_deleted=rnd.randrange(20), lines_modified=rnd.randrange(20),
+                characters_added=rnd.randrange(2000), characters_deleted=rnd.randrange(300),
+                characters_modified=rnd.randrange(300), total_edits=rnd.randrange(60),
+                editor="vscode", platform="linux", is_active=False,
+            ))
+        await db.commit()
+
+
+async def time_route(client: httpx.AsyncClient, path: str, requests: int) -> tuple:
+    """Median latency with validation, and with the fast path; requests alternate so drift hits both."""
+    for _ in range(10):  # warm up
+        (await client.get(path)).raise_for_status()
+    latencies = {False: [], True: []}
+    for _ in range(requests):
+        for fast in (False, True):
+            settings.fast_json_responses = fast
+            started = time.perf_counter()
+            (await client.get(path)).raise_for_status()
+            latencies[fast].append(time.perf_counter() - started)
+    settings.fast_json_responses = True
+    return statistics.median(latencies[False]), statistics.median(latencies[True])
+
+
+async def serialisation_only(client: httpx.AsyncClient, requests: int) -> tuple:
+    """Median seconds to turn one 100-session payload into bytes, each way."""
+    data = (await client.get("/api/sessions?limit=100")).json()["data"]
+    field = create_response_field(name="bench", type_=Union[SuccessResponse, ErrorResponse])
+
+    async def validated():
+        content = await serialize_response(field=field, response_content=SuccessResponse(data=data), is_coroutine=True)
+        return JSONResponse(content).body
+
+    def fast():
+        return success_response(data).body
+
+    results = []
+    for run in (validated, fast):
+        samples = []
+        for _ in range(requests):
+            started = time.perf_counter()
+            body = await run() if asyncio.iscoroutinefunction(run) else run()
+            samples.append(time.perf_counter() - started)
+        results.append((statistics.median(samples), len(body)))
+    return results
+
+
+async def main(sessions: int, requests: int) -> None:
+    async with app.router.lifespan_context(app):
+        await seed(sessions)
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://backend") as client:
+            rows = []
+            for path in ROUTES:
+                rows.append((path, *await time_route(client, path, requests)))
+            (validated_s, validated_bytes), (fast_s, fast_bytes) = await serialisation_only(client, requests)
+
+    print(f"{sessions} sessions, {requests} requests per route, encoder: {'orjson' if orjson else 'json (orjson not installed)'}")
+    print(f"{'route':<56} {'validated':>10} {'fast':>9} {'speedup':>8}")
+    for path, validated, fast in rows:
+        print(f"{path:<56} {validated * 1000:>8.2f}ms {fast * 1000:>7.2f}ms {validated / fast:>7.2f}x")
+    print(f"serialise 100-session page only: validated {validated_s * 1000:.2f} ms ({validated_bytes} B), "
+          f"fast {fast_s * 1000:.2f} ms ({fast_bytes} B), {validated_s / fast_s:.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=2000, help="Sessions seeded for the user")
+    parser.add_argument("--requests", type=int, default=200, help="Timed requests per route and mode")
+    args = parser.parse_args()
+    try:
+        asyncio.run(main(args.sessions, args.requests))
+    finally:
+        _SCRATCH.cleanup()
@@ -0,0 +1,109 @@
+"""
+End-to-end pull-sync throughput: many users syncing from stub extensions.
+
+Starts `benchmarks.stub_extension` in-process, gives every simulated user its
+own endpoint on it (`/u/<id>/`), and runs `ExtensionClient.sync_user_sessions`
+for all of them with bounded concurrency against a throwaway SQLite database.
+Reports sessions stored per second and the per-user sync latency distribution.
+
+    python -m benchmarks.bench_pull_sync
+    python -m benchmarks.bench_pull_sync --users 200 --sessions 500 --concurrency 16
+    python -m benchmarks.bench_pull_sync --ndjson --latency-ms 25 --jitter-ms 50 --error-rate 0.02
+"""
+
+from __future__ import annotations
+
+import os
+import tempfile
+
+# Point the app at a scratch database before anything imports its engine.
+_SCRATCH = tempfile.TemporaryDirectory(prefix="afk-bench-")
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{_SCRATCH.name}/bench.db"
+os.environ["DB_SHARD_COUNT"] = "1"
+os.environ["DEBUG"] = "false"  # no SQL echo
+
+import argparse  # noqa: E402
+import asyncio  # noqa: E402
+import statistics  # noqa: E402
+import time  # noqa: E402
+from types import SimpleNamespace  # noqa: E402
+
+from app.config import settings  # noqa: E402
+from app.database import async_session_maker, close_db, engine, primary_tables  # noqa: E402
+from app.migrations import prepare_database  # noqa: E402
+from app.services.extension_client import ExtensionClient  # noqa: E402
+from benchmarks.stub_extension import add_stub_arguments, serve, stub_config  # noqa: E402
+
+
+def percentile(ordered: list, fraction: float) -> float:
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+async def sync_one(client: ExtensionClient, user, semaphore: asyncio.Semaphore, results: list) -> None:
+    async with semaphore:
+        started = time.perf_counter()
+        try:
+            async with async_session_maker() as db:
+                synced = await client.sync_user_sessions(user, f"bench-{user.id}", db)
+            error = None
+        except Exception as e:  # reported, not fatal: one user's failure shouldn't stop the run
+            synced, error = 0, e
+        results.append((time.perf_counter() - started, synced, error))
+
+
+async def main(args: argparse.Namespace) -> None:
+    if args.page_size:
+        settings.extension_sync_page_size = args.page_size
+    await prepare_database(engine, primary_tables())
+
+    runner = await serve(stub_config(args), "localhost", args.port)
+    stats = runner.app["stats"]
+    client = ExtensionClient()
+    users = [SimpleNamespace(id=i, username=f"bench{i}", github_id=str(i)) for i in range(1, args.users + 1)]
+    for user in users:
+        client._extension_registry[str(user.id)] = {
+            "user_id": str(user.id), "github_id": user.github_id, "host": "localhost", "port": args.port,
+            "endpoint": f"http://localhost:{args.port}/u/{user.id}", "last_seen": None, "is_active": True,
+        }
+
+    semaphore = asyncio.Semaphore(args.concurrency)
+    results: list = []
+    try:
+        started = time.perf_counter()
+        await asyncio.gather(*(sync_one(client, user, semaphore, results) for user in users))
+        elapsed = time.perf_counter() - started
+    finally:
+        await client.close()
+        await runner.cleanup()
+        await close_db()
+
+    latencies = sorted(latency for latency, _, _ in results)
+    synced = sum(count for _, count, _ in results)
+    failed = [error for _, _, error in results if error is not None]
+    incomplete = sum(1 for _, count, _ in results if count < args.sessions)
+
+    print(f"users {args.users}   backlog {args.sessions}/user   page {settings.extension_sync_page_size}"
+          f"   concurrency {args.concurrency}   {'ndjson' if args.ndjson else 'json'}")
+    print(f"synced {synced} sessions in {elapsed:.2f} s   {synced / elapsed:,.0f} sessions/s")
+    print(f"per-user sync   p50 {statistics.median(latencies) * 1000:8.1f} ms   "
+          f"p95 {percentile(latencies, 0.95) * 1000:8.1f} ms   p99 {percentile(latencies, 0.99) * 1000:8.1f} ms   "
+          f"max {latencies[-1] * 1000:8.1f} ms")
+    print(f"stub served {stats['exports']} export requests ({stats['errors']} injected errors)   "
+          f"{incomplete} users incomplete   {len(failed)} raised")
+    for error in failed[:3]:
+        cause = getattr(error, "orig", None) or error  # the DBAPI error behind an SQLAlchemy one
+        print(f"  {type(cause).__name__}: {str(cause).splitlines()[0]}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=8, help="Users synced at once")
+    parser.add_argument("--page-size", type=int, default=None, help="Override EXTENSION_SYNC_PAGE_SIZE")
+    parser.add_argument("--port", type=int, default=8102)
+    add_stub_arguments(parser)
+    args = parser.parse_args()
+    try:
+        asyncio.run(main(args))
+    finally:
+        _SCRATCH.cleanup()
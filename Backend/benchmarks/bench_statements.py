@@ -0,0 +1,94 @@
+"""
+Per-request CPU of the hot session queries: rebuilt trees vs cached lambdas.
+
+Runs both forms of the same statements against an in-memory database holding a
+handful of rows, so the numbers are dominated by statement construction,
+cache-key generation and result handling rather than SQLite itself.
+
+    python -m benchmarks.bench_statements
+    python -m benchmarks.bench_statements --iterations 5000
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, desc, func, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app import queries
+from app.database import Base
+from app.models import FileSession
+
+USER_ID = "bench-user"
+
+
+def rebuilt(start: datetime, end: datetime):
+    """The pre-lambda form, as the routes built it on every request."""
+    query = select(FileSession).where(FileSession.user_id == USER_ID)
+    query = query.where(
+        and_(FileSession.session_start_time >= start, FileSession.session_start_time <= end)
+    )
+    query = query.where(FileSession.project_name == "afk.exe")
+    count = select(func.count()).select_from(query.subquery())
+    page = query.order_by(desc(FileSession.session_start_time)).offset(0).limit(50)
+    return [count, page]
+
+
+def cached(start: datetime, end: datetime):
+    filters = dict(project_name="afk.exe", start=start, end=end)
+    return [
+        queries.user_session_count(USER_ID, **filters),
+        queries.user_sessions_page(USER_ID, 0, 50, **filters),
+    ]
+
+
+async def measure(session_maker, build, iterations: int) -> float:
+    now = datetime(2026, 1, 31)
+    async with session_maker() as db:
+        for _ in range(50):  # warm the compiled cache
+            for stmt in build(now - timedelta(days=7), now):
+                (await db.execute(stmt)).all()
+
+        started = time.process_time()
+        for i in range(iterations):
+            # Vary the parameters so nothing can be cached by value.
+            end = now - timedelta(minutes=i)
+            for stmt in build(end - timedelta(days=7), end):
+                (await db.execute(stmt)).all()
+        return (time.process_time() - started) / iterations
+
+
+async def main(iterations: int) -> None:
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    session_maker = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    async with session_maker() as db:
+        base = datetime(2026, 1, 1)
+        for i in range(20):
+            db.add(FileSession(
+                id=f"s{i}", user_id=USER_ID, file_path=f"/src/f{i}.py", file_name=f"f{i}.py",
+                file_extension="py", language="Python", project_name="afk.exe", project_path="/src",
+                session_start_time=base + timedelta(days=i), total_duration=60,
+                editor="vscode", platform="linux",
+            ))
+        await db.commit()
+
+    before = await measure(session_maker, rebuilt, iterations)
+    after = await measure(session_maker, cached, iterations)
+    await engine.dispose()
+
+    print(f"rebuilt statements: {before * 1e6:8.1f} us CPU per request (count + page)")
+    print(f"cached lambdas:     {after * 1e6:8.1f} us CPU per request (count + page)")
+    print(f"saved:              {(before - after) * 1e6:8.1f} us ({(1 - after / before) * 100:.0f}%)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=2000)
+    asyncio.run(main(parser.parse_args().iterations))
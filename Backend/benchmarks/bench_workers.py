@@ -0,0 +1,171 @@
+"""
+Throughput of the real server by worker count, under a mixed dashboard/ingest load.
+
+For each worker count, starts `run_server.py --production --workers N` on a
+scratch database (GitHub unset, so requests act as the local user), then
+drives it over HTTP for a fixed time: `--ingest-share` of requests are
+`POST /api/sessions`, the rest cycle through the dashboard reads. Rate
+limiting and load shedding are switched off so the numbers show raw capacity.
+
+    python -m benchmarks.bench_workers
+    python -m benchmarks.bench_workers --workers 1 2 4 8 --clients 64 --duration 20
+
+The load generator runs on the same machine: past a few workers it competes
+with the server for cores, so compare runs on a box with cores to spare.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import itertools
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+import httpx
+
+BACKEND = Path(__file__).resolve().parent.parent
+READS = [
+    "/api/sessions?limit=50",
+    "/api/sessions/stats?time_filter=last_30_days",
+    "/api/sessions/stats/daily?time_filter=last_30_days",
+    "/api/sessions/stats/languages?time_filter=last_30_days",
+    "/api/sessions/projects",
+]
+
+
+def percentile(ordered: list, fraction: float) -> float:
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def session_payload(started: float) -> dict:
+    start = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(started))
+    end = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(started + 60))
+    project = f"project-{random.randrange(8)}"
+    return {
+        "session": {
+            "id": uuid.uuid4().hex,
+            "fileName": "main.py",
+            "filePath": f"/work/{project}/main.py",
+            "fileExtension": ".py",
+            "language": random.choice(["python", "typescript", "go"]),
+            "projectName": project,
+            "projectPath": f"/work/{project}",
+            "sessionStartTime": start,
+            "sessionEndTime": end,
+            "duration": 60_000,
+            "keystrokes": 120,
+            "linesAdded": 4,
+            "linesRemoved": 1,
+            "charactersAdded": 90,
+            "charactersRemoved": 10,
+            "isActive": False,
+        },
+        "systemInfo": {"editor": "vscode", "platform": "linux"},
+    }
+
+
+def start_server(workers: int, port: int, database: str) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        "DATABASE_URL": f"sqlite+aiosqlite:///{database}",
+        "GITHUB_CLIENT_ID": "",
+        "GITHUB_CLIENT_SECRET": "",
+        "RATE_LIMIT_ENABLED": "false",
+        "LOAD_SHEDDING_ENABLED": "false",
+        "SESSION_COALESCE_GAP_SECONDS": "0",
+        "WORKER_LOCK_DIR": str(Path(database).parent),
+    }
+    command = [
+        sys.executable, "run_server.py", "--production", "--manager", "uvicorn",
+        "--workers", str(workers), "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning",
+    ]
+    return subprocess.Popen(command, cwd=BACKEND, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+
+
+async def wait_ready(client: httpx.AsyncClient, server: subprocess.Popen, timeout: float = 60) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"Server exited: {server.stderr.read().decode()[-2000:]}")
+        try:
+            if (await client.get("/api/health")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError("Server did not become ready")
+
+
+async def drive(client: httpx.AsyncClient, until: float, ingest_share: float, results: list) -> None:
+    reads = itertools.cycle(READS)
+    while time.monotonic() < until:
+        ingest = random.random() < ingest_share
+        started = time.perf_counter()
+        try:
+            if ingest:
+                response = await client.post("/api/sessions", json=session_payload(time.time() - random.randrange(86400 * 30)))
+            else:
+                response = await client.get(next(reads))
+            ok = response.status_code == 200
+        except httpx.TransportError:
+            ok = False
+        results.append(("ingest" if ingest else "read", time.perf_counter() - started, ok))
+
+
+async def run(workers: int, args: argparse.Namespace) -> dict:
+    with tempfile.TemporaryDirectory(prefix="afk-bench-") as scratch:
+        server = start_server(workers, args.port, f"{scratch}/bench.db")
+        limits = httpx.Limits(max_connections=args.clients, max_keepalive_connections=args.clients)
+        try:
+            async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{args.port}", limits=limits, timeout=30) as client:
+                await wait_ready(client, server)
+                # Give every worker a moment to finish its own startup, and seed some history.
+                await asyncio.sleep(1)
+                await asyncio.gather(*(client.post("/api/sessions", json=session_payload(time.time() - i * 3600))
+                                       for i in range(200)))
+                results: list = []
+                started = time.monotonic()
+                await asyncio.gather(*(drive(client, started + args.duration, args.ingest_share, results)
+                                       for _ in range(args.clients)))
+                elapsed = time.monotonic() - started
+        finally:
+            server.terminate()
+            try:
+                server.wait(timeout=15)
+            except subprocess.TimeoutExpired:
+                server.kill()
+
+    summary = {"workers": workers, "rps": len(results) / elapsed,
+               "errors": sum(1 for _, _, ok in results if not ok)}
+    for kind in ("read", "ingest"):
+        ordered = sorted(latency for k, latency, ok in results if k == kind and ok)
+        summary[kind] = (statistics.median(ordered), percentile(ordered, 0.99)) if ordered else (0, 0)
+    return summary
+
+
+async def main(args: argparse.Namespace) -> None:
+    print(f"{args.clients} clients, {args.duration:g}s per run, {args.ingest_share:.0%} ingest, "
+          f"{os.cpu_count()} CPUs")
+    print(f"{'workers':>7} {'req/s':>8} {'read p50':>9} {'read p99':>9} {'ingest p50':>11} {'ingest p99':>11} {'errors':>7}")
+    for workers in args.workers:
+        s = await run(workers, args)
+        print(f"{s['workers']:>7} {s['rps']:>8.1f} {s['read'][0] * 1000:>7.1f}ms {s['read'][1] * 1000:>7.1f}ms "
+              f"{s['ingest'][0] * 1000:>9.1f}ms {s['ingest'][1] * 1000:>9.1f}ms {s['errors']:>7}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--clients", type=int, default=32, help="Concurrent connections")
+    parser.add_argument("--duration", type=float, default=10, help="Seconds per worker count")
+    parser.add_argument("--ingest-share", type=float, default=0.3)
+    parser.add_argument("--port", type=int, default=8120)
+    asyncio.run(main(parser.parse_args()))
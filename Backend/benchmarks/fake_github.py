@@ -0,0 +1,96 @@
+"""
+Local stand-in for the three GitHub endpoints the OAuth callback calls.
+
+`POST /login/oauth/access_token` accepts any code and returns a token derived
+from it; `GET /user` and `GET /user/emails` answer for that token, with a
+private profile email so the emails lookup is actually needed. Every response
+is delayed by `--latency-ms` to stand in for the round trip to GitHub.
+
+    python -m benchmarks.fake_github --port 8110 --latency-ms 80
+
+then start the backend with
+GITHUB_OAUTH_URL=http://localhost:8110 GITHUB_API_URL=http://localhost:8110
+and any non-empty GITHUB_CLIENT_ID / GITHUB_CLIENT_SECRET.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import zlib
+
+from aiohttp import web
+
+
+def make_app(latency_ms: float) -> web.Application:
+    stats = {"requests": 0}
+
+    async def delay():
+        stats["requests"] += 1
+        if latency_ms > 0:
+            await asyncio.sleep(latency_ms / 1000)
+
+    def user_id(request: web.Request) -> int:
+        token = request.headers.get("Authorization", "").removeprefix("Bearer ")
+        return zlib.crc32(token.encode()) % 10_000_000
+
+    async def access_token(request: web.Request) -> web.Response:
+        await delay()
+        form = await request.post()
+        code = form.get("code")
+        if not code:
+            return web.json_response({"error": "bad_verification_code", "error_description": "No code"})
+        return web.json_response({"access_token": f"gho_{code}", "token_type": "bearer", "scope": "user:email"})
+
+    async def user(request: web.Request) -> web.Response:
+        await delay()
+        uid = user_id(request)
+        return web.json_response({
+            "id": uid,
+            "login": f"dev{uid}",
+            "email": None,
+            "avatar_url": f"https://avatars.example/{uid}",
+        })
+
+    async def emails(request: web.Request) -> web.Response:
+        await delay()
+        uid = user_id(request)
+        return web.json_response([
+            {"email": f"dev{uid}@users.noreply.example", "primary": False, "verified": True},
+            {"email": f"dev{uid}@example.com", "primary": True, "verified": True},
+        ])
+
+    app = web.Application()
+    app["stats"] = stats
+    app.router.add_post("/login/oauth/access_token", access_token)
+    app.router.add_get("/user", user)
+    app.router.add_get("/user/emails", emails)
+    return app
+
+
+async def serve(host: str, port: int, latency_ms: float) -> web.AppRunner:
+    runner = web.AppRunner(make_app(latency_ms), access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
+
+
+async def main(host: str, port: int, latency_ms: float) -> None:
+    runner = await serve(host, port, latency_ms)
+    print(f"Fake GitHub on http://{host}:{port} ({latency_ms:g} ms per call)")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=8110)
+    parser.add_argument("--latency-ms", type=float, default=80)
+    args = parser.parse_args()
+    try:
+        asyncio.run(main(args.host, args.port, args.latency_ms))
+    except KeyboardInterrupt:
+        pass
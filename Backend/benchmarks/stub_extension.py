@@ -0,0 +1,202 @@
+"""
+Stand-in for the VS Code extension's local HTTP server.
+
+Implements `GET /api/health` and `POST /api/sessions/export` well enough for
+`ExtensionClient` to discover, page through and sync from it, with knobs for
+the things that matter to the pull path: backlog size, page size, payload
+size, latency and error rate. Sessions are generated on the fly from their
+index, so a backlog of millions costs no memory.
+
+Every route is also served under `/u/<user id>/`, which lets one stub play a
+separate extension for each simulated user (each prefix is its own endpoint to
+the client, with its own circuit breaker and sync cursor).
+
+    python -m benchmarks.stub_extension --port 8001 --user-id 1
+    python -m benchmarks.stub_extension --port 8001 --user-id 1 --sessions 50000 --ndjson --latency-ms 20 --error-rate 0.05
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import random
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from aiohttp import web
+
+BASE_TIME = datetime(2026, 1, 1, tzinfo=timezone.utc)
+SESSION_STEP = timedelta(seconds=90)
+
+
+@dataclass
+class StubConfig:
+    sessions: int = 1000  # backlog per user
+    max_page: Optional[int] = None  # cap on sessions per page, below the client's `limit`
+    padding: int = 0  # extra bytes in each session's filePath, to inflate payloads
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    error_rate: float = 0.0  # fraction of export requests answered with 503
+    ndjson: bool = False
+    user_id: str = "1"  # reported by /api/health when no /u/<id>/ prefix is used
+    github_id: Optional[str] = None
+    seed: Optional[int] = None
+
+
+def session(user_id: str, index: int, padding: int) -> dict:
+    start = BASE_TIME + index * SESSION_STEP
+    return {
+        "id": f"stub-{user_id}-{index}",
+        "filePath": f"/src/{'x' * padding}/f{index % 50}.py",
+        "fileName": f"f{index % 50}.py",
+        "fileExtension": "py",
+        "language": "python",
+        "projectName": f"project-{index % 5}",
+        "projectPath": "/src",
+        "sessionStartTime": start.isoformat(),
+        "sessionEndTime": (start + timedelta(seconds=60)).isoformat(),
+        "totalDuration": 60,
+        "linesAdded": index % 7,
+        "linesDeleted": index % 3,
+        "linesModified": 1,
+        "charactersAdded": 40,
+        "charactersDeleted": 5,
+        "charactersModified": 12,
+        "totalEdits": 4,
+        "isActive": False,
+    }
+
+
+def first_index_after(since: Optional[str]) -> int:
+    """Index of the first session starting strictly after `since`."""
+    if not since:
+        return 0
+    moment = datetime.fromisoformat(since.replace("Z", "+00:00"))
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    if moment < BASE_TIME:
+        return 0
+    return int((moment - BASE_TIME) // SESSION_STEP) + 1
+
+
+def make_app(config: StubConfig) -> web.Application:
+    rng = random.Random(config.seed)
+    stats = {"exports": 0, "errors": 0, "sessions": 0}
+
+    async def delay():
+        wait = config.latency_ms + rng.uniform(0, config.jitter_ms)
+        if wait > 0:
+            await asyncio.sleep(wait / 1000)
+
+    async def health(request: web.Request) -> web.Response:
+        user_id = request.match_info.get("user", config.user_id)
+        return web.json_response({
+            "status": "healthy",
+            "deviceId": f"stub-{user_id}",
+            "userId": user_id,
+            "githubId": config.github_id,
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+        })
+
+    async def export(request: web.Request) -> web.StreamResponse:
+        stats["exports"] += 1
+        await delay()
+        if rng.random() < config.error_rate:
+            stats["errors"] += 1
+            return web.json_response({"error": "stub failure"}, status=503)
+
+        user_id = request.match_info.get("user", config.user_id)
+        body = await request.json()
+        limit = body.get("limit") or 100
+        if config.max_page:
+            limit = min(limit, config.max_page)
+        start = first_index_after(body.get("since"))
+        end = min(start + limit, config.sessions)
+        stats["sessions"] += max(0, end - start)
+
+        if end > start:
+            last_sync = BASE_TIME + (end - 1) * SESSION_STEP
+        else:
+            last_sync = datetime.fromisoformat(body["since"].replace("Z", "+00:00")) if body.get("since") else BASE_TIME
+        trailer = {"hasMore": end < config.sessions, "lastSyncTime": last_sync.isoformat()}
+
+        if not config.ndjson:
+            sessions = [session(user_id, i, config.padding) for i in range(start, end)]
+            return web.json_response({"sessions": sessions, **trailer})
+
+        response = web.StreamResponse(headers={"Content-Type": "application/x-ndjson"})
+        await response.prepare(request)
+        lines = []
+        for i in range(start, end):
+            lines.append(json.dumps(session(user_id, i, config.padding)))
+            if len(lines) == 200:
+                await response.write(("\n".join(lines) + "\n").encode())
+                lines = []
+        lines.append(json.dumps(trailer))
+        await response.write(("\n".join(lines) + "\n").encode())
+        await response.write_eof()
+        return response
+
+    app = web.Application()
+    app["stats"] = stats
+    for prefix in ("", "/u/{user}"):
+        app.router.add_get(f"{prefix}/api/health", health)
+        app.router.add_post(f"{prefix}/api/sessions/export", export)
+    return app
+
+
+async def serve(config: StubConfig, host: str, port: int) -> web.AppRunner:
+    runner = web.AppRunner(make_app(config), access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
+
+
+async def main(config: StubConfig, host: str, port: int) -> None:
+    runner = await serve(config, host, port)
+    print(f"Stub extension for user {config.user_id} on http://{host}:{port} ({config.sessions} sessions)")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
+
+
+def add_stub_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--sessions", type=int, default=1000, help="Backlog per user")
+    parser.add_argument("--max-page", type=int, default=None, help="Cap on sessions per page")
+    parser.add_argument("--padding", type=int, default=0, help="Extra bytes per session")
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of exports failing with 503")
+    parser.add_argument("--ndjson", action="store_true", help="Stream pages as NDJSON")
+    parser.add_argument("--seed", type=int, default=None)
+
+
+def stub_config(args: argparse.Namespace, **overrides) -> StubConfig:
+    return StubConfig(
+        sessions=args.sessions,
+        max_page=args.max_page,
+        padding=args.padding,
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        ndjson=args.ndjson,
+        seed=args.seed,
+        **overrides,
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_stub_arguments(parser)
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--user-id", default="1", help="User id reported by /api/health")
+    parser.add_argument("--github-id", default=None)
+    args = parser.parse_args()
+    try:
+        asyncio.run(main(stub_config(args, user_id=args.user_id, github_id=args.github_id), args.host, args.port))
+    except KeyboardInterrupt:
+        pass
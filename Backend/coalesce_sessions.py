@@ -0,0 +1,64 @@
+"""
+Merge adjacent focus sessions that are already stored.
+
+New sessions are merged as they arrive (see app/services/session_coalescer.py);
+this backfills rows recorded before that, or after changing the gap.
+
+    python coalesce_sessions.py                      # all users, configured gap
+    python coalesce_sessions.py --gap 60 --dry-run
+    python coalesce_sessions.py --user 42
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+
+from app.config import settings
+from app.database import close_db
+from app.services.session_coalescer import coalesce_existing_sessions
+from app.sharding import shard_for, shard_router
+
+
+async def run(gap: int, user_id: str | None, dry_run: bool) -> None:
+    if user_id:
+        shards = [shard_for(user_id, shard_router.shard_count)]
+    else:
+        shards = range(shard_router.shard_count)
+
+    stats = {"scanned": 0, "merged_into": 0, "deleted": 0}
+    for index in shards:
+        _, session_maker = shard_router.shard(index)
+        async with session_maker() as db:
+            shard_stats = await coalesce_existing_sessions(db, gap, user_id=user_id, dry_run=dry_run)
+        for key, value in shard_stats.items():
+            stats[key] += value
+    await shard_router.close()
+    await close_db()
+
+    verb = "would delete" if dry_run else "deleted"
+    print(
+        f"Scanned {stats['scanned']} sessions: {stats['merged_into']} absorbed adjacent "
+        f"sessions, {verb} {stats['deleted']} rows."
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument(
+        "--gap",
+        type=int,
+        default=settings.session_coalesce_gap_seconds,
+        help="Largest gap in seconds between sessions that still counts as adjacent",
+    )
+    parser.add_argument("--user", help="Only coalesce this user's sessions")
+    parser.add_argument("--dry-run", action="store_true", help="Report what would change without writing")
+    args = parser.parse_args()
+
+    if args.gap <= 0:
+        parser.error("--gap must be positive")
+    asyncio.run(run(args.gap, args.user, args.dry_run))
+
+
+if __name__ == "__main__":
+    main()
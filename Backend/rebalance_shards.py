@@ -0,0 +1,133 @@
+"""
+Move users' sessions onto the shard they hash to.
+
+Run after turning sharding on or changing DB_SHARD_COUNT. Every user found in
+the wrong database has their rows copied to the right shard and then deleted
+from the old one, one user at a time, so an interrupted run can simply be
+started again.
+
+    python rebalance_shards.py                    # primary + current shards
+    python rebalance_shards.py --from-count 8     # after shrinking from 8 shards
+    python rebalance_shards.py --dry-run
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+
+from sqlalchemy import delete, insert, select
+from sqlalchemy.engine import make_url
+
+from app.config import settings
+from app.database import async_session_maker, close_db, engine, primary_tables
+from app.migrations import prepare_database
+from app.models import FileSession
+from app.sharding import SHARDED_TABLES, ShardRouter, shard_for, shard_router
+
+BATCH_SIZE = 500
+
+
+def database_exists(url: str) -> bool:
+    path = make_url(url).database
+    return bool(path) and (path == ":memory:" or os.path.exists(path))
+
+
+def destination_url(user_id: str) -> str:
+    if not shard_router.enabled:
+        return settings.database_url
+    return shard_router.shard_url(shard_for(user_id, shard_router.shard_count))
+
+
+def sources(from_count: int):
+    """(url, session factory) for every database that may hold misplaced rows."""
+    found = []
+    if shard_router.enabled:
+        found.append((settings.database_url, async_session_maker))
+
+    # Indices past the current count are only reachable through a router sized
+    # for the old count; below it, reuse the live shard engines.
+    old_router = shard_router if shard_router.enabled else ShardRouter(from_count, settings.db_shard_url_template)
+    for index in range(max(from_count, shard_router.shard_count)):
+        if not shard_router.enabled and from_count <= 1:
+            break
+        url = old_router.shard_url(index)
+        if url == settings.database_url or not database_exists(url):
+            continue
+        found.append((url, old_router.shard(index)[1]))
+    return found, old_router
+
+
+async def move_user(user_id: str, source_maker, dest_maker) -> int:
+    """Move every sharded row belonging to `user_id`; returns the sessions moved."""
+    moved = 0
+    async with source_maker() as source, dest_maker() as dest:
+        for table in SHARDED_TABLES:
+            rows = (await source.execute(select(table).where(table.c.user_id == user_id))).mappings().all()
+            for start in range(0, len(rows), BATCH_SIZE):
+                batch = [dict(row) for row in rows[start:start + BATCH_SIZE]]
+                # The source copy is authoritative if a previous run was interrupted.
+                await dest.execute(insert(table).prefix_with("OR REPLACE"), batch)
+                if table is FileSession.__table__:
+                    moved += len(batch)
+        await dest.commit()
+
+        for table in SHARDED_TABLES:
+            await source.execute(delete(table).where(table.c.user_id == user_id))
+        await source.commit()
+    return moved
+
+
+async def run(from_count: int, dry_run: bool) -> None:
+    await prepare_database(engine, primary_tables())
+    if shard_router.enabled:
+        for shard_engine in shard_router.engines():
+            await prepare_database(shard_engine, SHARDED_TABLES)
+
+    found, old_router = sources(from_count)
+    users_moved = rows_moved = 0
+    for url, source_maker in found:
+        async with source_maker() as source:
+            user_ids = (await source.execute(select(FileSession.user_id).distinct())).scalars().all()
+
+        for user_id in user_ids:
+            target = destination_url(user_id)
+            if target == url:
+                continue
+            if dry_run:
+                print(f"would move {user_id}: {url} -> {target}")
+                users_moved += 1
+                continue
+
+            moved = await move_user(user_id, source_maker, shard_router.session_maker_for(user_id))
+            print(f"moved {moved} sessions for {user_id}: {url} -> {target}")
+            users_moved += 1
+            rows_moved += moved
+
+    if old_router is not shard_router:
+        await old_router.close()
+    await shard_router.close()
+    await close_db()
+
+    if dry_run:
+        print(f"{users_moved} users would move.")
+    else:
+        print(f"Moved {rows_moved} sessions for {users_moved} users.")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument(
+        "--from-count",
+        type=int,
+        default=settings.db_shard_count,
+        help="Shard count the data was written with, if larger than DB_SHARD_COUNT",
+    )
+    parser.add_argument("--dry-run", action="store_true", help="List moves without making them")
+    args = parser.parse_args()
+    asyncio.run(run(args.from_count, args.dry_run))
+
+
+if __name__ == "__main__":
+    main()
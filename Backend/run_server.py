@@ -50,13 +50,40 @@ def setup_environment():
             os.environ[key] = value
 
 
-def start_server(host="0.0.0.0", port=8000, reload=True, log_level="info"):
+def gunicorn_available():
+    """gunicorn is optional; it adds graceful reloads (SIGHUP) and worker restarts."""
+    try:
+        import gunicorn  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def start_gunicorn(host, port, workers, log_level, graceful_timeout):
+    """Replace this process with gunicorn managing uvicorn workers."""
+    command = [
+        sys.executable, "-m", "gunicorn", "app.main:app",
+        "--worker-class", "uvicorn.workers.UvicornWorker",
+        "--workers", str(workers),
+        "--bind", f"{host}:{port}",
+        "--log-level", log_level,
+        "--graceful-timeout", str(graceful_timeout),
+    ]
+    print(f"🦄 gunicorn with {workers} uvicorn workers")
+    print(f"   Graceful reload: kill -HUP {os.getpid()}")
+    print("-" * 50)
+    sys.stdout.flush()
+    os.execv(sys.executable, command)
+
+
+def start_server(host="0.0.0.0", port=8000, reload=True, log_level="info", workers=1):
     """Start the FastAPI server using uvicorn."""
     
     print(f"🚀 Starting AFK Coding Monitor Backend Server")
     print(f"   Host: {host}")
     print(f"   Port: {port}")
     print(f"   Reload: {reload}")
+    print(f"   Workers: {workers}")
     print(f"   Log Level: {log_level}")
     print()
     print(f"📖 API Documentation: http://{host}:{port}/docs")
@@ -72,6 +99,7 @@ def start_server(host="0.0.0.0", port=8000, reload=True, log_level="info"):
             host=host,
             port=port,
             reload=reload,
+            workers=workers,
             log_level=log_level
         )
     except KeyboardInterrupt:
@@ -119,6 +147,27 @@ def main():
         help="Run in production mode (no reload, info log level)"
     )
     
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Worker processes (default: 1, or one per CPU with --production)"
+    )
+    
+    parser.add_argument(
+        "--manager",
+        choices=["auto", "gunicorn", "uvicorn"],
+        default="auto",
+        help="Process manager for several workers: gunicorn when installed (auto), or uvicorn's"
+    )
+    
+    parser.add_argument(
+        "--graceful-timeout",
+        type=int,
+        default=30,
+        help="Seconds gunicorn lets workers finish in-flight requests on reload/stop (default: 30)"
+    )
+    
     parser.add_argument(
         "--check-deps",
         action="store_true",
@@ -142,19 +191,30 @@ def main():
     if args.production:
         reload = False
         log_level = "info"
+        workers = args.workers or os.cpu_count() or 1
         os.environ["DEBUG"] = "false"
         print("🏭 Running in production mode")
     else:
-        reload = not args.no_reload
+        workers = args.workers or 1
+        reload = not args.no_reload and workers == 1
         log_level = args.log_level
         print("🔧 Running in development mode")
     
+    if workers > 1:
+        if args.manager == "gunicorn" and not gunicorn_available():
+            print("❌ --manager gunicorn needs gunicorn: pip install gunicorn")
+            sys.exit(1)
+        if args.manager != "uvicorn" and gunicorn_available():
+            start_gunicorn(args.host, args.port, workers, log_level, args.graceful_timeout)
+        print("   (uvicorn workers: restart the server to reload; install gunicorn for SIGHUP reloads)")
+    
     # Start the server
     start_server(
         host=args.host,
         port=args.port,
         reload=reload,
-        log_level=log_level
+        log_level=log_level,
+        workers=workers
     )
 
 
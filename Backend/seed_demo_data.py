@@ -15,6 +15,7 @@ from __future__ import annotations
 import argparse
 import random
 import sys
+import time
 import uuid
 from datetime import datetime, timedelta, timezone
 
@@ -43,6 +44,10 @@ LANG_FILES = {
 
 EDITORS = ["vscode", "cursor"]
 
+# 429 (rate limited) and 503 (load shed) are retried after the server's Retry-After.
+RETRY_STATUSES = {429, 503}
+MAX_ATTEMPTS = 5
+
 
 def weighted(rng: random.Random, items):
     """items: sequence of (value, weight)."""
@@ -130,6 +135,20 @@ def build_sessions(days: int):
     return sessions
 
 
+def post_session(base: str, payload: dict) -> requests.Response:
+    """POST one session, waiting out Retry-After when the server asks for it."""
+    for attempt in range(MAX_ATTEMPTS):
+        r = requests.post(f"{base}/api/sessions", json=payload, timeout=10)
+        if r.status_code not in RETRY_STATUSES or attempt == MAX_ATTEMPTS - 1:
+            return r
+        try:
+            delay = float(r.headers.get("Retry-After", 1))
+        except ValueError:
+            delay = 1.0
+        time.sleep(min(max(delay, 0.0), 60.0))
+    return r
+
+
 def main() -> int:
     ap = argparse.ArgumentParser()
     ap.add_argument("--url", default="http://localhost:8000")
@@ -151,7 +170,7 @@ def main() -> int:
     ok = failed = 0
     for payload in sessions:
         try:
-            r = requests.post(f"{base}/api/sessions", json=payload, timeout=10)
+            r = post_session(base, payload)
             if r.status_code < 300 and r.json().get("success"):
                 ok += 1
             else:
@@ -0,0 +1,109 @@
+from app.services.circuit_breaker import BreakerState, CircuitBreaker
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+def make_breaker(threshold=3, reset_timeout=30.0):
+    clock = FakeClock()
+    return CircuitBreaker(failure_threshold=threshold, reset_timeout=reset_timeout, clock=clock), clock
+
+
+def test_opens_after_consecutive_failures():
+    breaker, _ = make_breaker(threshold=3)
+
+    for _ in range(2):
+        assert breaker.allow()
+        breaker.record_failure()
+    assert breaker.state is BreakerState.CLOSED
+
+    breaker.record_failure()
+
+    assert breaker.state is BreakerState.OPEN
+    assert not breaker.allow()
+    assert breaker.retry_in() == 30.0
+
+
+def test_success_resets_the_failure_count():
+    breaker, _ = make_breaker(threshold=3)
+
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    breaker.record_failure()
+
+    assert breaker.state is BreakerState.CLOSED
+    assert breaker.snapshot()["consecutive_failures"] == 2
+
+
+def test_turns_half_open_after_the_reset_timeout():
+    breaker, clock = make_breaker(threshold=1, reset_timeout=30.0)
+    breaker.record_failure()
+
+    clock.advance(29.5)
+    assert breaker.state is BreakerState.OPEN
+    assert breaker.retry_in() == 0.5
+    assert not breaker.allow()
+
+    clock.advance(0.5)
+    assert breaker.state is BreakerState.HALF_OPEN
+    assert breaker.retry_in() is None
+
+
+def test_half_open_admits_one_trial_at_a_time():
+    breaker, clock = make_breaker(threshold=1)
+    breaker.record_failure()
+    clock.advance(30)
+
+    assert breaker.allow()
+    assert not breaker.allow()
+    assert not breaker.allow()
+
+    breaker.release()
+
+    assert breaker.state is BreakerState.HALF_OPEN
+    assert breaker.allow()
+    assert not breaker.allow()
+
+
+def test_trial_success_closes_the_breaker():
+    breaker, clock = make_breaker(threshold=2)
+    breaker.record_failure()
+    breaker.record_failure()
+    clock.advance(30)
+    assert breaker.allow()
+
+    breaker.record_success()
+
+    assert breaker.state is BreakerState.CLOSED
+    assert breaker.snapshot() == {"state": "closed", "consecutive_failures": 0, "retry_in": None}
+    assert breaker.allow()
+    assert breaker.allow()
+    # The count starts over: one failure no longer reaches the threshold of two.
+    breaker.record_failure()
+    assert breaker.state is BreakerState.CLOSED
+
+
+def test_trial_failure_reopens_for_another_timeout():
+    breaker, clock = make_breaker(threshold=3, reset_timeout=30.0)
+    for _ in range(3):
+        breaker.record_failure()
+    clock.advance(30)
+    assert breaker.allow()
+
+    breaker.record_failure()
+
+    assert breaker.state is BreakerState.OPEN
+    assert not breaker.allow()
+    assert breaker.retry_in() == 30.0
+    clock.advance(30)
+    assert breaker.allow()
@@ -0,0 +1,57 @@
+import pytest
+
+from app.middleware.compression import negotiate
+
+OFFERED = ["zstd", "br", "gzip"]
+
+
+@pytest.mark.parametrize(
+    "accept_encoding, expected",
+    [
+        ("gzip", "gzip"),
+        ("gzip, br", "br"),
+        ("gzip, br, zstd", "zstd"),
+        ("x-gzip", "gzip"),
+        ("GZIP", "gzip"),
+        ("deflate", None),
+        ("", None),
+        # The highest q wins; ties go to the server's preference.
+        ("gzip;q=1.0, br;q=0.5", "gzip"),
+        ("gzip;q=0.5, br;q=0.5", "br"),
+        (" gzip ; q=0.8 , br ; Q=0.9 ", "br"),
+        # q is read wherever it appears among the parameters.
+        ("gzip;foo=1;q=0", None),
+        ("gzip;foo=1;q=0, br;q=0.1", "br"),
+        ("br;level=4;q=0.2, gzip;q=0.1", "br"),
+        # Invalid or out-of-range q makes the coding unacceptable.
+        ("gzip;q=abc", None),
+        ("gzip;q=2", None),
+        ("gzip;q=-1", None),
+        ("gzip;q=nan", None),
+        # * weights every coding not named.
+        ("*", "zstd"),
+        ("*;q=0.5, gzip", "gzip"),
+        ("*, zstd;q=0, br;q=0", "gzip"),
+        ("*;q=0", None),
+        ("*;q=0, gzip;q=0.1", "gzip"),
+        # Identity: named, through *, or acceptable by default.
+        ("identity", None),
+        ("gzip;q=0.5, identity", None),
+        ("gzip, identity;q=0.5", "gzip"),
+        ("gzip;q=0.5, identity;q=0.5", "gzip"),
+        ("gzip;q=0.5, *;q=0.8", "zstd"),
+        ("gzip;q=0.5, *;q=0.4", "gzip"),
+        ("gzip;q=0.1", "gzip"),
+        ("identity;q=0", None),
+        ("identity;q=0, gzip", "gzip"),
+        ("*;q=0, identity;q=0.5, gzip;q=0.4", None),
+    ],
+)
+def test_negotiate(accept_encoding, expected):
+    assert negotiate(accept_encoding, OFFERED) == expected
+
+
+def test_only_offered_encodings_are_chosen():
+    assert negotiate("zstd, br;q=0.5", ["gzip"]) is None
+    assert negotiate("zstd, br;q=0.5, gzip;q=0.1", ["gzip"]) == "gzip"
+    assert negotiate("*", ["gzip"]) == "gzip"
@@ -0,0 +1,162 @@
+import json
+
+import pytest
+
+from app.services.export_stream import MAX_PENDING_CHARS, ExportStream
+
+pytestmark = pytest.mark.asyncio
+
+JSON = "application/json"
+NDJSON = "application/x-ndjson"
+
+
+def session(session_id, **fields):
+    return {
+        "id": session_id,
+        "filePath": "/work/app/main.py",
+        "fileName": "main.py",
+        "fileExtension": ".py",
+        "language": "python",
+        "projectName": "app",
+        "projectPath": "/work/app",
+        "sessionStartTime": "2026-01-01T10:00:00Z",
+        "sessionEndTime": "2026-01-01T10:05:00Z",
+        "totalDuration": 300,
+        "linesAdded": 1,
+        "linesDeleted": 0,
+        "linesModified": 0,
+        "charactersAdded": 10,
+        "charactersDeleted": 0,
+        "charactersModified": 0,
+        "totalEdits": 1,
+        "isActive": False,
+        **fields,
+    }
+
+
+def document(sessions, **fields):
+    return json.dumps({"sessions": sessions, "lastSyncTime": "2026-01-01T11:00:00Z", **fields}, ensure_ascii=False)
+
+
+async def chunked(*parts):
+    for part in parts:
+        yield part if isinstance(part, bytes) else part.encode()
+
+
+async def collect(stream, chunks):
+    return [session for batch in [b async for b in stream.batches(chunks)] for session in batch]
+
+
+def split_at(text, marker, offset=0):
+    at = text.index(marker) + offset
+    return text[:at], text[at:]
+
+
+async def test_split_inside_a_string():
+    body = document([session("s1", filePath="/work/app/a long path/main.py")])
+    stream = ExportStream(JSON, batch_size=10)
+
+    sessions = await collect(stream, chunked(*split_at(body, "a long path", 3)))
+
+    assert [s.filePath for s in sessions] == ["/work/app/a long path/main.py"]
+    assert stream.count == 1
+
+
+@pytest.mark.parametrize("offset", [1, 2, 4])
+async def test_split_inside_an_escape(offset):
+    body = document([session("s1", fileName='say \\"hi\\" é.py')])
+    body = body.replace("é", "\\u00e9")
+    stream = ExportStream(JSON, batch_size=10)
+
+    sessions = await collect(stream, chunked(*split_at(body, "\\u00e9", offset)))
+
+    assert [s.fileName for s in sessions] == ['say \\"hi\\" é.py']
+
+
+async def test_split_inside_a_utf8_character():
+    body = document([session("s1", projectName="café")]).encode()
+    at = body.index("é".encode()) + 1
+    stream = ExportStream(JSON, batch_size=10)
+
+    sessions = await collect(stream, chunked(body[:at], body[at:]))
+
+    assert [s.projectName for s in sessions] == ["café"]
+
+
+async def test_every_split_point_decodes_the_same():
+    body = document([session("s1"), session("s2")], hasMore=True)
+    for at in range(1, len(body)):
+        stream = ExportStream(JSON, batch_size=10)
+        sessions = await collect(stream, chunked(body[:at], body[at:]))
+        assert [s.id for s in sessions] == ["s1", "s2"], at
+        assert stream.page().hasMore is True, at
+
+
+async def test_trailing_has_more():
+    body = json.dumps({
+        "lastSyncTime": "2026-01-01T11:00:00Z",
+        "sessions": [session("s1"), session("s2"), session("s3")],
+        "hasMore": True,
+    })
+    stream = ExportStream(JSON, batch_size=2)
+
+    batches = [[s.id for s in batch] async for batch in stream.batches(chunked(*split_at(body, "hasMore")))]
+    page = stream.page()
+
+    assert batches == [["s1", "s2"], ["s3"]]
+    assert page.hasMore is True
+    assert page.sessions == []
+    assert stream.count == 3
+
+
+async def test_ndjson_trailing_has_more():
+    lines = [json.dumps(session("s1")), json.dumps({"hasMore": True, "lastSyncTime": "2026-01-01T11:00:00Z"})]
+    stream = ExportStream(NDJSON, batch_size=10)
+
+    sessions = await collect(stream, chunked("\n".join(lines)))
+
+    assert [s.id for s in sessions] == ["s1"]
+    assert stream.page().hasMore is True
+
+
+@pytest.mark.parametrize("content_type", [JSON, NDJSON])
+async def test_system_info_supplies_editor_and_platform(content_type):
+    system_info = {"editor": "cursor", "platform": "darwin"}
+    sessions = [session("s1"), session("s2", editor="vscode", platform="linux")]
+    if content_type == NDJSON:
+        lines = [{"systemInfo": system_info, "lastSyncTime": "2026-01-01T11:00:00Z"}, *sessions]
+        body = "\n".join(json.dumps(line) for line in lines) + "\n"
+    else:
+        body = json.dumps({"systemInfo": system_info, "sessions": sessions, "lastSyncTime": "2026-01-01T11:00:00Z"})
+    stream = ExportStream(content_type, batch_size=10)
+
+    decoded = await collect(stream, chunked(*split_at(body, '"s1"')))
+
+    assert [(s.editor, s.platform) for s in decoded] == [("cursor", "darwin"), ("vscode", "linux")]
+    assert stream.page().systemInfo == system_info
+
+
+async def test_oversized_record_is_rejected():
+    block = "x" * (1024 * 1024)
+    parts = ['{"sessions": [{"id": "s1", "filePath": "'] + [block] * (MAX_PENDING_CHARS // len(block) + 1)
+    stream = ExportStream(JSON, batch_size=10)
+
+    with pytest.raises(ValueError, match="maximum size"):
+        await collect(stream, chunked(*parts))
+
+
+async def test_oversized_ndjson_line_is_rejected():
+    block = "x" * (1024 * 1024)
+    parts = ['{"id": "s1", "filePath": "'] + [block] * (MAX_PENDING_CHARS // len(block) + 1)
+    stream = ExportStream(NDJSON, batch_size=10)
+
+    with pytest.raises(ValueError, match="maximum size"):
+        await collect(stream, chunked(*parts))
+
+
+async def test_truncated_document_is_rejected():
+    body = document([session("s1")])
+    stream = ExportStream(JSON, batch_size=10)
+
+    with pytest.raises(ValueError):
+        await collect(stream, chunked(body[:-10]))
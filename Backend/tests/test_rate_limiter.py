@@ -0,0 +1,147 @@
+import httpx
+import pytest
+from fastapi import Depends, FastAPI, Header
+
+from app import dependencies
+from app.routers.auth import LOCAL_USER_ID, current_user_id
+from app.services.rate_limiter import InMemoryBackend, RateLimited, RateLimiter, RouteLimit
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def backend(clock):
+    return InMemoryBackend(clock=clock)
+
+
+@pytest.mark.asyncio
+async def test_burst_then_refused(backend):
+    limit = RouteLimit(rate=2.0, burst=3, max_in_flight=10)
+
+    assert [await backend.take("ingest:u1", limit) for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert await backend.take("ingest:u1", limit) == pytest.approx(0.5)
+    # Another user has a bucket of their own.
+    assert await backend.take("ingest:u2", limit) == 0.0
+
+
+@pytest.mark.asyncio
+async def test_bucket_refills_at_rate(backend, clock):
+    limit = RouteLimit(rate=2.0, burst=3, max_in_flight=10)
+    for _ in range(3):
+        await backend.take("ingest:u1", limit)
+
+    clock.advance(0.25)
+    assert await backend.take("ingest:u1", limit) == pytest.approx(0.25)
+
+    clock.advance(0.25)
+    assert await backend.take("ingest:u1", limit) == 0.0
+    assert await backend.take("ingest:u1", limit) > 0
+
+
+@pytest.mark.asyncio
+async def test_refill_is_capped_at_burst(backend, clock):
+    limit = RouteLimit(rate=2.0, burst=3, max_in_flight=10)
+    await backend.take("ingest:u1", limit)
+
+    clock.advance(3600)
+
+    assert [await backend.take("ingest:u1", limit) for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert await backend.take("ingest:u1", limit) > 0
+
+
+@pytest.mark.asyncio
+async def test_in_flight_accounting(backend):
+    limit = RouteLimit(rate=100.0, burst=100, max_in_flight=2)
+
+    assert await backend.enter("read:u1", limit)
+    assert await backend.enter("read:u1", limit)
+    assert not await backend.enter("read:u1", limit)
+    assert await backend.enter("read:u2", limit)
+    assert backend.in_flight() == {"read:u1": 2, "read:u2": 1}
+
+    await backend.leave("read:u1")
+    assert await backend.enter("read:u1", limit)
+
+    for key in ("read:u1", "read:u1", "read:u2"):
+        await backend.leave(key)
+    assert backend.in_flight() == {}
+
+
+@pytest.mark.asyncio
+async def test_refused_take_gives_back_the_in_flight_slot(backend):
+    limiter = RateLimiter({"ingest": RouteLimit(rate=1.0, burst=1, max_in_flight=1)}, backend)
+
+    key = await limiter.acquire("ingest", "u1")
+    with pytest.raises(RateLimited) as refused:
+        await limiter.acquire("ingest", "u1")
+    assert refused.value.reason == "Too many requests in progress"
+
+    await limiter.release(key)
+    with pytest.raises(RateLimited) as refused:
+        await limiter.acquire("ingest", "u1")
+    assert refused.value.reason == "Rate limit exceeded"
+    assert refused.value.retry_after == pytest.approx(1.0)
+    assert backend.in_flight() == {}
+
+
+@pytest.fixture
+def client(monkeypatch, backend):
+    limiter = RateLimiter({"ingest": RouteLimit(rate=0.4, burst=2, max_in_flight=5)}, backend)
+    monkeypatch.setattr(dependencies, "rate_limiter", limiter)
+
+    app = FastAPI()
+
+    @app.post("/ingest", dependencies=[Depends(dependencies.rate_limited("ingest"))])
+    async def ingest():
+        return {"ok": True}
+
+    async def user_from_header(x_user: str = Header(default=LOCAL_USER_ID)):
+        return x_user
+
+    app.dependency_overrides[current_user_id] = user_from_header
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+
+@pytest.mark.asyncio
+async def test_over_limit_gets_429_with_retry_after(client, backend):
+    assert [(await client.post("/ingest", headers={"X-User": "u1"})).status_code for _ in range(2)] == [200, 200]
+
+    response = await client.post("/ingest", headers={"X-User": "u1"})
+
+    assert response.status_code == 429
+    assert response.json()["detail"] == "Rate limit exceeded"
+    # 2.5 s until the next token, rounded up to whole seconds.
+    assert response.headers["Retry-After"] == "3"
+    # Admitted requests released their slots when they finished.
+    assert backend.in_flight() == {}
+
+
+@pytest.mark.asyncio
+async def test_retry_after_is_at_least_one_second(client, clock):
+    for _ in range(2):
+        await client.post("/ingest", headers={"X-User": "u1"})
+    clock.advance(2.4)
+
+    response = await client.post("/ingest", headers={"X-User": "u1"})
+
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "1"
+
+
+@pytest.mark.asyncio
+async def test_local_user_is_not_limited(client):
+    assert {(await client.post("/ingest")).status_code for _ in range(10)} == {200}
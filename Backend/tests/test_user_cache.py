@@ -0,0 +1,60 @@
+import pytest
+import pytest_asyncio
+from sqlalchemy import inspect
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.database import Base
+from app.models import User
+from app.services.user_cache import UserCache, user_cache
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest_asyncio.fixture
+async def session_maker():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    maker = async_sessionmaker(engine, expire_on_commit=False)
+    async with maker() as db:
+        db.add(User(id=1, github_id="42", username="octo", access_token="gh"))
+        await db.commit()
+    yield maker
+    await engine.dispose()
+
+
+async def test_miss_and_hit_both_return_a_detached_copy(session_maker):
+    cache = UserCache(maxsize=10, ttl=60, negative_ttl=5)
+
+    async with session_maker() as db:
+        loaded = await cache.get(db, 1)
+        assert inspect(loaded).detached
+        assert loaded not in db
+        cached = await cache.get(db, "1")
+
+    assert cached is loaded
+    assert (loaded.id, loaded.username) == (1, "octo")
+
+
+async def test_copy_survives_the_loading_session_expiring(session_maker):
+    cache = UserCache(maxsize=10, ttl=60, negative_ttl=5)
+
+    async with session_maker() as db:
+        user = await cache.get(db, 1)
+        db.expire_all()
+        await db.rollback()
+
+    assert user.username == "octo"
+
+
+async def test_missing_user_is_remembered_until_inserted(session_maker):
+    user_cache.clear()
+
+    async with session_maker() as db:
+        assert await user_cache.get(db, 2) is None
+        db.add(User(id=2, github_id="43", username="cat", access_token="gh"))
+        await db.flush()
+        # Flushing the insert evicts the negative entry.
+        assert (await user_cache.get(db, 2)).username == "cat"
+        assert await user_cache.get(db, "not-an-id") is None
+    user_cache.clear()
@@ -1,5 +1,19 @@
 import { SessionData, ApiResponse } from './types';
 
+/** Statuses the server sends with Retry-After: rate limited (429) or shedding load (503). */
+const RETRY_STATUSES = new Set([429, 503]);
+const MAX_ATTEMPTS = 5;
+const MAX_RETRY_DELAY_MS = 60_000;
+
+/** Milliseconds to wait before retrying, from a Retry-After header in seconds. */
+function retryDelayMs(retryAfter: string | null): number {
+  const seconds = Number(retryAfter);
+  if (!Number.isFinite(seconds) || seconds < 0) {
+    return 1000;
+  }
+  return Math.min(seconds * 1000, MAX_RETRY_DELAY_MS);
+}
+
 /**
  * API client for sending session data
  */
@@ -25,7 +39,8 @@ export class ApiClient {
   }
 
   /**
-   * Send session data to server
+   * Send session data to server, waiting out Retry-After when the server is
+   * rate limiting or shedding load
    */
   public async sendSession(sessionData: SessionData): Promise<ApiResponse> {
     try {
@@ -36,11 +51,20 @@ export class ApiClient {
         headers['Authorization'] = `Bearer ${this.apiToken}`;
       }
 
-      const response = await fetch(`${this.baseUrl}/api/sessions`, {
-        method: 'POST',
-        headers,
-        body: JSON.stringify(sessionData)
-      });
+      let response: Response;
+      for (let attempt = 1; ; attempt++) {
+        response = await fetch(`${this.baseUrl}/api/sessions`, {
+          method: 'POST',
+          headers,
+          body: JSON.stringify(sessionData)
+        });
+        if (!RETRY_STATUSES.has(response.status) || attempt >= MAX_ATTEMPTS) {
+          break;
+        }
+        const delay = retryDelayMs(response.headers.get('Retry-After'));
+        console.warn(`[AFK] Server returned ${response.status}, retrying in ${delay} ms`);
+        await new Promise(resolve => setTimeout(resolve, delay));
+      }
 
       if (!response.ok) {
         throw new Error(`HTTP ${response.status}: ${response.statusText}`);